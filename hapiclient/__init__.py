@@ -1,12 +1,21 @@
 # Allow "from hapiclient import hapi"
 from hapiclient.hapi import hapi
 
+# Allow "from hapiclient import hapi_async"
+from hapiclient.aio import hapi as hapi_async
+
 # Allow "from hapiclient import request2path"
 from hapiclient.hapi import request2path
 
 # Allow "from hapiclient import hapitime2datetime"
 from hapiclient.hapitime import hapitime2datetime
 
+# Allow "from hapiclient import hapitime2datetime64"
+from hapiclient.hapitime import hapitime2datetime64
+
+# Allow "from hapiclient import hapitime_slice"
+from hapiclient.hapitime import hapitime_slice
+
 # Allow "from hapiclient import datetime2hapitime"
 from hapiclient.hapitime import datetime2hapitime
 
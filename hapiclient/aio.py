@@ -0,0 +1,490 @@
+"""asyncio interface to HAPI servers.
+
+Usage:
+
+  import asyncio
+  from hapiclient import hapi_async
+
+  async def main():
+    data, meta = await hapi_async(server, dataset, parameters, start, stop)
+
+  asyncio.run(main())
+
+hapi_async() takes the same arguments and keyword options as hapi() and
+returns the same results. Many requests can be awaited concurrently, e.g.,
+with asyncio.gather(), and chunked requests (n_chunks or dt_chunk) are made
+concurrently with at most n_parallel requests at a time (or
+n_parallel_server[server] if smaller) if parallel=True. The adaptive option
+is not supported.
+
+Requests are made with aiohttp if it is installed
+(pip install 'hapiclient[async]'). Otherwise, requests are made in the
+default executor using the connection pool in hapiclient.util. In both cases,
+parsing and reading and writing cache files is done in the default executor
+so that the event loop is not blocked.
+"""
+import time
+import asyncio
+import functools
+import contextlib
+import contextvars
+
+try:
+  import aiohttp
+except ImportError:
+  aiohttp = None
+
+from hapiclient.log import log
+
+# (aiohttp.ClientSession, retries) for requests made in the current context.
+_session = contextvars.ContextVar('hapiclient_aio_session', default=None)
+
+
+async def _run(func, *args, **kwargs):
+  """Call blocking function func in the default executor."""
+  loop = asyncio.get_running_loop()
+  return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+@contextlib.asynccontextmanager
+async def session(opts=None):
+  """Async context manager for an aiohttp session used for requests in its body.
+
+  opts has the same keys as the pool option of hapi() (see
+  hapiclient.util.poolopts()). maxsize is the maximum number of connections to
+  a server and keepalive=False closes connections after each request.
+
+  hapi_async() opens a session if none is open, so a session is only needed to
+  re-use connections across calls to hapi_async(). If aiohttp is not
+  installed, this does nothing.
+  """
+
+  from hapiclient.util import poolopts, setopts
+
+  if aiohttp is None:
+    yield None
+    return
+
+  opts = setopts(poolopts(), opts or {})
+
+  connector = aiohttp.TCPConnector(limit_per_host=opts['maxsize'],
+                                   force_close=not opts['keepalive'])
+  timeout = aiohttp.ClientTimeout(total=None,
+                                  sock_connect=opts['connect_timeout'],
+                                  sock_read=opts['read_timeout'])
+
+  async with aiohttp.ClientSession(connector=connector, timeout=timeout) as client:
+    token = _session.set((client, opts['retries']))
+    try:
+      yield client
+    finally:
+      _session.reset(token)
+
+
+class _Response:
+  """Status, headers, and body (bytes) of a response read by _urlopen()."""
+
+  def __init__(self, status, headers, body):
+    self.status = status
+    self.headers = headers
+    self.body = body
+
+
+async def urlopen(url, parse_json=False):
+  """Return body of response from url as bytes.
+
+  If parse_json=True, returns a dict by parsing JSON in the response. Errors
+  have the same messages as hapiclient.util.urlopen().
+  """
+
+  res = await _urlopen(url)
+
+  if parse_json:
+    log('Parsing and returning JSON from %s' % url)
+    from json import loads
+    from hapiclient.util import error
+    try:
+      return loads(res.body.decode('utf-8'))
+    except Exception:
+      error('Could not parse JSON from %s' % url)
+
+  return res.body
+
+
+async def _urlopen(url):
+  """Return _Response for url.
+
+  Connection errors and responses with HTTP status 429 or 503 are retried
+  as by hapiclient.util.urlopen() (see hapiclient.util.retry()).
+  """
+
+  from hapiclient.util import urlopen as urlopen_sync, error, http_error_message, retry_wait, _contact
+
+  current = _session.get()
+  if current is None:
+    def get():
+      res = urlopen_sync(url)
+      return _Response(res.status, res.headers, res.read())
+    return await _run(get)
+
+  client, retries = current
+
+  log('Opening %s' % url)
+
+  c = _contact
+  attempt = 0
+  while True:
+    try:
+      async with client.get(url) as res:
+        body = await res.read()
+        status, headers = res.status, res.headers
+    except aiohttp.InvalidURL:
+      error('Invalid URL: ' + url)
+    except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+      if attempt < retries:
+        attempt = attempt + 1
+        log('Retrying (%d of %d) %s' % (attempt, retries, url))
+        await asyncio.sleep(retry_wait(attempt))
+        continue
+      if isinstance(e, aiohttp.ClientConnectorError):
+        error('Failed to connect to: ' + url + c)
+      if isinstance(e, asyncio.TimeoutError):
+        error('Read timeout for: ' + url + c)
+      error('Exception ' + type(e).__name__ + ' for: ' + url)
+    except aiohttp.ClientError as e:
+      error('Exception ' + type(e).__name__ + ' for: ' + url)
+    if status in (429, 503) and attempt < retries:
+      attempt = attempt + 1
+      log('Retrying (%d of %d) %s after HTTP status %d' % (attempt, retries, url, status))
+      await asyncio.sleep(retry_wait(attempt, headers.get('Retry-After', None)))
+      continue
+    break
+
+  if status != 200:
+    error(http_error_message(url, status, body))
+
+  return _Response(status, headers, body)
+
+
+# (event loop, key) => task awaiting fetch() for key in _cached()
+_fetching = {}
+
+
+async def _cached(key, fetch):
+  """Return value for key from hapiclient.cache.metacache or, if not cached, await fetch().
+
+  If called for the same key by other tasks while fetch() is running, they
+  wait for it to finish and use its value, as for MemoryCache.get().
+  """
+
+  import copy
+
+  from hapiclient.cache import metacache
+
+  value = metacache.lookup(key)
+  if value is not None:
+    return value
+
+  loop = asyncio.get_running_loop()
+  task = _fetching.get((loop, key), None)
+  if task is None:
+    async def fetch_and_store():
+      try:
+        value = await fetch()
+        metacache.store(key, value)
+        return value
+      finally:
+        del _fetching[(loop, key)]
+    task = loop.create_task(fetch_and_store())
+    _fetching[(loop, key)] = task
+
+  # Value is copied, as by metacache.lookup(), so callers may modify it.
+  return copy.deepcopy(await asyncio.shield(task))
+
+
+async def servers():
+  """Async version of hapiclient.servers.servers()."""
+
+  server_list = 'https://github.com/hapi-server/servers/raw/master/all.txt'
+
+  async def read():
+    log('Reading %s' % server_list)
+    data = (await urlopen(server_list)).decode('utf8').split('\n')
+    return [x for x in data if x]  # Remove empty items (if blank lines)
+
+  data = await _cached(('servers', server_list), read)
+  log('List of HAPI servers in %s:' % server_list)
+  for url in data:
+    log("   %s" % url)
+  return data
+
+
+async def _endpoint(SERVER, endpoint, opts):
+  """Return /catalog or /capabilities (endpoint) response from SERVER.
+
+  If opts is given, hapiclient.cache.endpoint_cache_get() is used in the
+  default executor, so conditional requests are made with the connection
+  pool in hapiclient.util.
+  """
+
+  from hapiclient.cache import endpoint_cache_get, _metacache_opts
+
+  async def read():
+    if opts is None:
+      return await urlopen(SERVER + '/' + endpoint, parse_json=True)
+    return await _run(endpoint_cache_get, SERVER, endpoint, opts)
+
+  return await _cached((endpoint, SERVER) + _metacache_opts(opts), read)
+
+
+async def catalog(SERVER, opts=None):
+  """Async version of hapiclient.catalog.catalog()."""
+  return await _endpoint(SERVER, 'catalog', opts)
+
+
+async def capabilities(SERVER, opts=None):
+  """Async version of hapiclient.capabilities.capabilities()."""
+  return await _endpoint(SERVER, 'capabilities', opts)
+
+
+async def info(SERVER, DATASET, PARAMETERS, opts):
+  """Async version of hapiclient.info.info()."""
+
+  from hapiclient.util import subset_meta, unicode_check, fix_parameters, query_name
+  from hapiclient.cache import meta_cache_read, meta_cache_write, _metacache_opts
+
+  unicode_check(DATASET, PARAMETERS)
+  PARAMETERS = fix_parameters(PARAMETERS)
+
+  async def read():
+    meta = await _run(meta_cache_read, SERVER, DATASET, opts)
+    if meta is not None:
+      return meta
+
+    cat = await catalog(SERVER, opts)
+    url = SERVER + '/info?' + query_name(cat, 'dataset') + '=' + DATASET
+    meta = await urlopen(url, parse_json=True)
+
+    await _run(meta_cache_write, meta, SERVER, DATASET, opts)
+
+    return meta
+
+  meta = await _cached(('info', SERVER, DATASET) + _metacache_opts(opts), read)
+
+  meta.update({"x_server": SERVER})
+  meta.update({"x_dataset": DATASET})
+
+  if PARAMETERS is not None:
+    subset_meta(meta, PARAMETERS)
+
+  return meta
+
+
+async def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Async version of hapiclient.data.data().
+
+  The steps before and after the data request are those of data() and are
+  run in the default executor. If opts['iterate'] is True, returns an async
+  generator that yields (data, meta) for each chunk.
+  """
+
+  from hapiclient.get import data_url, _response_headers
+  from hapiclient.data import _data_request, _data_format, _data_result, _merge_segments
+
+  request = await _run(_data_request, SERVER, DATASET, PARAMETERS, START, STOP, opts, sync=False)
+  PARAMETERS, STOP = request['PARAMETERS'], request['STOP']
+
+  if request['chunked']:
+    if opts['iterate']:
+      return _iter_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+    return await _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, request['tic_totalTime'])
+
+  if request['result'] is not None:
+    return request['result']
+
+  meta = request['meta']
+
+  segments = request['segments']
+  if segments is not None:
+    # Request segments not in cache concurrently.
+    gaps = [(start, stop) for start, stop, fnamenpy in segments if fnamenpy is None]
+    results = await asyncio.gather(
+      *[data(SERVER, DATASET, PARAMETERS, start, stop, opts.copy()) for start, stop in gaps]
+    )
+    fetched = dict(zip(gaps, results))
+    merged = await _run(_merge_segments, SERVER, DATASET, PARAMETERS, START, STOP,
+                        segments, meta, opts, request['tic_totalTime'], fetched=fetched)
+    if merged is not None:
+      return merged
+    await _run(_data_format, request)
+
+  url = data_url(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts['format'])
+
+  tic0 = time.time()
+  if request['response'] is not None:
+    # Response to request made to revalidate cached data.
+    res = request['response']
+    res = _Response(res.status, res.headers, await _run(res.read))
+  else:
+    res = await _urlopen(url)
+  toc0 = time.time() - tic0
+  _response_headers(meta, res)
+
+  tic = time.time()
+  data_result = await _run(_parse, res.body, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, url)
+  toc = time.time() - tic
+
+  return await _run(_data_result, request, data_result, toc0, toc)
+
+
+def _parse(body, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, url):
+  """Parse response body; if opts['cache'], it is first written to the cache."""
+
+  from hapiclient.get import parse_response, _cache_response
+
+  source = body
+  if opts['cache']:
+    source = _cache_response(body, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, url)
+
+  return parse_response(source, meta, opts, url)
+
+
+async def _iter_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Async version of hapiclient.data._iter_chunks()."""
+
+  from hapiclient.data import _chunk_plan, _chunk_interval, _trim
+
+  opts = opts.copy()
+  opts['iterate'] = False
+
+  plan = None
+  if opts['n_chunks'] is not None or opts['dt_chunk'] is not None:
+    plan = _chunk_plan(START, STOP, opts)
+
+  if plan is None:
+    yield await data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+    return
+
+  pSTART, pDELTA, n_chunks = plan
+  for i in range(n_chunks):
+    log('Requesting chunk {} of {}'.format(i + 1, n_chunks))
+    START_i, STOP_i = _chunk_interval(pSTART, pDELTA, i)
+    data_chunk, meta = await data(SERVER, DATASET, PARAMETERS, START_i, STOP_i, opts.copy())
+    data_chunk = _trim(data_chunk,
+                       START if i == 0 else None,
+                       STOP if i == n_chunks - 1 else None)
+    yield data_chunk, meta
+
+
+async def _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime):
+  """Async version of hapiclient.data._get_chunks()."""
+
+  from hapiclient.util import warning
+  from hapiclient.data import _chunk_plan, _chunk_interval, _ChunkBuffer
+  from hapiclient.cache import index_batch
+
+  plan = _chunk_plan(START, STOP, opts)
+  if plan is None:
+    return await data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+
+  pSTART, pDELTA, n_chunks = plan
+
+  n_parallel = 1
+  if opts['parallel']:
+    n_parallel = min(opts['n_parallel'], opts['n_parallel_server'].get(SERVER, opts['n_parallel']))
+    if opts['adaptive']:
+      warning('adaptive=True is not supported by hapi_async(); using up to {} requests at a time.'.format(n_parallel))
+
+  semaphore = asyncio.Semaphore(n_parallel)
+  chunks = _ChunkBuffer(n_chunks, START, STOP, outfile=opts['outfile'])
+  adding = asyncio.Lock()
+
+  async def chunk(i):
+    START_i, STOP_i = _chunk_interval(pSTART, pDELTA, i)
+    async with semaphore:
+      data_chunk, meta = await data(SERVER, DATASET, PARAMETERS, START_i, STOP_i, opts.copy())
+    # Trimming and copying into the buffer are done in the executor so that
+    # the event loop is not blocked, one chunk at a time because chunks
+    # are copied in order by add().
+    async with adding:
+      await _run(chunks.add, i, data_chunk, meta)
+
+  # Cache index files are written once for all chunks.
+  batch = index_batch(opts)
+  try:
+    await asyncio.gather(*[chunk(i) for i in range(n_chunks)])
+  finally:
+    await _run(batch.close)
+
+  return await _run(chunks.result, tic_totalTime)
+
+
+async def hapi(*args, **kwargs):
+  """Async version of hapiclient.hapi().
+
+  See the docstring for hapiclient.hapi() for arguments and keyword options
+  and the docstring for this module for usage.
+  """
+
+  from hapiclient.hapi import _hapiargs
+
+  args, opts = _hapiargs(args, kwargs)
+
+  if aiohttp is not None and _session.get() is None:
+    if opts['iterate'] and len(args) == 5:
+      # Session must stay open while the generator is iterated over.
+      return _iterate_in_session(args, opts)
+    async with session(opts['pool']):
+      return await _hapi(args, opts)
+
+  return await _hapi(args, opts)
+
+
+async def _iterate_in_session(args, opts):
+  async with session(opts['pool']):
+    async for result in await _hapi(args, opts):
+      yield result
+
+
+async def _hapi(args, opts):
+
+  nin = len(args)
+
+  # hapi()
+  if nin == 0:
+    return await servers()
+
+  # hapi(SERVER)
+  if nin == 1:
+    return await catalog(args[0], opts)
+
+  # hapi(SERVER, DATASET)
+  if nin == 2:
+    return await info(args[0], args[1], None, opts)
+
+  # hapi(SERVER, DATASET, PARAMETERS)
+  if nin == 3:
+    return await info(args[0], args[1], args[2], opts)
+
+  # hapi(SERVER, DATASET, PARAMETERS, START, STOP)
+  if nin == 5:
+    return _data_output(await data(*args, opts), opts)
+
+
+def _data_output(result, opts):
+  """Async version of hapiclient.data._data_output()."""
+
+  from hapiclient.data import _data_output as data_output
+
+  if opts['iterate'] and opts['output'] != 'numpy':
+    return _iter_output(result, opts)
+
+  return data_output(result, opts)
+
+
+async def _iter_output(chunks, opts):
+
+  from hapiclient.get import _output
+
+  async for data_chunk, meta in chunks:
+    yield _output(data_chunk, opts), meta
@@ -1,3 +1,7 @@
+import threading
+import itertools
+
+
 def server2dirname(server):
   """Convert a server URL to a directory name."""
 
@@ -86,6 +90,117 @@ def request2path(*args):
   return os.path.join(cachedirectory, urldirectory, fname)
 
 
+class MemoryCache:
+  """Thread-safe in-memory cache of server responses.
+
+  Used for /catalog, /info, and /capabilities responses and the server
+  list, with keys such as ('capabilities', SERVER) followed by the cache
+  options of the request (see _metacache_opts()), so that, e.g., a
+  request split into many chunks makes one /capabilities request instead
+  of one per chunk. Values are copied when stored and when returned, so
+  callers may modify them.
+
+  An item expires ttl seconds after it is stored. When there are more than
+  maxsize items, the least recently used item is removed. Set ttl=0 to
+  disable the cache. clear() removes all items or all items for a server.
+  """
+
+  def __init__(self, maxsize=256, ttl=600):
+    import collections
+    self.maxsize = maxsize
+    self.ttl = ttl
+    self._items = collections.OrderedDict()  # key => (time stored, value)
+    self._lock = threading.Lock()
+    self._key_locks = {}  # key => lock held while value is requested
+
+  def lookup(self, key):
+    """Return copy of cached value for key or None if not cached or expired."""
+
+    import copy
+    import time
+
+    with self._lock:
+      item = self._items.get(key, None)
+      if item is None:
+        return None
+      if time.monotonic() - item[0] >= self.ttl:
+        del self._items[key]
+        return None
+      self._items.move_to_end(key)
+
+    return copy.deepcopy(item[1])
+
+  def store(self, key, value):
+    """Store copy of value for key."""
+
+    import copy
+    import time
+
+    if self.ttl <= 0:
+      return
+
+    value = copy.deepcopy(value)
+    with self._lock:
+      self._items[key] = (time.monotonic(), value)
+      self._items.move_to_end(key)
+      while len(self._items) > self.maxsize:
+        self._items.popitem(last=False)
+
+  def get(self, key, fetch):
+    """Return value for key, calling fetch() to get and store it if not cached.
+
+    If called for the same key by other threads while fetch() is running,
+    they wait for it to finish and use its value.
+    """
+
+    value = self.lookup(key)
+    if value is not None:
+      return value
+
+    with self._lock:
+      key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+    with key_lock:
+      value = self.lookup(key)
+      if value is None:
+        value = fetch()
+        self.store(key, value)
+
+    with self._lock:
+      self._key_locks.pop(key, None)
+
+    return value
+
+  def clear(self, SERVER=None):
+    """Remove all items or, if SERVER is given, all items for SERVER."""
+
+    with self._lock:
+      if SERVER is None:
+        self._items.clear()
+      else:
+        for key in [key for key in self._items if key[1] == SERVER]:
+          del self._items[key]
+
+
+# Cache used by catalog(), info(), capabilities(), and servers().
+metacache = MemoryCache()
+
+
+def _metacache_opts(opts):
+  """Part of a metacache key for the options of hapi() that affect the value.
+
+  Values for different cachedir, cache, and usecache options are stored
+  separately, so that, e.g., a request with cache=True writes the metadata
+  files to its cachedir even if the metadata were requested before with
+  cache=False or another cachedir. opts may be None.
+  """
+
+  if opts is None:
+    return ()
+
+  return (opts['cachedir'], opts['cache'], opts['usecache'])
+
+
 def meta_cache_paths(SERVER, DATASET, cachedir):
   """Return dict with metadata cache directory and file names."""
 
@@ -142,19 +257,152 @@ def meta_cache_write(meta, SERVER, DATASET, opts):
   write_atomic(fnamepkl, meta)
 
 
-def data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, cachedir):
-  """Return dict with data cache file names."""
+def endpoint_cache_paths(SERVER, endpoint, cachedir):
+  """Return dict with cache file names for a /catalog or /capabilities response."""
+
+  import os
+
+  fname_root = os.path.join(cachedir, server2dirname(SERVER), endpoint)
+
+  return {
+    'json': fname_root + '.json',
+    'pkl': fname_root + '.pkl'
+  }
+
+
+def endpoint_cache_get(SERVER, endpoint, opts):
+  """Return /catalog or /capabilities (endpoint) response from SERVER using cachedir.
+
+  If opts['usecache'] is True and the response is cached, it is returned
+  without a request if it is younger than its maximum age (see
+  _max_age()). Otherwise, the request is conditional on the ETag and
+  Last-Modified headers of the cached response, and the cached response is
+  used if the server responds with HTTP status 304 (Not Modified).
+
+  If opts['cache'] is True, the response is written to a .json file and,
+  with its headers and the time it was received or revalidated, to a .pkl
+  file.
+  """
+
+  import os
+  import time
+  import pickle
+
+  from hapiclient.log import log
+  from hapiclient.util import urlopen, jsonparse, warning, write_atomic
+
+  url = SERVER + '/' + endpoint
+  paths = endpoint_cache_paths(SERVER, endpoint, opts['cachedir'])
+
+  cached = None
+  if opts['usecache'] and os.path.isfile(paths['pkl']):
+    try:
+      with open(paths['pkl'], 'rb') as f:
+        cached = pickle.load(f)
+    except Exception as e:
+      warning('Ignoring cache file {} that could not be read: {}'.format(paths['pkl'], e))
+
+  headers = None
+  if cached is not None:
+    age = time.time() - cached['time']
+    if age < _max_age(cached['headers'], opts):
+      log('Using %s (age %.0f s)' % (os.path.basename(paths['pkl']), age))
+      return cached['meta']
+    headers = _conditional_headers(cached['headers'])
+
+  res = urlopen(url, headers=headers)
+  if res.status == 304:
+    log('Using %s; server responded with 304 (Not Modified)' % os.path.basename(paths['pkl']))
+    # Return connection to pool.
+    res.drain_conn()
+    res.release_conn()
+    meta = cached['meta']
+    entry = {**cached, 'headers': {**cached['headers'], **_cache_headers(res)}, 'time': time.time()}
+  else:
+    meta = jsonparse(res, url)
+    entry = {'meta': meta, 'headers': _cache_headers(res), 'time': time.time()}
+    if opts['cache']:
+      log('Writing %s ' % os.path.basename(paths['json']))
+      write_atomic(paths['json'], meta)
+
+  if opts['cache']:
+    log('Writing %s ' % os.path.basename(paths['pkl']))
+    write_atomic(paths['pkl'], entry)
+
+  return meta
+
+
+def _cache_headers(res):
+  """Return dict with HTTP headers of response res used to revalidate it."""
+  return {key: res.headers[key] for key in ['ETag', 'Last-Modified', 'Cache-Control'] if key in res.headers}
+
+
+def _conditional_headers(headers):
+  """Return request headers for a conditional request given _cache_headers() of a response."""
+
+  conditional = {}
+  if 'ETag' in headers:
+    conditional['If-None-Match'] = headers['ETag']
+  if 'Last-Modified' in headers:
+    conditional['If-Modified-Since'] = headers['Last-Modified']
+
+  return conditional or None
+
+
+def _max_age(headers, opts):
+  """Return seconds a cached response is used without revalidation.
+
+  opts['meta_max_age'] if it is not None; otherwise, the max-age in the
+  Cache-Control header of the response or 0 if not given.
+  """
+
+  import re
+
+  if opts['meta_max_age'] is not None:
+    return opts['meta_max_age']
+
+  cache_control = headers.get('Cache-Control', '')
+  if 'no-cache' in cache_control or 'no-store' in cache_control:
+    return 0
+
+  match = re.search(r'max-age=(\d+)', cache_control)
+  if match:
+    return int(match.group(1))
+
+  return 0
+
+
+def data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, cachedir, time_format='bytes'):
+  """Return dict with data cache file names.
+
+  The names of the .npy, .npz, and .pkl files, which contain parsed data,
+  depend on time_format (see the time_format option of hapi()). Parsed data
+  are written to the .npz file instead of the .npy file if the layout
+  option of hapi() is 'columnar'.
+  """
 
   fname_root = request2path(SERVER, DATASET, PARAMETERS, START, STOP, cachedir)
+  parsed_root = fname_root + _time_format_suffix(time_format)
 
   return {
     'csv': fname_root + '.csv',
     'bin': fname_root + '.bin',
-    'npy': fname_root + '.npy',
-    'pkl': fname_root + '.pkl'
+    'npy': parsed_root + '.npy',
+    'npz': parsed_root + '.npz',
+    'pkl': parsed_root + '.pkl'
   }
 
 
+def _time_format_suffix(time_format):
+  """Suffix for root of parsed data file names given time_format."""
+  return '' if time_format == 'bytes' else '.' + time_format
+
+
+def _parsed_ext(layout):
+  """Extension of parsed data file given layout."""
+  return 'npz' if layout == 'columnar' else 'npy'
+
+
 def data_cache_read_metax(SERVER, DATASET, PARAMETERS, START, STOP, opts):
   """Read extended request metadata from PKL cache. Returns meta dict or None."""
 
@@ -167,7 +415,7 @@ def data_cache_read_metax(SERVER, DATASET, PARAMETERS, START, STOP, opts):
     log('Not checking subsetted metadata cache because usecache is False.')
     return None
 
-  fnamepklx = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'])['pkl']
+  fnamepklx = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'], opts['time_format'])['pkl']
   if os.path.isfile(fnamepklx):
     log('Reading subsetted metadata cache %s' % os.path.basename(fnamepklx))
     with open(fnamepklx, 'rb') as f:
@@ -189,11 +437,42 @@ def data_cache_read_npy(SERVER, DATASET, PARAMETERS, START, STOP, opts):
   if not opts["usecache"]:
     return None
 
-  fnamenpy = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'])['npy']
+  data_paths = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'], opts['time_format'])
+  fnamenpy = data_paths[_parsed_ext(opts['layout'])]
 
-  if not os.path.isfile(fnamenpy):
+  if not os.path.isfile(fnamenpy) and _cached_response(fnamenpy)[0] is None:
     return None
 
+  return _read_npy(fnamenpy, opts)
+
+
+def _read_npy(fnamenpy, opts):
+  """Read parsed data written to the cache and record the access (see cache_index_touch()).
+
+  If only the response was written (the cache_store option of hapi() was
+  'raw'), it is parsed instead.
+  """
+
+  import os
+  import numpy as np
+
+  from hapiclient.log import log
+
+  cache_index_touch(fnamenpy, opts)
+
+  if not os.path.isfile(fnamenpy):
+    return _read_response(fnamenpy, opts)
+
+  if fnamenpy.endswith('.npz'):
+    # Columnar layout. Arrays in a .npz file cannot be memory-mapped.
+    log('Reading %s ' % os.path.basename(fnamenpy))
+    with np.load(fnamenpy) as f:
+      return {name: f[name] for name in f.files}
+
+  if opts['mmap']:
+    log('Memory-mapping %s ' % os.path.basename(fnamenpy))
+    return np.load(fnamenpy, mmap_mode='r')
+
   log('Reading %s ' % os.path.basename(fnamenpy))
   with open(fnamenpy, 'rb') as f:
     data = np.load(f)
@@ -201,6 +480,86 @@ def data_cache_read_npy(SERVER, DATASET, PARAMETERS, START, STOP, opts):
   return data
 
 
+def _response_root(fname):
+  """Root of names of response files for a data cache file name.
+
+  Only the extensions and time_format suffixes of data cache files (see
+  data_cache_paths()) are removed because the root may contain a '.', e.g.,
+  if a parameter name does.
+  """
+
+  root = fname
+  for ext in ['.bin', '.csv', '.npy', '.npz', '.pkl']:
+    if root.endswith(ext):
+      root = root[:-len(ext)]
+      break
+  for time_format in ['datetime64', 'epoch_ns', 'epoch_s_float']:
+    if root.endswith(_time_format_suffix(time_format)):
+      root = root[:-len(_time_format_suffix(time_format))]
+      break
+
+  return root
+
+
+def _cached_response(fnamenpy):
+  """Return (fname, metax) for cached response to parse in place of parsed data file fnamenpy.
+
+  metax is the extended metadata written with the response. The response is
+  used if metax shows that only the response was written (x_dataFileParsed
+  is None because the cache_store option of hapi() was 'raw'), so the
+  cache_store option used to read the data does not matter. Returns
+  (None, None) if the response or metax is not cached or if parsed data
+  were written, e.g., for a different layout, in which case the data are
+  requested again.
+  """
+
+  import os
+  import pickle
+
+  from hapiclient.util import warning
+
+  fnamepklx = os.path.splitext(fnamenpy)[0] + '.pkl'
+  if not os.path.isfile(fnamepklx):
+    return None, None
+
+  try:
+    with open(fnamepklx, 'rb') as f:
+      metax = pickle.load(f)
+  except Exception as e:
+    warning('Ignoring cache file {} that could not be read: {}'.format(fnamepklx, e))
+    return None, None
+
+  if metax.get('x_dataFileParsed', '') is not None:
+    return None, None
+
+  fname = _response_root(fnamenpy) + ('.bin' if metax.get('x_dataFormat', None) == 'binary' else '.csv')
+  if not os.path.isfile(fname):
+    return None, None
+
+  return fname, metax
+
+
+def _read_response(fnamenpy, opts):
+  """Parse cached response for parsed data file fnamenpy.
+
+  The extended metadata written with the response is used to parse it. A
+  binary response is memory-mapped if its records are the parsed data.
+  """
+
+  from hapiclient.get import parse_response
+
+  fname, metax = _cached_response(fnamenpy)
+  if fname is None:
+    return None
+
+  if fname.endswith('.bin'):
+    opts = {**opts, 'format': 'binary', 'method': '', 'mmap': True}
+  else:
+    opts = {**opts, 'format': 'csv'}
+
+  return parse_response(fname, metax, opts, fname)
+
+
 def data_cache_write(data_result, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts):
   """Write data array and extended metadata to cache files.
 
@@ -208,27 +567,742 @@ def data_cache_write(data_result, meta, SERVER, DATASET, PARAMETERS, START, STOP
   """
 
   import os
+  import time
 
   from hapiclient.log import log
   from hapiclient.util import write_atomic
+  from hapiclient.get import _binary_records
 
-  data_paths = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'])
-  fnamecsv, fnamebin, fnamenpy, fnamepklx = data_paths['csv'], data_paths['bin'], data_paths['npy'], data_paths['pkl']
+  data_paths = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'], opts['time_format'])
+  fnamecsv, fnamebin, fnamepklx = data_paths['csv'], data_paths['bin'], data_paths['pkl']
+  fnamenpy = data_paths[_parsed_ext(opts['layout'])]
 
   meta_paths = meta_cache_paths(SERVER, DATASET, opts['cachedir'])
   fnamejson, fnamepkl = meta_paths['json'], meta_paths['pkl']
 
   meta.update({"x_metaFileParsed": fnamepkl})
-  meta.update({"x_dataFileParsed": fnamenpy})
+  meta.update({"x_dataFileParsed": None if opts['cache_store'] == 'raw' else fnamenpy})
   meta.update({"x_metaFile": fnamejson})
   meta.update({"x_dataFile": fnamebin if opts['format'] == 'binary' else fnamecsv})
+  meta.update({"x_dataFormat": opts['format']})
+  if opts['cache_store'] == 'parsed':
+    meta.update({"x_dataFile": None})
 
   if not opts["cache"]:
     # Need to return after meta is updated.
     return
 
+  meta.update({"x_cacheTime": time.time()})
+  meta.update({"x_cacheStable": _data_stable(meta, STOP, opts)})
+
   log('Writing %s' % os.path.basename(fnamepklx))
   write_atomic(fnamepklx, meta)
 
-  log('Writing %s' % os.path.basename(fnamenpy))
-  write_atomic(fnamenpy, data_result)
+  if opts['cache_store'] == 'raw':
+    log('Not writing %s because cache_store is raw' % os.path.basename(fnamenpy))
+  elif opts['cache_store'] == 'parsed' and opts['format'] == 'binary' and _binary_records(meta, opts):
+    log('%s was written when response was read' % os.path.basename(fnamenpy))
+  else:
+    log('Writing %s' % os.path.basename(fnamenpy))
+    write_atomic(fnamenpy, data_result)
+
+  interval_index_add(SERVER, DATASET, PARAMETERS, START, STOP, opts, meta)
+
+  cache_index_add(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+
+
+def data_cache_write_records(fnamenpy, source, dtype):
+  """Write the records of a binary response to .npy file fnamenpy.
+
+  source is the response or the response body as bytes and dtype is the
+  dtype of a record. The records are copied after a .npy header for a 1-D
+  array of dtype without being parsed, so the file is written once. The
+  header has room for any number of records and is rewritten with the
+  number of records when the response has been read.
+  """
+
+  import os
+  import shutil
+  import pathlib
+  import secrets
+
+  from hapiclient.data import _npy_header, _npy_header_size
+
+  path = pathlib.Path(fnamenpy)
+  path.parent.mkdir(parents=True, exist_ok=True)
+  tmp_path = path.with_suffix(path.suffix + f".{secrets.token_hex(3)}.tmp")
+
+  size = _npy_header_size(dtype)
+  try:
+    with tmp_path.open('wb') as f:
+      f.write(_npy_header(dtype, 0, size))
+      if isinstance(source, (bytes, bytearray)):
+        f.write(source)
+      else:
+        shutil.copyfileobj(source, f, 2**22)
+      nbytes = f.tell() - size
+      if nbytes % dtype.itemsize != 0:
+        raise ValueError('Response length of {} bytes is not a multiple of record length of {} bytes'.format(nbytes, dtype.itemsize))
+      f.seek(0)
+      f.write(_npy_header(dtype, nbytes // dtype.itemsize, size))
+    os.replace(tmp_path, path)
+  except Exception:
+    try:
+      tmp_path.unlink()
+    except OSError:
+      pass
+    raise
+
+
+def _data_stable(meta, STOP, opts):
+  """True if data for a request with STOP will not change.
+
+  This is assumed if STOP is at least opts['data_margin'] before the
+  dataset's stopDate in meta or, if earlier or stopDate is not a HAPI
+  time, the current time.
+  """
+
+  import isodate
+  from datetime import datetime, timezone
+
+  from hapiclient.hapitime import hapitime2datetime
+
+  def parse(hapitime):
+    return hapitime2datetime(hapitime if hapitime.endswith('Z') else hapitime + 'Z')[0]
+
+  now = datetime.now(timezone.utc)
+  end = now
+  try:
+    end = min(now, parse(meta['stopDate']))
+  except Exception:
+    pass
+
+  margin = isodate.parse_duration(opts['data_margin'])
+  if isinstance(margin, isodate.Duration):
+    margin = margin.totimedelta(end=end)
+
+  return parse(STOP) <= end - margin
+
+
+def _data_fresh(stable, cache_time, opts):
+  """True if cached data can be used without revalidation.
+
+  stable is True if the data will not change (see _data_stable()) and
+  cache_time is the time (seconds since 1970) the data were written or
+  revalidated; None if unknown (cache written by an older version).
+  """
+
+  import time
+
+  if opts['data_max_age'] is None or stable:
+    return True
+
+  return cache_time is not None and time.time() - cache_time < opts['data_max_age']
+
+
+def data_cache_revalidate(metax, SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Return (fresh, res) for cached data for a request.
+
+  fresh is True if the cached data can be used. metax is the extended
+  metadata read by data_cache_read_metax(). If the cached data are not fresh
+  (see the data_max_age option of hapi()), a conditional request with the
+  ETag and Last-Modified headers of the cached response is made. If the
+  server responds with HTTP status 304 (Not Modified), the time in the cache
+  is updated and fresh is True. Otherwise, fresh is False and res is the
+  response with the modified data, in the format given by
+  _data_cache_format(metax), which is used instead of requesting the data
+  again. res is None if no request was made.
+  """
+
+  import os
+  import time
+
+  from hapiclient.log import log
+  from hapiclient.util import urlopen, write_atomic
+  from hapiclient.get import data_url
+
+  if _data_fresh(metax.get('x_cacheStable', False), metax.get('x_cacheTime', None), opts):
+    return True, None
+
+  fnamepklx = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'], opts['time_format'])['pkl']
+
+  headers = _conditional_headers(metax.get('x_responseHeaders', {}))
+  if headers is None:
+    log('Cached data for %s expired and response had no ETag or Last-Modified header' % os.path.basename(fnamepklx))
+    return False, None
+
+  url = data_url(metax, SERVER, DATASET, PARAMETERS, START, STOP, _data_cache_format(metax))
+  log('Revalidating cached data for %s' % os.path.basename(fnamepklx))
+  res = urlopen(url, headers=headers)
+  if res.status != 304:
+    log('Cached data were modified; using response')
+    return False, res
+
+  log('Server responded with 304 (Not Modified); using cached data')
+  # Return connection to pool.
+  res.drain_conn()
+  res.release_conn()
+  metax.update({"x_cacheTime": time.time()})
+  if opts['cache']:
+    write_atomic(fnamepklx, metax)
+    interval_index_add(SERVER, DATASET, PARAMETERS, START, STOP, opts, metax)
+
+  return True, None
+
+
+def _data_cache_format(metax):
+  """Format ('binary' or 'csv') of the cached response for extended metadata metax."""
+
+  format = metax.get('x_dataFormat', None)
+  if format is None:
+    # Written by a version that did not store x_dataFormat.
+    format = 'binary' if metax['x_dataFile'].endswith('.bin') else 'csv'
+
+  return format
+
+
+_interval_index_lock = threading.Lock()
+
+
+class _IndexBatch:
+  """Index updates for requests made with opts, written together by close().
+
+  While the batch is open, opts['_index_batch'] is its id in _index_batches,
+  so updates for requests made with opts or copies of it (e.g., the chunks
+  of a request, which may be written by several threads) are collected and
+  each index file is read and written once instead of once per request.
+  If updates were already being batched for opts, the batch is nested and
+  updates are written when the outer batch is closed.
+  """
+
+  def __init__(self, opts):
+    self.opts = opts
+    self.nested = opts.get('_index_batch', None) in _index_batches
+    self.intervals = {}  # (SERVER, DATASET, cachedir) => list of entries
+    self.cache = {}      # cachedir => dict of cache index updates
+    self._lock = threading.Lock()
+    if not self.nested:
+      self.id = next(_index_batch_ids)
+      _index_batches[self.id] = self
+      opts['_index_batch'] = self.id
+
+  def add_interval(self, SERVER, DATASET, cachedir, entry):
+    with self._lock:
+      self.intervals.setdefault((SERVER, DATASET, cachedir), []).append(entry)
+
+  def add_cache(self, basedir, key, entry, opts):
+    with self._lock:
+      updates = self._cache_updates(basedir, opts)
+      updates['added'][key] = entry
+
+  def touch_cache(self, basedir, key, opts):
+    with self._lock:
+      self._cache_updates(basedir, opts)['touched'].append(key)
+
+  def _cache_updates(self, basedir, opts):
+    updates = self.cache.setdefault(basedir, {'added': {}, 'touched': []})
+    updates['max_bytes'] = opts['cache_max_bytes']
+    updates['policy'] = opts['cache_eviction']
+    return updates
+
+  def close(self):
+    """End batch and write updates."""
+
+    if self.nested:
+      return
+
+    self.opts.pop('_index_batch', None)
+    _index_batches.pop(self.id, None)
+    for (SERVER, DATASET, cachedir), entries in self.intervals.items():
+      _interval_index_write(SERVER, DATASET, cachedir, entries)
+    for basedir, updates in self.cache.items():
+      _cache_index_update(basedir, updates['added'], updates['touched'], updates['max_bytes'], updates['policy'])
+    self.intervals = {}
+    self.cache = {}
+
+
+_index_batches = {}  # id => open _IndexBatch
+_index_batch_ids = itertools.count()
+
+
+def index_batch(opts):
+  """Start batching index updates for requests made with opts (see _IndexBatch).
+
+  Returns the batch; its close() method must be called to write the updates.
+  """
+  return _IndexBatch(opts)
+
+
+def _index_batch(opts):
+  """Open _IndexBatch for opts or None."""
+  return _index_batches.get(opts.get('_index_batch', None), None)
+
+
+def interval_index_path(SERVER, DATASET, cachedir):
+  """Return name of file with index of time intervals cached for a dataset."""
+
+  return request2path(SERVER, DATASET, '', '', '', cachedir) + '.intervals.json'
+
+
+def interval_index_read(SERVER, DATASET, cachedir):
+  """Return list of cached intervals for a dataset.
+
+  Each element is a dict with keys
+
+    parameters: the parameters string of the request
+    start, stop: the start and stop strings of the request
+    tmin, tmax: start and stop as fixed-width strings that can be compared
+    file: the root file name for the request (see data_cache_paths())
+    time_format: the time_format option used for the request; 'bytes' if
+                 not present
+    layout: the layout option used for the request; 'structured' if not
+            present
+    time: the time the request was written or revalidated (seconds since
+          1970); None if not present
+    stable: True if the data for the request will not change (see
+            _data_stable()); False if not present
+  """
+
+  import os
+  import json
+
+  fname = interval_index_path(SERVER, DATASET, cachedir)
+  if not os.path.isfile(fname):
+    return []
+
+  try:
+    with open(fname) as f:
+      return json.load(f)
+  except Exception as e:
+    from hapiclient.util import warning
+    warning('Ignoring interval index file {} that could not be read: {}'.format(fname, e))
+    return []
+
+
+def interval_index_add(SERVER, DATASET, PARAMETERS, START, STOP, opts, meta=None):
+  """Add the time interval of a cached request to the dataset's index.
+
+  meta is the extended metadata of the request; its x_cacheTime and
+  x_cacheStable values are used to determine if the interval is fresh. If
+  index updates are being batched for opts (see index_batch()), the
+  interval is written when the batch is closed.
+  """
+
+  import os
+
+  root = os.path.basename(request2path(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir']))
+
+  entry = {
+    'parameters': PARAMETERS,
+    'start': START,
+    'stop': STOP,
+    'tmin': _hapitime_normalize(START),
+    'tmax': _hapitime_normalize(STOP),
+    'file': root,
+    'time_format': opts['time_format'],
+    'layout': opts['layout'],
+    'time': (meta or {}).get('x_cacheTime', None),
+    'stable': (meta or {}).get('x_cacheStable', False)
+  }
+
+  batch = _index_batch(opts)
+  if batch is not None:
+    batch.add_interval(SERVER, DATASET, opts['cachedir'], entry)
+  else:
+    _interval_index_write(SERVER, DATASET, opts['cachedir'], [entry])
+
+
+def _interval_index_write(SERVER, DATASET, cachedir, entries):
+  """Add entries to the dataset's interval index, replacing entries for the same files."""
+
+  import os
+
+  from hapiclient.log import log
+  from hapiclient.util import write_atomic
+
+  fname = interval_index_path(SERVER, DATASET, cachedir)
+  keys = set((e['file'],) + _interval_index_form(e) for e in entries)
+
+  with _interval_index_lock:
+    index = interval_index_read(SERVER, DATASET, cachedir)
+    index = [e for e in index if (e['file'],) + _interval_index_form(e) not in keys]
+    # If a request was written more than once, the last entry is kept.
+    latest = {}
+    for e in entries:
+      latest[(e['file'],) + _interval_index_form(e)] = e
+    index.extend(latest.values())
+    log('Writing %s' % os.path.basename(fname))
+    write_atomic(fname, index)
+
+
+def _interval_index_form(entry):
+  """(time_format, layout) of the parsed data file for an interval index entry."""
+  return entry.get('time_format', 'bytes'), entry.get('layout', 'structured')
+
+
+def interval_index_segments(SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Split a request into time segments that are or are not cached.
+
+  Returns None if no cached request for PARAMETERS or a superset of
+  PARAMETERS that is fresh (see the data_max_age option of hapi())
+  overlaps [START, STOP). Otherwise, returns a list of
+  (start, stop, fnamenpy) tuples that cover [START, STOP) in time order,
+  where fnamenpy is the .npy (.npz if opts['layout'] is 'columnar') file
+  with data for [start, stop) or None if no cached data exists for the
+  segment. The data in fnamenpy may have more
+  parameters than requested.
+  """
+
+  import os
+
+  if not opts['usecache']:
+    return None
+
+  cachedir_server = cachedir(opts['cachedir'], SERVER)
+  tmin = _hapitime_normalize(START)
+  tmax = _hapitime_normalize(STOP)
+
+  entries = []
+  for e in interval_index_read(SERVER, DATASET, opts['cachedir']):
+    if _interval_index_form(e) != (opts['time_format'], opts['layout']):
+      continue
+    if not _parameters_cover(e['parameters'], PARAMETERS):
+      continue
+    if e['tmin'] >= tmax or e['tmax'] <= tmin:
+      continue
+    if not _data_fresh(e.get('stable', False), e.get('time', None), opts):
+      # Stale intervals are requested again.
+      continue
+    e['npy'] = os.path.join(cachedir_server, e['file'] + _time_format_suffix(opts['time_format']) + '.' + _parsed_ext(opts['layout']))
+    if os.path.isfile(e['npy']) or _cached_response(e['npy'])[0] is not None:
+      entries.append(e)
+
+  if len(entries) == 0:
+    return None
+
+  segments = []
+  t, tstr = tmin, START
+  while t < tmax:
+    covering = [e for e in entries if e['tmin'] <= t < e['tmax']]
+    if len(covering) > 0:
+      # Use cached interval that extends furthest; if more than one, prefer
+      # one with the requested parameters.
+      e = max(covering, key=lambda e: (e['tmax'], e['parameters'] == PARAMETERS))
+      fnamenpy = e['npy']
+      tnext, tnextstr = e['tmax'], e['stop']
+    else:
+      # Gap extends to start of next cached interval
+      later = [e for e in entries if e['tmin'] > t]
+      fnamenpy = None
+      tnext, tnextstr = tmax, STOP
+      if len(later) > 0:
+        e = min(later, key=lambda e: e['tmin'])
+        tnext, tnextstr = e['tmin'], e['start']
+    if tnext >= tmax:
+      tnext, tnextstr = tmax, STOP
+    segments.append((tstr, tnextstr, fnamenpy))
+    t, tstr = tnext, tnextstr
+
+  return segments
+
+
+def _parameters_cover(cached, requested):
+  """True if parameters string cached includes all parameters in requested.
+
+  An empty string means all parameters.
+  """
+
+  if cached == requested or cached == '':
+    return True
+  if requested == '':
+    return False
+
+  return set(requested.split(',')).issubset(cached.split(','))
+
+
+def _hapitime_normalize(hapitime):
+  """Convert HAPI time string to a fixed-width string for comparisons."""
+
+  from hapiclient.hapitime import hapitime2datetime
+
+  if not hapitime.endswith('Z'):
+    hapitime = hapitime + 'Z'
+  return hapitime2datetime(hapitime)[0].strftime('%Y-%m-%dT%H:%M:%S.%f')
+
+
+# Index of data cache entries in a cache directory. An entry is the set of
+# files for a request (see data_cache_paths()), with all time_format and
+# layout variants, and its key is the path of the root of their names
+# relative to the cache directory. The index is used to enforce the
+# cache_max_bytes option of hapi() and by cache_list(), cache_usage(),
+# cache_evict(), and cache_clear(), so the cache directory tree is not
+# walked. Entries are added by hapi() whenever data are written, so they can
+# be listed and cleared with the default options, but reads only update
+# their access times and hits if cache_max_bytes is not None so that reading
+# cached data does not also write the index.
+
+_cache_index_lock = threading.Lock()
+
+
+def cache_index_path(basedir):
+  """Return name of index file for cache directory basedir."""
+
+  import os
+
+  return os.path.join(basedir, 'index.json')
+
+
+def cache_index_read(basedir):
+  """Return dict with index of data cache entries in basedir.
+
+  Keys are entry keys and values are dicts with keys
+
+    server, dataset: SERVER and DATASET of the request
+    size: total size in bytes of the entry's files
+    atime: time the entry was last written or read (seconds since 1970)
+    hits: number of times the entry was written or read
+  """
+
+  import os
+  import json
+
+  fname = cache_index_path(basedir)
+  if not os.path.isfile(fname):
+    return {}
+
+  try:
+    with open(fname) as f:
+      return json.load(f)
+  except Exception as e:
+    from hapiclient.util import warning
+    warning('Ignoring cache index file {} that could not be read: {}'.format(fname, e))
+    return {}
+
+
+def _cache_index_write(basedir, index):
+
+  from hapiclient.util import write_atomic
+
+  write_atomic(cache_index_path(basedir), index)
+
+
+def _cache_index_files(basedir, key):
+  """Return list of files for index entry key.
+
+  The names of the files that may exist for a request are checked instead of
+  listing the directory, which may have many files.
+  """
+
+  import os
+
+  root = os.path.join(basedir, key)
+  fnames = [root + '.bin', root + '.csv']
+  for time_format in ['bytes', 'datetime64', 'epoch_ns', 'epoch_s_float']:
+    for ext in ['.npy', '.npz', '.pkl']:
+      fnames.append(root + _time_format_suffix(time_format) + ext)
+
+  return [fname for fname in fnames if os.path.isfile(fname)]
+
+
+def _cache_index_key(root, basedir):
+  """Return index entry key given root of data cache file names (see request2path())."""
+
+  import os
+
+  return os.path.relpath(root, basedir)
+
+
+def cache_index_add(SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Add or update the index entry for a request written to the cache.
+
+  If opts['cache_max_bytes'] is not None, entries are then evicted using
+  opts['cache_eviction'] until the size of the cache is at most
+  opts['cache_max_bytes']. The entry for the request is not evicted. If
+  index updates are being batched for opts (see index_batch()), the index is
+  updated when the batch is closed.
+  """
+
+  import os
+
+  basedir = opts['cachedir']
+  key = _cache_index_key(request2path(SERVER, DATASET, PARAMETERS, START, STOP, basedir), basedir)
+
+  size = 0
+  for fname in _cache_index_files(basedir, key):
+    try:
+      size = size + os.path.getsize(fname)
+    except OSError:
+      pass
+
+  entry = {'server': SERVER, 'dataset': DATASET, 'size': size}
+
+  batch = _index_batch(opts)
+  if batch is not None:
+    batch.add_cache(basedir, key, entry, opts)
+  else:
+    _cache_index_update(basedir, {key: entry}, [], opts['cache_max_bytes'], opts['cache_eviction'])
+
+
+def cache_index_touch(fname, opts):
+  """Record a read of data cache file fname in the index entry for its request.
+
+  Does nothing if opts['cache_max_bytes'] is None. If index updates are
+  being batched for opts (see index_batch()), the read is recorded when the
+  batch is closed.
+  """
+
+  if opts['cache_max_bytes'] is None:
+    return
+
+  basedir = opts['cachedir']
+  key = _cache_index_key(_response_root(fname), basedir)
+
+  batch = _index_batch(opts)
+  if batch is not None:
+    batch.touch_cache(basedir, key, opts)
+  else:
+    _cache_index_update(basedir, {}, [key], opts['cache_max_bytes'], opts['cache_eviction'])
+
+
+def _cache_index_update(basedir, added, touched, max_bytes, policy):
+  """Read index, apply updates, evict entries, and write index.
+
+  added is a dict with keys of entry keys and values of dicts with the
+  server, dataset, and size of the entry; touched is a list of keys of
+  entries read. Both update the entry's access time and hits. If max_bytes is
+  not None, entries are then evicted using policy until the size of the
+  cache is at most max_bytes. Only the last entry added, which is for the
+  request being returned, is kept; entries added earlier, e.g., for other
+  chunks of a request, may be evicted.
+  """
+
+  import time
+
+  with _cache_index_lock:
+    index = cache_index_read(basedir)
+    for key, update in added.items():
+      entry = index.get(key, {'hits': 0})
+      entry.update(update)
+      entry.update({'atime': time.time(), 'hits': entry['hits'] + 1})
+      index[key] = entry
+    for key in touched:
+      if key in index:
+        index[key]['atime'] = time.time()
+        index[key]['hits'] = index[key]['hits'] + 1
+    if max_bytes is not None:
+      _cache_evict(basedir, index, max_bytes, policy, keep=list(added)[-1:])
+    _cache_index_write(basedir, index)
+
+
+def _cache_evict(basedir, index, max_bytes, policy, keep=()):
+  """Remove entries from index and their files until total size <= max_bytes.
+
+  Entries with keys in keep are not removed. Returns list of keys of removed
+  entries. index is modified in place.
+  """
+
+  from hapiclient.log import log
+
+  if policy == 'lfu':
+    order = sorted(index, key=lambda key: (index[key]['hits'], index[key]['atime']))
+  else:
+    order = sorted(index, key=lambda key: index[key]['atime'])
+
+  usage = sum(entry['size'] for entry in index.values())
+  removed = []
+  for key in order:
+    if usage <= max_bytes:
+      break
+    if key in keep:
+      continue
+    entry = index.pop(key)
+    log('Evicting %s (%d bytes) from cache' % (key, entry['size']))
+    _cache_remove(basedir, key, entry)
+    usage = usage - entry['size']
+    removed.append(key)
+
+  return removed
+
+
+def _cache_remove(basedir, key, entry):
+  """Remove files for index entry and its intervals from the dataset's interval index."""
+
+  import os
+
+  from hapiclient.util import warning, write_atomic
+
+  for fname in _cache_index_files(basedir, key):
+    try:
+      os.remove(fname)
+    except OSError as e:
+      warning('Could not remove cache file {}: {}'.format(fname, e))
+
+  with _interval_index_lock:
+    fname = interval_index_path(entry['server'], entry['dataset'], basedir)
+    index = interval_index_read(entry['server'], entry['dataset'], basedir)
+    kept = [e for e in index if e['file'] != os.path.basename(key)]
+    if len(kept) != len(index):
+      write_atomic(fname, kept)
+
+
+def _cache_select(index, server=None, dataset=None):
+  """Keys of index entries for server and dataset (all if None)."""
+  return [key for key, entry in index.items()
+          if (server is None or entry['server'] == server) and (dataset is None or entry['dataset'] == dataset)]
+
+
+def cache_list(server=None, dataset=None, basedir=None):
+  """Return list of data cache entries, most recently used last.
+
+  Each element is a dict with keys key, server, dataset, size, atime, and
+  hits (see cache_index_read()). Reads are only counted in atime and hits if
+  the cache_max_bytes option of hapi() was not None. If server and/or dataset are given, only
+  entries for them are listed. basedir is the cache directory (the cachedir
+  option of hapi(); cachedir() if None).
+  """
+
+  basedir = basedir or cachedir()
+  index = cache_index_read(basedir)
+  entries = [{'key': key, **index[key]} for key in _cache_select(index, server, dataset)]
+
+  return sorted(entries, key=lambda entry: entry['atime'])
+
+
+def cache_usage(server=None, dataset=None, basedir=None):
+  """Return total size in bytes of data cache entries (see cache_list())."""
+  return sum(entry['size'] for entry in cache_list(server, dataset, basedir))
+
+
+def cache_evict(max_bytes, policy='lru', basedir=None):
+  """Remove data cache entries until their total size is at most max_bytes.
+
+  policy is 'lru' to remove least recently used entries first or 'lfu' to
+  remove least frequently used entries first. Returns list of keys of
+  removed entries.
+  """
+
+  basedir = basedir or cachedir()
+  with _cache_index_lock:
+    index = cache_index_read(basedir)
+    removed = _cache_evict(basedir, index, max_bytes, policy)
+    _cache_index_write(basedir, index)
+
+  return removed
+
+
+def cache_clear(server=None, dataset=None, basedir=None):
+  """Remove data cache entries for server and dataset (all if None).
+
+  Returns list of keys of removed entries. Metadata files (/catalog, /info,
+  and /capabilities responses) are not removed.
+  """
+
+  basedir = basedir or cachedir()
+  with _cache_index_lock:
+    index = cache_index_read(basedir)
+    removed = _cache_select(index, server, dataset)
+    for key in removed:
+      _cache_remove(basedir, key, index.pop(key))
+    _cache_index_write(basedir, index)
+
+  return removed
@@ -1,25 +1,36 @@
 
-def capabilities(SERVER):
+def capabilities(SERVER, opts=None):
   """Return the capabilities of a HAPI server.
 
   Args:
     SERVER (str): The base URL of the HAPI server.
+    opts (dict): Options of hapi(); if given, responses are cached in
+      opts['cachedir'] (see hapiclient.cache.endpoint_cache_get()).
 
   Returns:
     dict: A dictionary containing the capabilities of the server.
+
+  Responses are cached in memory (see hapiclient.cache.MemoryCache).
   """
   from hapiclient.util import urlopen
+  from hapiclient.cache import metacache, endpoint_cache_get, _metacache_opts
+
+  def read():
+    if opts is None:
+      return urlopen(SERVER + '/capabilities', parse_json=True)
+    return endpoint_cache_get(SERVER, 'capabilities', opts)
 
-  caps = urlopen(SERVER + '/capabilities', parse_json=True)
+  caps = metacache.get(('capabilities', SERVER) + _metacache_opts(opts), read)
 
   return caps
 
 
-def get_format(SERVER, format):
+def get_format(SERVER, format, caps=None, opts=None):
   """Return the transport format to use, accounting for server capabilities.
 
   If the requested format is not supported by the server, falls back to 'csv'
-  with a warning.
+  with a warning. If caps is not given, the server's capabilities are
+  requested using capabilities(SERVER, opts).
   """
 
   from hapiclient.util import error, warning
@@ -30,7 +41,8 @@ def get_format(SERVER, format):
     error(msg % (format, ', '.join(cformats)))
 
   if format != 'csv':
-    caps = capabilities(SERVER)
+    if caps is None:
+      caps = capabilities(SERVER, opts)
     if "outputFormats" not in caps:
       return 'csv'
 
@@ -2,9 +2,20 @@ from hapiclient.log import log
 from hapiclient.util import urlopen
 
 
-def catalog(SERVER):
-  # TODO: Cache
-  url = SERVER + '/catalog'
-  meta = urlopen(url, parse_json=True)
+def catalog(SERVER, opts=None):
+  """Return the catalog of a HAPI server.
+
+  Responses are cached in memory (see hapiclient.cache.MemoryCache) and, if
+  opts is given, in opts['cachedir'] (see hapiclient.cache.endpoint_cache_get()).
+  """
+
+  from hapiclient.cache import metacache, endpoint_cache_get, _metacache_opts
+
+  def read():
+    if opts is None:
+      return urlopen(SERVER + '/catalog', parse_json=True)
+    return endpoint_cache_get(SERVER, 'catalog', opts)
+
+  meta = metacache.get(('catalog', SERVER) + _metacache_opts(opts), read)
 
   return meta
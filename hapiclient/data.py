@@ -1,15 +1,69 @@
 def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
 
+  from hapiclient.get import get_binary, get_csv
+
+  request = _data_request(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+  if request['result'] is not None:
+    return request['result']
+
+  meta = request['meta']
+  PARAMETERS = request['PARAMETERS']
+  STOP = request['STOP']
+
+  # Read the data. toc0 is time to download to file or into buffer;
+  # toc is time to parse.
+  if opts['format'] == 'binary':
+    data_result, toc0, toc = get_binary(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, res=request['response'])
+  else:
+    data_result, toc0, toc = get_csv(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, res=request['response'])
+
+  return _data_result(request, data_result, toc0, toc)
+
+
+def _data_output(result, opts):
+  """Return result of data() with data as the container given by opts['output'].
+
+  result is (data, meta) or, if opts['iterate'] is True, a generator of
+  (data, meta). Used by hapi(); data() returns NumPy arrays so that
+  chunks and cached segments can be combined.
+  """
+
+  from hapiclient.get import _output
+
+  if opts['output'] == 'numpy':
+    return result
+
+  if opts['iterate']:
+    return ((_output(data_chunk, opts), meta) for data_chunk, meta in result)
+
+  return _output(result[0], opts), result[1]
+
+
+def _data_request(SERVER, DATASET, PARAMETERS, START, STOP, opts, sync=True):
+  """Prepare a request for data; steps in data() before the data request.
+
+  Returns a dict with the arguments to data() (PARAMETERS and STOP may be
+  modified), meta, urld, and tic_totalTime. If the result could be
+  determined without a data request (e.g., from the cache), it is in
+  'result'; otherwise 'result' is None and opts['format'] is the format to
+  request. If the response to the data request was already received
+  because cached data were revalidated and found to be modified (see
+  data_cache_revalidate()), it is in 'response'.
+
+  If sync is False (used by hapiclient.aio), no requests for chunks or for
+  segments not in the cache are made. Instead, 'chunked' is True if the
+  request is to be split into chunks, or 'segments' is the list returned by
+  interval_index_segments(), and the caller requests them and then uses
+  _merge_segments() and, if it returns None, _data_format().
+  """
+
   import os
   import time
-  from datetime import datetime
 
   from hapiclient.log import log
-  from hapiclient.util import warning, subset_meta, unicode_check, fix_parameters, missing_length
-  from hapiclient.cache import cachedir, data_cache_read_metax, data_cache_read_npy, data_cache_write
-  from hapiclient.get import get_binary, get_csv
+  from hapiclient.util import subset_meta, unicode_check, fix_parameters
+  from hapiclient.cache import cachedir, data_cache_read_metax, data_cache_read_npy, data_cache_revalidate, interval_index_segments, _data_cache_format
   from hapiclient.info import info
-  from hapiclient.capabilities import get_format
 
   unicode_check(DATASET, PARAMETERS)
   PARAMETERS = fix_parameters(PARAMETERS)
@@ -26,6 +80,21 @@ def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
 
   tic_totalTime = time.time()
 
+  request = {
+    'SERVER': SERVER,
+    'DATASET': DATASET,
+    'PARAMETERS': PARAMETERS,
+    'START': START,
+    'STOP': STOP,
+    'opts': opts,
+    'urld': urld,
+    'tic_totalTime': tic_totalTime,
+    'result': None,
+    'chunked': False,
+    'segments': None,
+    'response': None
+  }
+
   meta = data_cache_read_metax(SERVER, DATASET, PARAMETERS, START, STOP, opts)
   metaFromCache = meta is not None
   if not metaFromCache:
@@ -38,28 +107,75 @@ def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
 
   if opts["cache"]:
     if not os.path.exists(urld):
-      os.makedirs(urld)
+      os.makedirs(urld, exist_ok=True)
 
   if opts['dt_chunk'] == 'infer':
     opts['dt_chunk'] = _dt_chunk_infer(meta, opts)
 
+  if opts['iterate'] or opts['n_chunks'] is not None or opts['dt_chunk'] is not None:
+    request['chunked'] = True
+    if not sync:
+      return request
+
+  if opts['iterate']:
+    request['result'] = _iter_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+    return request
+
   if opts['n_chunks'] is not None or opts['dt_chunk'] is not None:
-    chunk_result = _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime)
-    if chunk_result is not None:
-      return chunk_result
+    request['result'] = _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime)
+    return request
 
   if not metaFromCache:
     meta = subset_meta(meta, PARAMETERS)
 
+  request['meta'] = meta
+
   tic = time.time()
-  data_cached = data_cache_read_npy(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+  data_cached = None
+  fresh = True
+  if metaFromCache:
+    fresh, request['response'] = data_cache_revalidate(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts)
+  if fresh:
+    data_cached = data_cache_read_npy(SERVER, DATASET, PARAMETERS, START, STOP, opts)
   if data_cached is not None:
     meta['x_totalTime'] = time.time() - tic_totalTime
     meta['x_readTime'] = tic - tic_totalTime
     meta['x_downloadTime'] = 0
-    return data_cached, meta
+    request['result'] = (data_cached, meta)
+    return request
+
+  if request['response'] is not None:
+    # Response to the request that revalidated the cached data, which were
+    # modified, is used instead of requesting the data again.
+    opts['format'] = _data_cache_format(meta)
+    return request
+
+  # Use cached data for parts of the time range that are cached and only
+  # request the parts that are not.
+  segments = interval_index_segments(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+  if segments is not None:
+    if not sync:
+      request['segments'] = segments
+      return request
+    merged = _merge_segments(SERVER, DATASET, PARAMETERS, START, STOP, segments, meta, opts, tic_totalTime)
+    if merged is not None:
+      request['result'] = merged
+      return request
 
-  opts['format'] = get_format(SERVER, opts['format'])
+  _data_format(request)
+
+  return request
+
+
+def _data_format(request):
+  """Set request['opts']['format'] to the format to request for a request from _data_request()."""
+
+  from hapiclient.util import warning, missing_length
+  from hapiclient.capabilities import get_format
+
+  SERVER, meta, opts = request['SERVER'], request['meta'], request['opts']
+
+  opts['format'] = get_format(SERVER, opts['format'], opts=opts)
 
   # length attribute required for all parameters when serving binary but
   # is only required for time parameter when serving CSV. This catches
@@ -70,12 +186,33 @@ def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
     warning('Requesting CSV instead of binary because a string or isotime parameter is missing a length attribute.')
     opts['format'] = 'csv'
 
-  # Read the data. toc0 is time to download to file or into buffer;
-  # toc is time to parse.
-  if opts['format'] == 'binary':
-    data_result, toc0, toc = get_binary(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts)
-  else:
-    data_result, toc0, toc = get_csv(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts)
+
+def _data_result(request, data_result, toc0, toc):
+  """Return (data, meta) for a request from _data_request() given parsed data.
+
+  Updates meta and writes the result to the cache if opts['cache'] is True.
+  """
+
+  import time
+
+  from hapiclient.cache import data_cache_write
+
+  meta = request['meta']
+  args = (request['SERVER'], request['DATASET'], request['PARAMETERS'], request['START'], request['STOP'])
+
+  _meta_update(meta, *args, request['urld'], toc0, toc)
+
+  data_cache_write(data_result, meta, *args, request['opts'])
+
+  meta['x_totalTime'] = time.time() - request['tic_totalTime']
+
+  return data_result, meta
+
+
+def _meta_update(meta, SERVER, DATASET, PARAMETERS, START, STOP, urld, toc0, toc):
+  """Add information about a request to meta."""
+
+  from datetime import datetime
 
   # Extra metadata associated with request will be saved in
   # a pkl file with same base name as npy data file.
@@ -89,12 +226,6 @@ def data(SERVER, DATASET, PARAMETERS, START, STOP, opts):
   meta.update({"x_downloadTime": toc0})
   meta.update({"x_readTime": toc})
 
-  data_cache_write(data_result, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts)
-
-  meta['x_totalTime'] = time.time() - tic_totalTime
-
-  return data_result, meta
-
 
 def _dt_chunk_infer(meta, opts):
 
@@ -129,17 +260,93 @@ def _dt_chunk_infer(meta, opts):
     return 'P1Y'
 
 
-def _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime):
+def _merge_segments(SERVER, DATASET, PARAMETERS, START, STOP, segments, meta, opts, tic_totalTime, fetched=None):
+  """Return (data, meta) for a request by combining cached and requested segments.
 
-  import sys
+  segments is the list returned by interval_index_segments(). Cached
+  segments are read and trimmed, and if they have parameters that were not
+  requested, a view with only the parameters in meta is used. Segments not
+  cached are requested using data() unless they are in fetched, a dict
+  with keys of (start, stop) and values of (data, meta). If there is only one
+  segment, it is returned without a copy. Returns None if the segments could
+  not be combined.
+  """
+
+  import os
   import time
-  import isodate
   import numpy as np
 
-  from datetime import datetime, timedelta
-  from joblib import Parallel, delayed
+  from datetime import datetime
   from hapiclient.log import log
-  from hapiclient.hapitime import hapitime2datetime, hapitime_reformat
+  from hapiclient.cache import _read_npy, index_batch
+
+  names = [parameter['name'] for parameter in meta['parameters']]
+
+  resD = []
+  files = []
+  downloadTimes = []
+  # Cache index files are written once for all segments.
+  batch = index_batch(opts)
+  try:
+    for start, stop, fnamenpy in segments:
+      if fnamenpy is None:
+        if fetched is not None and (start, stop) in fetched:
+          data_segment, meta_segment = fetched[(start, stop)]
+        else:
+          log('Requesting segment not in cache: %s/%s' % (start, stop))
+          data_segment, meta_segment = data(SERVER, DATASET, PARAMETERS, start, stop, opts.copy())
+        downloadTimes.append(meta_segment['x_downloadTime'])
+        files.append(meta_segment['x_dataFileParsed'])
+      else:
+        log('Using segment %s/%s from %s' % (start, stop, os.path.basename(fnamenpy)))
+        data_segment = _read_npy(fnamenpy, opts)
+        if _names(data_segment) != names:
+          # Cached request has more parameters than requested.
+          data_segment = _select(data_segment, names)
+        data_segment = _trim(data_segment, start, stop)
+        files.append(fnamenpy)
+      resD.append(data_segment)
+  finally:
+    batch.close()
+
+  tic_catTime = time.time()
+  if len(resD) == 1:
+    data_merged = resD[0]
+  else:
+    try:
+      data_merged = _concatenate(resD)
+    except Exception as e:
+      log('Could not combine cached segments: %s' % e)
+      return None
+  catTime = time.time() - tic_catTime
+
+  meta.update({"x_parameters": PARAMETERS})
+  meta.update({"x_time.min": START})
+  meta.update({"x_time.max": STOP})
+  meta.update({"x_requestDate": datetime.now().isoformat()[0:19]})
+  meta['x_dataFile'] = None
+  meta['x_dataFileParsed'] = None
+  meta['x_dataFilesParsed'] = files
+  meta['x_downloadTime'] = sum(downloadTimes)
+  meta['x_catTime'] = catTime
+  meta['x_totalTime'] = time.time() - tic_totalTime
+  meta['x_readTime'] = meta['x_totalTime'] - meta['x_downloadTime']
+
+  return data_merged, meta
+
+
+def _chunk_plan(START, STOP, opts):
+  """Return (pSTART, pDELTA, n_chunks) for a chunked request.
+
+  Returns None if the time range is too short for chunking based on
+  opts['dt_chunk']. In all cases, opts['n_chunks'] and opts['dt_chunk'] are
+  set to None so that requests for individual chunks are not chunked.
+  """
+
+  import isodate
+
+  from datetime import datetime, timedelta
+  from hapiclient.hapitime import hapitime2datetime
 
   def padz(value):
     return value if 'Z' in value else value + 'Z'
@@ -160,7 +367,7 @@ def _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime):
     if (pSTOP - pSTART) < half:
       opts['n_chunks'] = None
       opts['dt_chunk'] = None
-      return data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+      return None
 
     if opts['dt_chunk'] == 'P1Y':
       pSTART = datetime(pSTART.year, 1, 1)
@@ -186,86 +393,517 @@ def _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime):
   opts['n_chunks'] = None
   opts['dt_chunk'] = None
 
-  backend = 'sequential'
-  if opts['parallel']:
-    # Note that this does not often lead to significant speed-up.
-    # Needs further testing and optimization.
-    backend = 'threading'
-    # multiprocessing not working.
-    #backend = 'multiprocessing'
-    # loky works, but not speed-up.
-    #backend = 'loky'
-
-  log('backend = {}'.format(backend))
-
-  verbose = 0
-  if opts.get('logging'):
-    verbose = 100
-
-  def nhapi(SERVER, DATASET, PARAMETERS, pSTART, pDELTA, i, **opts):
-    START = pSTART + (i * pDELTA)
-    START = str(START.date())+'T'+str(START.time())
-
-    STOP = pSTART + ((i + 1) * pDELTA)
-    STOP = str(STOP.date()) + 'T' + str(STOP.time())
-
-    data_chunk, meta = data(
-        SERVER,
-        DATASET,
-        PARAMETERS,
-        START,
-        STOP,
-        opts
-    )
-    return data_chunk, meta
-
-  resD, resM = zip(
-    *Parallel(n_jobs=opts['n_parallel'], verbose=verbose, backend=backend)(
-      delayed(nhapi)(
-          SERVER,
-          DATASET,
-          PARAMETERS,
-          pSTART,
-          pDELTA,
-          i,
-          **opts
-      ) for i in range(n_chunks)
-    )
-  )
-
-  resD = list(resD)
-
-  tic_trimTime = time.time()
-  if sys.version_info < (3, ):
-    START = hapitime_reformat(str(resD[0]['Time'][0]), START)
-    resD[0] = resD[0][resD[0]['Time'] >= START]
-
-    STOP = hapitime_reformat(str(resD[-1]['Time'][0]), STOP)
-    resD[-1] = resD[-1][resD[-1]['Time'] < STOP]
-  else:
-    START = hapitime_reformat(resD[0]['Time'][0].decode('UTF-8'), START)
-    resD[0] = resD[0][resD[0]['Time'] >= bytes(START, 'UTF-8')]
+  return pSTART, pDELTA, n_chunks
 
-    STOP = hapitime_reformat(resD[-1]['Time'][0].decode('UTF-8'), STOP)
-    resD[-1] = resD[-1][resD[-1]['Time'] < bytes(STOP, 'UTF-8')]
-  trimTime = time.time() - tic_trimTime
 
-  tic_catTime = time.time()
-  data_concat = np.concatenate(resD)
-  catTime = time.time() - tic_catTime
+def _chunk_interval(pSTART, pDELTA, i):
+  """Return (START, STOP) strings for chunk i."""
 
-  meta = resM[0].copy()
-  meta['x_time.max'] = resM[-1]['x_time.max']
-  meta['x_dataFile'] = None
-  meta['x_dataFiles'] = [resM[i]['x_dataFile'] for i in range(len(resM))]
-  meta['x_downloadTime'] = sum([resM[i]['x_downloadTime'] for i in range(len(resM))])
-  meta['x_downloadTimes'] = [resM[i]['x_downloadTime'] for i in range(len(resM))]
-  meta['x_readTime'] = sum([resM[i]['x_readTime'] for i in range(len(resM))])
-  meta['x_readTimes'] = [resM[i]['x_readTime'] for i in range(len(resM))]
-  meta['x_trimTime'] = trimTime
-  meta['x_catTime'] = catTime
-  meta['x_totalTime'] = time.time() - tic_totalTime
-  meta['x_dataFileParsed'] = None
-  meta['x_dataFilesParsed'] = [resM[i]['x_dataFileParsed'] for i in range(len(resM))]
+  START = pSTART + (i * pDELTA)
+  START = str(START.date()) + 'T' + str(START.time())
+
+  STOP = pSTART + ((i + 1) * pDELTA)
+  STOP = str(STOP.date()) + 'T' + str(STOP.time())
+
+  return START, STOP
+
+
+def _trim(data, START=None, STOP=None):
+  """Return view of records with START <= Time (if given) and Time < STOP (if given).
+
+  Time may be HAPI time strings or any of the time_format conversions
+  (see hapi()); START and STOP are HAPI time strings.
+  """
+
+  from hapiclient.hapitime import hapitime_slice
+
+  if _length(data) == 0:
+    return data
+
+  return _take(data, hapitime_slice(data[_names(data)[0]], START, STOP))
+
+
+# Functions for data as a structured array or, if opts['layout'] is
+# 'columnar', a dict of arrays.
+
+def _names(data):
+  """List of parameter names in data."""
+  if isinstance(data, dict):
+    return list(data)
+  return list(data.dtype.names)
+
+
+def _length(data):
+  """Number of records in data."""
+  if isinstance(data, dict):
+    return len(next(iter(data.values())))
+  return len(data)
+
+
+def _take(data, index):
+  """Records of data selected by index (e.g., a slice)."""
+  if isinstance(data, dict):
+    return {name: column[index] for name, column in data.items()}
+  return data[index]
+
+
+def _select(data, names):
+  """Parameters of data with the given names."""
+  if isinstance(data, dict):
+    return {name: data[name] for name in names}
+  return data[names]
+
+
+def _concatenate(resD):
+  """Concatenate records in list of data."""
+
+  import numpy as np
+
+  if isinstance(resD[0], dict):
+    return {name: np.concatenate([d[name] for d in resD]) for name in resD[0]}
+  return np.concatenate(resD)
+
+
+def _iter_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts):
+  """Generator that yields (data, meta) for each chunk in time order.
+
+  The first and last chunks are trimmed so that records are in the
+  interval [START, STOP). If the request is not split into chunks, a single
+  (data, meta) is yielded.
+  """
+
+  from hapiclient.log import log
+
+  opts = opts.copy()
+  opts['iterate'] = False
+
+  plan = None
+  if opts['n_chunks'] is not None or opts['dt_chunk'] is not None:
+    plan = _chunk_plan(START, STOP, opts)
+
+  if plan is None:
+    yield data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+    return
+
+  pSTART, pDELTA, n_chunks = plan
+  for i in range(n_chunks):
+    log('Requesting chunk {} of {}'.format(i + 1, n_chunks))
+    START_i, STOP_i = _chunk_interval(pSTART, pDELTA, i)
+    data_chunk, meta = data(SERVER, DATASET, PARAMETERS, START_i, STOP_i, opts.copy())
+    data_chunk = _trim(data_chunk,
+                       START if i == 0 else None,
+                       STOP if i == n_chunks - 1 else None)
+    yield data_chunk, meta
+
+
+def _get_chunks(SERVER, DATASET, PARAMETERS, START, STOP, opts, tic_totalTime):
+
+  from hapiclient.log import log
+  from hapiclient.cache import index_batch
+
+  plan = _chunk_plan(START, STOP, opts)
+  if plan is None:
+    return data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
+
+  pSTART, pDELTA, n_chunks = plan
+
+  chunks = _ChunkBuffer(n_chunks, START, STOP, outfile=opts['outfile'])
+
+  # Cache index files are written once for all chunks.
+  batch = index_batch(opts)
+  try:
+    if opts['parallel']:
+      _get_chunks_pipelined(SERVER, DATASET, PARAMETERS, pSTART, pDELTA, n_chunks, opts, chunks)
+    else:
+      for i in range(n_chunks):
+        log('Requesting chunk {} of {}'.format(i + 1, n_chunks))
+        START_i, STOP_i = _chunk_interval(pSTART, pDELTA, i)
+        chunks.add(i, *data(SERVER, DATASET, PARAMETERS, START_i, STOP_i, opts.copy()))
+  finally:
+    batch.close()
+
+  return chunks.result(tic_totalTime)
+
+
+def _get_chunks_pipelined(SERVER, DATASET, PARAMETERS, pSTART, pDELTA, n_chunks, opts, chunks):
+  """Add data and meta for each chunk to chunks using a download and a parse stage.
+
+  Up to n_parallel chunks are downloaded at a time by threads in the download
+  stage, where n_parallel is the smaller of opts['n_parallel'] and
+  opts['n_parallel_server'][SERVER] (if given). If opts['adaptive'] is True,
+  the number of downloads at a time starts at one and is adjusted by
+  _Concurrency. As each download finishes, the chunk is parsed by a thread
+  in the parse stage while other chunks are downloaded, so that the total
+  time is close to the larger of the download and parse times instead of
+  their sum. Downloads wait when 2*n_parallel chunks have been started but not
+  parsed, which bounds the memory used for responses held in buffers when
+  cache=False. chunks is a _ChunkBuffer; each chunk is added to it when
+  parsed.
+
+  If the server still responds to a chunk request with HTTP status 429 or 503
+  after the retries of hapiclient.util.urlopen(), the number of downloads at
+  a time is halved (see _Concurrency.throttle()) and the chunk is requested
+  again, up to opts['pool']['retries'] times.
+  """
+
+  import os
+  import time
+  from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+  from hapiclient.log import log
+  from hapiclient.util import error, retry_wait
+  from hapiclient.get import get_response, parse_response
+
+  n_download = min(opts['n_parallel'], opts['n_parallel_server'].get(SERVER, opts['n_parallel']))
+  n_parse = max(1, min(n_download, os.cpu_count() or 1))
+  n_pending = 2 * n_download  # Chunks started but not parsed.
+
+  concurrency = _Concurrency(n_download, adaptive=opts['adaptive'])
+
+  log('Using up to {} download and {} parse threads'.format(n_download, n_parse))
+
+  def download(i):
+    START, STOP = _chunk_interval(pSTART, pDELTA, i)
+    if attempts.get(i, 0) > 0:
+      time.sleep(retry_wait(attempts[i] + 1))
+    request = _data_request(SERVER, DATASET, PARAMETERS, START, STOP, opts.copy())
+    if request['result'] is None:
+      log('Downloading chunk {} of {}'.format(i + 1, n_chunks))
+      meta, opts_i = request['meta'], request['opts']
+      request['response'] = get_response(meta, SERVER, DATASET, request['PARAMETERS'], START, request['STOP'], opts_i,
+                                         res=request['response'])
+    return request
+
+  def parse(request):
+    if request['result'] is not None:
+      return request['result']
+    source, url, toc0, _ = request['response']
+    tic = time.time()
+    data_chunk = parse_response(source, request['meta'], request['opts'], url)
+    return _data_result(request, data_chunk, toc0, time.time() - tic)
+
+  stage = {}     # future => (stage, chunk index)
+  attempts = {}  # chunk index => number of times requested again
+  again = []     # indices of chunks to request again
+  started = 0
+  finished = 0
+  downloading = 0
+
+  with ThreadPoolExecutor(n_download) as downloaders, ThreadPoolExecutor(n_parse) as parsers:
+    try:
+      while finished < n_chunks:
+        while (again or started < n_chunks) and started - finished < n_pending and downloading < concurrency.limit:
+          if again:
+            i = again.pop(0)
+          else:
+            i = started
+            started = started + 1
+          stage[downloaders.submit(download, i)] = ('download', i)
+          downloading = downloading + 1
+        done, _ = wait(stage, return_when=FIRST_COMPLETED)
+        for future in done:
+          name, i = stage.pop(future)
+          if name == 'download':
+            downloading = downloading - 1
+            request = future.result()
+            if request['result'] is None:
+              source, url, toc0, throttled = request['response']
+              if source is None:
+                attempts[i] = attempts.get(i, 0) + 1
+                if attempts[i] > opts['pool']['retries']:
+                  error('Server responded with HTTP status 429 or 503 for {} after {} attempts'.format(url, attempts[i]))
+                concurrency.throttle()
+                again.append(i)
+                continue
+              nbytes = os.path.getsize(source) if isinstance(source, str) else len(source)
+              concurrency.update(toc0, nbytes, throttled)
+            stage[parsers.submit(parse, request)] = ('parse', i)
+          else:
+            chunks.add(i, *future.result())
+            finished = finished + 1
+    except BaseException:
+      for future in stage:
+        future.cancel()
+      raise
+
+
+class _Concurrency:
+  """Number of downloads to make at a time.
+
+  If adaptive is False, limit is ceiling. Otherwise, limit starts at one and is
+  adjusted using additive increase/multiplicative decrease after each window
+  of `limit` completed downloads:
+
+  * if the throughput (bytes per second) in the window is larger than in the
+    previous window, limit is increased by one, up to ceiling;
+  * if the throughput decreased and the mean download time in the window is
+    more than twice the shortest mean seen, limit is halved.
+
+  limit is also halved immediately when a download was retried because the
+  server responded with HTTP status 429 or 503. throttle() halves limit even
+  if adaptive is False; it is used when the server still responded with 429
+  or 503 after retries.
+  """
+
+  def __init__(self, ceiling, adaptive=True):
+    self.ceiling = ceiling
+    self.adaptive = adaptive
+    self.limit = 1 if adaptive else ceiling
+    self.throughput = None
+    self.latency = None
+    self._window()
+
+  def _window(self):
+    import time
+    self.tic = time.time()
+    self.n = 0
+    self.nbytes = 0
+    self.seconds = 0
+
+  def _set(self, limit, reason):
+    from hapiclient.log import log
+    limit = max(1, min(self.ceiling, limit))
+    if limit != self.limit:
+      log('Changing number of parallel downloads from {} to {}: {}'.format(self.limit, limit, reason))
+    self.limit = limit
+    self._window()
+
+  def throttle(self):
+    """Halve limit because the server responded with HTTP 429 or 503."""
+    self.throughput = None
+    self._set(self.limit // 2, 'server responded with HTTP 429 or 503')
+
+  def update(self, seconds, nbytes, throttled):
+    """Update limit given the time and size of a completed download."""
+
+    import time
+
+    if not self.adaptive:
+      return
+
+    if throttled:
+      self.throttle()
+      return
+
+    self.n = self.n + 1
+    self.nbytes = self.nbytes + nbytes
+    self.seconds = self.seconds + seconds
+    if self.n < self.limit:
+      return
+
+    throughput = self.nbytes / max(time.time() - self.tic, 1e-6)
+    latency = self.seconds / self.n
+    if self.latency is None or latency < self.latency:
+      self.latency = latency
+
+    throughput_last = self.throughput
+    self.throughput = throughput
+    if throughput_last is None or throughput > throughput_last:
+      self._set(self.limit + 1, 'throughput increased to {:.0f} bytes/s'.format(throughput))
+    elif latency > 2 * self.latency:
+      self._set(self.limit // 2, 'mean download time increased to {:.3f} s'.format(latency))
+    else:
+      self._window()
+
+
+# Maximum number of chunks that the first allocation of the output array of
+# a _ChunkBuffer is sized for.
+_chunk_buffer_chunks = 4
+
+
+class _ChunkBuffer:
+  """Copies data for the chunks of a request into one array as they are added.
+
+  Chunks may be added in any order using add(). When a chunk and all chunks
+  before it have been added, its records are copied to the output array and
+  the chunk is released, so only the output array and chunks added ahead of
+  order are held in memory instead of all chunks and their concatenation.
+  The first chunk is trimmed so that records have Time >= START and the last
+  so that records have Time < STOP.
+
+  The output array is allocated when the first records are copied, with a
+  length estimated from the number of records in the chunk for at most
+  _chunk_buffer_chunks chunks, as the number of records in a chunk may vary
+  greatly (e.g., for a dataset with gaps). Its length is increased by a
+  factor of 1.5 when needed and truncated in result(). If outfile is given, the output array is a .npy file that is
+  memory-mapped, so it may be larger than memory. If chunks are dicts of
+  arrays (layout='columnar'), an output array is used for each parameter;
+  outfile is not supported in this case.
+  """
+
+  def __init__(self, n_chunks, START, STOP, outfile=None):
+    self.n_chunks = n_chunks
+    self.START = START
+    self.STOP = STOP
+    self.outfile = outfile
+    self.resM = [None] * n_chunks
+    self.pending = {}  # chunk index => data for chunks added ahead of order
+    self.next = 0      # index of next chunk to copy
+    self.n = 0         # number of records copied
+    self.size = 0      # number of records allocated
+    self.out = None    # parameter name (None if not columnar) => output array
+    self.empty = None  # data for last chunk if no records copied
+    self.trimTime = 0
+
+  def add(self, i, data, meta):
+    """Add data and meta for chunk i."""
+
+    self.resM[i] = meta
+    self.pending[i] = data
+    while self.next in self.pending:
+      self._copy(self.pending.pop(self.next))
+      self.next = self.next + 1
+
+  def _copy(self, data):
+
+    import time
+    import numpy as np
+
+    i = self.next
+    n_data = _length(data)
+
+    tic = time.time()
+    data = _trim(data,
+                 self.START if i == 0 else None,
+                 self.STOP if i == self.n_chunks - 1 else None)
+    self.trimTime = self.trimTime + time.time() - tic
+
+    n = _length(data)
+    if n == 0:
+      if self.out is None:
+        self.empty = data
+      return
+
+    if self.out is None:
+      self.out = {}
+      n_estimate = min(self.n_chunks - i, _chunk_buffer_chunks)
+      self.size = int(1.05 * n_data * n_estimate) + 1
+    elif self.n + n > self.size:
+      self._resize(max(int(1.5 * self.size), self.n + n))
+
+    columns = data.items() if isinstance(data, dict) else [(None, data)]
+    for name, column in columns:
+      if name not in self.out:
+        self._allocate(name, column.dtype, column.shape[1:])
+      elif column.dtype != self.out[name].dtype:
+        # E.g., a string parameter with a different length in a CSV response.
+        self._allocate(name, np.promote_types(self.out[name].dtype, column.dtype), column.shape[1:])
+      self.out[name][self.n:self.n + n] = column
+    self.n = self.n + n
+
+  def _allocate(self, name, dtype, shape):
+    """Allocate output array; records already copied are copied to it."""
+
+    import os
+    import numpy as np
+
+    old = self.out.get(name, None)
+
+    if self.outfile is None:
+      out = np.empty((self.size,) + shape, dtype=dtype)
+    else:
+      self.offset = _npy_header_size(dtype)
+      path = self.outfile + '.part' + ('' if old is None else '2')
+      out = np.memmap(path, dtype=dtype, mode='w+', offset=self.offset, shape=(self.size,))
+
+    if old is not None:
+      out[:self.n] = old[:self.n]
+      if self.outfile is not None:
+        out.flush()
+        del out, old
+        self.out[name] = None
+        os.replace(self.outfile + '.part2', self.outfile + '.part')
+        out = np.memmap(self.outfile + '.part', dtype=dtype, mode='r+', offset=self.offset, shape=(self.size,))
+
+    self.out[name] = out
+
+  def _resize(self, size):
+
+    import numpy as np
+
+    self.size = size
+    for name, out in self.out.items():
+      if self.outfile is None:
+        # No other references to out exist, so it can be resized in place.
+        out.resize((size,) + out.shape[1:], refcheck=False)
+      else:
+        dtype = out.dtype
+        out.flush()
+        del out
+        self.out[name] = None
+        # The file is extended when opened with a larger shape.
+        self.out[name] = np.memmap(self.outfile + '.part', dtype=dtype, mode='r+', offset=self.offset, shape=(size,))
+
+  def result(self, tic_totalTime):
+    """Return (data, meta) after all chunks have been added."""
+
+    import os
+    import time
+    import numpy as np
+
+    resM = self.resM
+
+    tic_catTime = time.time()
+    if self.out is None:
+      data_concat = self.empty
+      if self.outfile is not None:
+        np.save(self.outfile, data_concat, allow_pickle=False)
+        data_concat = np.load(self.outfile, mmap_mode='r')
+    elif self.outfile is None:
+      for out in self.out.values():
+        out.resize((self.n,) + out.shape[1:], refcheck=False)
+      data_concat = self.out[None] if None in self.out else self.out
+    else:
+      dtype = self.out[None].dtype
+      self.out[None].flush()
+      self.out[None] = None
+      with open(self.outfile + '.part', 'r+b') as f:
+        f.write(_npy_header(dtype, self.n, self.offset))
+        f.truncate(self.offset + self.n * dtype.itemsize)
+      os.replace(self.outfile + '.part', self.outfile)
+      data_concat = np.load(self.outfile, mmap_mode='r')
+    self.out = None
+    catTime = time.time() - tic_catTime
+
+    meta = resM[0].copy()
+    meta['x_time.max'] = resM[-1]['x_time.max']
+    meta['x_dataFile'] = None
+    meta['x_dataFiles'] = [resM[i]['x_dataFile'] for i in range(len(resM))]
+    meta['x_downloadTime'] = sum([resM[i]['x_downloadTime'] for i in range(len(resM))])
+    meta['x_downloadTimes'] = [resM[i]['x_downloadTime'] for i in range(len(resM))]
+    meta['x_readTime'] = sum([resM[i]['x_readTime'] for i in range(len(resM))])
+    meta['x_readTimes'] = [resM[i]['x_readTime'] for i in range(len(resM))]
+    meta['x_trimTime'] = self.trimTime
+    meta['x_catTime'] = catTime
+    meta['x_totalTime'] = time.time() - tic_totalTime
+    meta['x_dataFileParsed'] = None
+    meta['x_dataFilesParsed'] = [resM[i]['x_dataFileParsed'] for i in range(len(resM))]
+    if self.outfile is not None:
+      meta['x_dataFileParsed'] = self.outfile
+
+    return data_concat, meta
+
+
+def _npy_header_size(dtype):
+  """Size of a .npy header that can describe a 1-D array of dtype of any length."""
+  return len(_npy_header(dtype, 10**19, 0))
+
+
+def _npy_header(dtype, n, size):
+  """.npy (version 1.0) header for a 1-D array of n elements of dtype.
+
+  The header is padded with spaces to size bytes or, if size is too small, to
+  a multiple of 64 bytes.
+  """
+
+  import struct
+  import numpy as np
+
+  d = {'descr': np.lib.format.dtype_to_descr(dtype), 'fortran_order': False, 'shape': (n,)}
+  header = repr(d)
+  pad = size - 10 - len(header) - 1
+  if pad < 0:
+    pad = -(10 + len(header) + 1) % 64
+  header = header + ' ' * pad + '\n'
 
-  return data_concat, meta
+  return np.lib.format.magic(1, 0) + struct.pack('<H', len(header)) + header.encode('latin1')
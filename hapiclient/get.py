@@ -7,8 +7,9 @@ import pandas
 import numpy as np
 
 from hapiclient.log import log
-from hapiclient.util import error, urlopen, urlretrieve, query_name, missing_length
+from hapiclient.util import error, urlopen, query_name, missing_length, throttled
 from hapiclient.cache import data_cache_paths
+from hapiclient.hapitime import hapitime2datetime64
 
 
 def _compute_dt(meta, opts):
@@ -84,36 +85,39 @@ def _compute_dt(meta, opts):
   return dt, cols, psizes, pnames, ptypes
 
 
-def get_binary(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts):
+def data_url(meta, SERVER, DATASET, PARAMETERS, START, STOP, format):
+  """Return URL for a HAPI /data request with given format ('csv' or 'binary')."""
 
-  fnamebin = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'])['bin']
+  url = (SERVER + '/data?' + query_name(meta, 'dataset') + '=' + DATASET
+         + '&parameters=' + PARAMETERS
+         + '&' + query_name(meta, 'start') + '=' + START
+         + '&' + query_name(meta, 'stop') + '=' + STOP)
 
-  urlcsv = (SERVER + '/data?' + query_name(meta, 'dataset') + '=' + DATASET
-            + '&parameters=' + PARAMETERS
-            + '&' + query_name(meta, 'start') + '=' + START
-            + '&' + query_name(meta, 'stop') + '=' + STOP)
-  urlbin = urlcsv + '&format=binary'
+  if format == 'binary':
+    url = url + '&format=binary'
 
-  if opts['method'] != '':
-    warnings.warn("Method argument is ignored when format='binary.")
+  return url
 
+
+def get_binary(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, res=None):
+  # res is the response if the request was already made.
+
+  urlbin = data_url(meta, SERVER, DATASET, PARAMETERS, START, STOP, 'binary')
+
+  tic0 = time.time()
+  if res is None:
+    res = urlopen(urlbin)
   if opts["cache"]:
-    tic0 = time.time()
-    urlretrieve(urlbin, fnamebin)
-    toc0 = time.time() - tic0
-    log('Reading and parsing %s' % os.path.basename(fnamebin))
-    tic = time.time()
-    data = _parse_binary(fnamebin, meta, opts, urlbin)
+    source = _cache_response(res, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, urlbin)
   else:
-    from io import BytesIO
-    log('Writing %s to buffer' % urlbin)
-    tic0 = time.time()
-    buff = BytesIO(urlopen(urlbin).read())
-    toc0 = time.time() - tic0
-    log('Parsing BytesIO buffer.')
-    tic = time.time()
-    data = _parse_binary(buff, meta, opts, urlbin)
+    source = res
+  toc0 = time.time() - tic0
+  _response_headers(meta, res)
 
+  if not isinstance(source, str):
+    log('Reading and parsing response in blocks of records.')
+  tic = time.time()
+  data = parse_response(source, meta, opts, urlbin)
   toc = time.time() - tic
 
   return data, toc0, toc
@@ -123,6 +127,7 @@ def _parse_binary(source, meta, opts, urlbin):
   dt, _, _, _, _ = _compute_dt(meta, opts)
   # Handle Unicode strings (since HAPI 3.1)
   dto = []
+  unicode = []  # Indices of parameters that need to be decoded
   for i in range(len(dt)):
     dto.append(dt[i])
     if isinstance(dt[i][1], str) and dt[i][1][0] == 'U' and meta['parameters'][i]['type'] == 'string':
@@ -131,81 +136,493 @@ def _parse_binary(source, meta, opts, urlbin):
       dt[i] = list(dt[i])
       dt[i][1] = dt[i][1].replace('U', 'S')
       dt[i] = tuple(dt[i])
+      unicode.append(i)
+
+  columnar = opts['layout'] == 'columnar'
 
   try:
     if isinstance(source, str):
-      data = np.fromfile(source, dtype=dt)
+      if opts['mmap'] and len(unicode) == 0 and not columnar and os.path.getsize(source) > 0:
+        # Array read from file is returned, so it can be memory-mapped.
+        log('Memory-mapping %s' % os.path.basename(source))
+        data = np.memmap(source, dtype=dt, mode='r')
+      elif columnar and os.path.getsize(source) > 0:
+        # Records are only read to copy each parameter to a column, so
+        # they do not need to be read into memory first.
+        data = np.memmap(source, dtype=dt, mode='r')
+      else:
+        data = np.fromfile(source, dtype=dt)
     else:
-      data = np.frombuffer(source.read(), dtype=dt)
+      data = _read_binary_blocks(source, np.dtype(dt))
   except Exception as e:
     error('Malformed response? Could not read {}: {}'.format(urlbin, e))
 
-  # Handle Unicode
-  time_name = meta['parameters'][0]['name']
-  datanew = np.ndarray(shape=data[time_name].shape, dtype=dto)
-  for i in range(0, len(dto)):
-    name = meta['parameters'][i]['name']
-    if sys.version_info[0] < 3:
-      # str() here is needed for Python 2.7. Numpy does not allow
-      # Unicode names in this version and if a dt is created
-      # with Unicode, it automatically converts Unicode chars to
-      # slash encoded ASCII.
-      name = str(name)
-    if data[name].size > 0 and isinstance(dt[i][1], str) and 'U' in dto[i][1]:
-      # Decode data.
-      datanew[name] = np.char.decode(data[name])
-    else:
-      datanew[name] = data[name]
+  convert_time = opts['time_format'] != 'bytes'
+  if convert_time:
+    dto[0] = (dto[0][0], _time_dtypes[opts['time_format']])
+
+  if len(unicode) == 0 and not convert_time and not columnar:
+    # No string parameters to decode, so the array read is the result.
+    return data
+
+  # Handle Unicode, time conversion, and columnar layout. A new array is
+  # needed because the itemsize of a decoded string or converted time field
+  # differs from that of the S field read.
+  datanew = _empty(len(data), dto, opts)
+
+  # Fields are copied for blocks of records that fit in the CPU cache so
+  # that records are read from memory once instead of once per field.
+  nblock = max(1, 2**22 // data.dtype.itemsize)
+  for j in range(0, len(data), nblock):
+    block = data[j:j + nblock]
+    for i in range(0, len(dto)):
+      name = meta['parameters'][i]['name']
+      if sys.version_info[0] < 3:
+        # str() here is needed for Python 2.7. Numpy does not allow
+        # Unicode names in this version and if a dt is created
+        # with Unicode, it automatically converts Unicode chars to
+        # slash encoded ASCII.
+        name = str(name)
+      if i in unicode:
+        # Decode data.
+        datanew[name][j:j + nblock] = np.char.decode(block[name])
+      elif i == 0 and convert_time:
+        datanew[name][j:j + nblock] = _time_convert(block[name], opts['time_format'])
+      else:
+        datanew[name][j:j + nblock] = block[name]
 
   return datanew
 
 
-def get_csv(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts):
-  # HAPI CSV
-  fnamecsv = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'])['csv']
+def _empty(n, dt, opts):
+  """Return array for n records with dtype dt to be filled by a parser.
+
+  If opts['layout'] is 'columnar', a dict with a contiguous array for each
+  field of dt is returned instead of a structured array. Fields are filled
+  the same way for both using data[name][...] = values.
+  """
 
-  urlcsv = (SERVER + '/data?' + query_name(meta, 'dataset') + '=' + DATASET
-            + '&parameters=' + PARAMETERS
-            + '&' + query_name(meta, 'start') + '=' + START
-            + '&' + query_name(meta, 'stop') + '=' + STOP)
+  dt = np.dtype(dt)
+  if opts['layout'] == 'columnar':
+    return {name: np.empty(n, dtype=dt[name]) for name in dt.names}
 
-  file_empty = False
+  return np.ndarray(shape=(n,), dtype=dt)
+
+
+def _columns(data):
+  """Return dict with a contiguous copy of each field of structured array data."""
+
+  if isinstance(data, dict):
+    return data
+
+  return {name: np.ascontiguousarray(data[name]) for name in data.dtype.names}
+
+
+def _output(data, opts):
+  """Return data as a pandas.DataFrame or pyarrow.Table if opts['output'] is 'pandas' or 'arrow'.
+
+  The arrays for numeric and time parameters are used by the DataFrame or
+  Table without a copy if data is a dict of contiguous arrays (i.e., it
+  was parsed with opts['layout'] = 'columnar').
+  """
+
+  if opts['output'] == 'pandas':
+    return _dataframe(_columns(data))
+  if opts['output'] == 'arrow':
+    return _table(_columns(data))
+
+  return data
 
+
+def _dataframe(columns):
+  """Return DataFrame with a column for each array in dict columns.
+
+  An array with more than one dimension (a parameter with a size) is a
+  column for each element, with names of name_i for size=[N], name_i_j for
+  size=[N, M], etc. The columns are views of the array.
+  """
+
+  frame = {}
+  for name, column in columns.items():
+    if column.ndim == 1:
+      frame[name] = column
+      continue
+    for index in np.ndindex(column.shape[1:]):
+      frame[name + ''.join('_%d' % i for i in index)] = column[(slice(None),) + index]
+
+  # With copy=False, columns are not consolidated into 2-D blocks, which
+  # would copy them.
+  return pandas.DataFrame(frame, copy=False)
+
+
+def _table(columns):
+  """Return pyarrow Table with a column for each array in dict columns.
+
+  An array with more than one dimension (a parameter with a size) is a
+  fixed-size list column (nested for size=[N, M], etc.). datetime64 arrays
+  are timestamp columns with a UTC time zone.
+  """
+
+  import pyarrow
+
+  arrays = {}
+  for name, column in columns.items():
+    array = pyarrow.array(column.reshape(-1))
+    if column.dtype.kind == 'M':
+      array = array.cast(pyarrow.timestamp(array.type.unit, tz='UTC'))
+    for n in reversed(column.shape[1:]):
+      array = pyarrow.FixedSizeListArray.from_arrays(array, n)
+    arrays[name] = array
+
+  return pyarrow.table(arrays)
+
+
+def _read_binary_blocks(source, dt, blocksize=2**20):
+  """Read records from file-like object source into an array with dtype dt.
+
+  Reads are made in blocks of whole records of about blocksize bytes directly
+  into the memory of the returned array, so the response is never held in a
+  separate bytes object. If source has a Content-Length header (i.e., it is a
+  urllib3 response), the array is allocated once with the final size.
+  Otherwise, its size is doubled when full and truncated after the last read.
+  """
+
+  reclen = dt.itemsize
+  nblock = max(1, blocksize // reclen) * reclen  # Bytes per read
+
+  length = None
+  headers = getattr(source, 'headers', {})
+  if 'Content-Length' in headers and 'Content-Encoding' not in headers:
+    # With Content-Encoding, Content-Length is the compressed length.
+    length = int(headers['Content-Length'])
+    if length % reclen != 0:
+      raise ValueError('Response length of {} bytes is not a multiple of record length of {} bytes'.format(length, reclen))
+
+  data = np.empty(length // reclen if length is not None else nblock // reclen, dtype=dt)
+  nbytes = 0
+  while True:
+    if nbytes == data.nbytes:
+      if length is not None and nbytes == length:
+        break
+      # Geometric growth so number of reallocations is O(log(N)).
+      data.resize(max(2 * len(data), nblock // reclen), refcheck=False)
+    with memoryview(data.view(np.uint8)) as buff:
+      nread = source.readinto(buff[nbytes:min(nbytes + nblock, data.nbytes)])
+    if not nread:
+      break
+    nbytes = nbytes + nread
+
+  if nbytes % reclen != 0:
+    raise ValueError('Response length of {} bytes is not a multiple of record length of {} bytes'.format(nbytes, reclen))
+
+  if nbytes != data.nbytes:
+    data.resize(nbytes // reclen, refcheck=False)
+
+  return data
+
+
+def get_csv(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, res=None):
+  # HAPI CSV. res is the response if the request was already made.
+  urlcsv = data_url(meta, SERVER, DATASET, PARAMETERS, START, STOP, 'csv')
+
+  tic0 = time.time()
+  if res is None:
+    res = urlopen(urlcsv)
+  fnamecsv = res
   if opts["cache"]:
-    tic0 = time.time()
-    urlretrieve(urlcsv, fnamecsv)
-    log('Reading and parsing %s' % os.path.basename(fnamecsv))
-    if os.path.getsize(fnamecsv) == 0:
-      file_empty = True
-  else:
+    fnamecsv = _cache_response(res, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, urlcsv)
+  if not isinstance(fnamecsv, str):
     from io import StringIO
     log('Writing %s to buffer' % urlcsv)
-    tic0 = time.time()
-    fnamecsv = StringIO(urlopen(urlcsv).read().decode())
-    fnamecsv.seek(0, os.SEEK_END)
-    if fnamecsv.tell() == 0:
-      file_empty = True
-    else:
-      fnamecsv.seek(0)
-    log('Parsing StringIO buffer.')
+    fnamecsv = StringIO(res.read().decode())
+  _response_headers(meta, res)
 
   toc0 = time.time() - tic0
 
   tic1 = time.time()
+  data = parse_response(fnamecsv, meta, opts, urlcsv)
+  toc1 = time.time() - tic1
+
+  return data, toc0, toc1
+
+
+def get_response(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, res=None):
+  """Download the response to a /data request without parsing it.
+
+  Returns (source, url, toc0, throttled) and adds the response's ETag and
+  Last-Modified headers to meta. If opts['cache'] is True, source
+  is the name of the cache file that the response was written to (see
+  _cache_response()); otherwise, it is the response body as bytes. toc0 is
+  the download time and throttled is True if the request was retried after
+  an HTTP 429 or 503 response. If the server still responded with 429 or
+  503 after retries, source is None and the request should be made again
+  later. Use parse_response() to parse source. res is the response if the
+  request was already made.
+  """
+
+  url = data_url(meta, SERVER, DATASET, PARAMETERS, START, STOP, opts['format'])
+
+  tic0 = time.time()
+  if res is None:
+    res = urlopen(url, throttle_ok=True)
+  if res.status != 200:
+    log('Server responded with HTTP status %d after retries for %s' % (res.status, url))
+    res.drain_conn()
+    res.release_conn()
+    return None, url, time.time() - tic0, True
+  source = res
+  if opts["cache"]:
+    source = _cache_response(res, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, url)
+  if not isinstance(source, str):
+    log('Writing %s to buffer' % url)
+    source = res.read()
+  toc0 = time.time() - tic0
+  _response_headers(meta, res)
+
+  return source, url, toc0, throttled(res)
+
+
+def _cache_response(body, meta, SERVER, DATASET, PARAMETERS, START, STOP, opts, url):
+  """Write a /data response to the cache as given by opts['cache_store'].
+
+  body is the response or the response body as bytes. Returns the name of
+  the file written, which is parsed by parse_response(), or body if the
+  response is not written because only parsed data are cached and they
+  differ from the response.
+
+  For 'raw' and 'both', the response is written to the .bin or .csv file.
+  For 'parsed', a binary response whose parsed data are its records (see
+  _binary_records()) is written to the .npy file; data_cache_write() does
+  not write it again.
+  """
+
+  from hapiclient.util import write_atomic
+  from hapiclient.cache import data_cache_write_records
+
+  paths = data_cache_paths(SERVER, DATASET, PARAMETERS, START, STOP, opts['cachedir'], opts['time_format'])
+
+  if opts['cache_store'] != 'parsed':
+    fname = paths['bin' if opts['format'] == 'binary' else 'csv']
+    log('Writing %s' % os.path.basename(fname))
+    write_atomic(fname, body)
+    return fname
+
+  if opts['format'] == 'binary' and _binary_records(meta, opts):
+    dt, _, _, _, _ = _compute_dt(meta, opts)
+    log('Writing %s' % os.path.basename(paths['npy']))
+    try:
+      data_cache_write_records(paths['npy'], body, np.dtype(dt))
+    except Exception as e:
+      error('Malformed response? Could not read {}: {}'.format(url, e))
+    return paths['npy']
+
+  return body
+
+
+def _binary_records(meta, opts):
+  """True if parsed data for a binary response are its records unchanged.
+
+  This is the case unless a string parameter is decoded or the time
+  column is converted or copied to a column (see _parse_binary()).
+  """
+
+  if opts['time_format'] != 'bytes' or opts['layout'] != 'structured':
+    return False
+
+  return all(parameter['type'] != 'string' for parameter in meta['parameters'])
+
+
+def _response_headers(meta, res):
+  """Add headers of response res used to revalidate cached data to meta."""
+
+  from hapiclient.cache import _cache_headers
+
+  meta.update({"x_responseHeaders": _cache_headers(res)})
+
+
+def parse_response(source, meta, opts, url):
+  """Parse a response returned by get_response().
+
+  source is a file name, the response body as bytes, or the response.
+  """
+
+  if isinstance(source, str):
+    log('Reading and parsing %s' % os.path.basename(source))
+    if source.endswith('.npy'):
+      # Records written by _cache_response().
+      return np.load(source, mmap_mode='r' if opts['mmap'] else None)
+
+  if opts['format'] == 'binary':
+    if opts['method'] != '':
+      warnings.warn("Method argument is ignored when format='binary.")
+    if isinstance(source, bytes):
+      from io import BytesIO
+      source = BytesIO(source)
+    return _parse_binary(source, meta, opts, url)
+
+  if isinstance(source, bytes):
+    from io import StringIO
+    source = StringIO(source.decode())
+  return _parse_csv_response(source, meta, opts, url)
+
+
+def _parse_csv_response(fnamecsv, meta, opts, urlcsv):
+  """Parse a HAPI CSV response in file named fnamecsv or in a StringIO buffer."""
+
+  if isinstance(fnamecsv, str):
+    file_empty = os.path.getsize(fnamecsv) == 0
+  else:
+    fnamecsv.seek(0, os.SEEK_END)
+    file_empty = fnamecsv.tell() == 0
+    fnamecsv.seek(0)
 
   if file_empty:
     log("Response is empty. Returning empty data array.")
     dt, _, _, _, _ = _compute_dt(meta, opts)
-    data = np.array([], dtype=dt)
+    data = np.array([], dtype=_time_dt(dt, opts))
   else:
     if missing_length(meta, opts):
       data = _parse_csv_missing_length(fnamecsv, meta, opts, urlcsv)
+    elif isinstance(fnamecsv, str) and opts['n_parse'] > 1:
+      data = _parse_csv_parallel(fnamecsv, meta, opts, urlcsv)
     else:
       data = _parse_csv(fnamecsv, meta, opts, urlcsv)
 
-  toc1 = time.time() - tic1
+  if opts['layout'] == 'columnar':
+    data = _columns(data)
 
-  return data, toc0, toc1
+  return data
+
+
+# dtype of time parameter for each time_format option other than 'bytes'.
+_time_dtypes = {
+  'datetime64': 'M8[ns]',
+  'epoch_ns': '<i8',
+  'epoch_s_float': '<f8'
+}
+
+
+def _time_convert(Time, time_format):
+  """Convert array of HAPI times to time_format (a key in _time_dtypes)."""
+
+  if len(Time) == 0:
+    return np.array([], dtype=_time_dtypes[time_format])
+
+  Time64 = hapitime2datetime64(Time)
+  if time_format == 'datetime64':
+    return Time64
+
+  ns = Time64.view(np.int64)
+  if time_format == 'epoch_ns':
+    return ns
+
+  return ns / 1e9
+
+
+def _time_dt(dt, opts):
+  """Return dt with dtype of time parameter (first field) for opts['time_format']."""
+
+  if opts['time_format'] == 'bytes':
+    return dt
+
+  return [(dt[0][0], _time_dtypes[opts['time_format']])] + list(dt[1:])
+
+
+def _time_values(values, dtype, opts):
+  """Return time parameter values read from CSV converted to opts['time_format'].
+
+  Used by parsers that fill an array allocated with _time_dt() so that the
+  time parameter is converted while filling instead of by copying all of
+  the parsed data into a second array. dtype is the 'S' dtype of the time
+  parameter.
+  """
+
+  if opts['time_format'] == 'bytes':
+    return values
+
+  return _time_convert(np.asarray(values).astype(dtype), opts['time_format'])
+
+
+def _time_convert_data(data, opts):
+  """Return data with time parameter (first field) converted to opts['time_format'].
+
+  Used for data parsed with the numpy methods, which do not use _time_dt().
+  """
+
+  if opts['time_format'] == 'bytes':
+    return data
+
+  if isinstance(data, dict):
+    name = next(iter(data))
+    data[name] = _time_convert(data[name], opts['time_format'])
+    return data
+
+  names = data.dtype.names
+  dt = [(names[0], _time_dtypes[opts['time_format']])]
+  dt = dt + [(name, data.dtype.fields[name][0]) for name in names[1:]]
+
+  datanew = np.ndarray(shape=data.shape, dtype=dt)
+  datanew[names[0]] = _time_convert(data[names[0]], opts['time_format'])
+  for name in names[1:]:
+    datanew[name] = data[name]
+
+  return datanew
+
+
+# Minimum number of bytes of a CSV file parsed by a process when
+# opts['n_parse'] > 1.
+_csv_range_min = 2**24
+
+
+def _parse_csv_parallel(fnamecsv, meta, opts, urlcsv):
+  """Parse CSV file named fnamecsv using up to opts['n_parse'] processes.
+
+  The file is split at line boundaries into byte ranges of at least
+  _csv_range_min bytes, each range is parsed by _parse_csv() in a separate
+  process, and the results are concatenated.
+  """
+
+  from joblib import Parallel, delayed
+  from hapiclient.data import _concatenate
+
+  ranges = _csv_ranges(fnamecsv, opts['n_parse'])
+  if len(ranges) == 1:
+    return _parse_csv(fnamecsv, meta, opts, urlcsv)
+
+  log('Parsing %s in %d byte ranges using %d processes' % (os.path.basename(fnamecsv), len(ranges), opts['n_parse']))
+  resD = Parallel(n_jobs=opts['n_parse'])(
+    delayed(_parse_csv_range)(fnamecsv, start, stop, meta, opts, urlcsv) for start, stop in ranges)
+
+  return _concatenate(resD)
+
+
+def _csv_ranges(fnamecsv, n):
+  """Split file into at most n byte ranges (start, stop) that start at lines."""
+
+  size = os.path.getsize(fnamecsv)
+  n = max(1, min(n, size // _csv_range_min))
+
+  starts = [0]
+  with open(fnamecsv, 'rb') as f:
+    for i in range(1, n):
+      f.seek(i * size // n)
+      f.readline()  # Move to start of next line.
+      if f.tell() > starts[-1] and f.tell() < size:
+        starts.append(f.tell())
+
+  return list(zip(starts, starts[1:] + [size]))
+
+
+def _parse_csv_range(fnamecsv, start, stop, meta, opts, urlcsv):
+  """Parse bytes start:stop of CSV file named fnamecsv."""
+
+  from io import StringIO
+
+  with open(fnamecsv, 'rb') as f:
+    f.seek(start)
+    buffer = StringIO(f.read(stop - start).decode())
+
+  return _parse_csv(buffer, meta, opts, urlcsv)
 
 
 def _parse_csv(fnamecsv, meta, opts, urlcsv):
@@ -234,14 +651,19 @@ def _parse_csv(fnamecsv, meta, opts, urlcsv):
   def _numpy(fname_csv):
     try:
       data = np.genfromtxt(fnamecsv, **kwargs_numpy)
-      return data
+      return _time_convert_data(data, opts)
     except Exception as e:
       error('np.genfromtxt({}) gave {} using data from {}'.format(fnamecsv, e, urlcsv))
 
   if opts['method'] == 'numpy':
     return _numpy(fnamecsv)
 
-  if opts['method'] == '' or opts['method'] == 'pandas':
+  if opts['method'] == 'arrow':
+    data = _parse_csv_arrow(fnamecsv, meta, opts, urlcsv)
+    if data is not None:
+      return data
+
+  if opts['method'] == '' or opts['method'] == 'pandas' or opts['method'] == 'arrow':
     # Read file into Pandas DataFrame
     """
     Note that this does not handle trailing whitespace after
@@ -264,12 +686,14 @@ def _parse_csv(fnamecsv, meta, opts, urlcsv):
     # Allocate output N-D array (It is not possible to pass dtype=dt as computed
     # to pandas.read_csv; pandas dtypes are different from numpy's dtypes.)
     try:
-      data = np.ndarray(shape=(len(df)), dtype=dt)
+      data = _empty(len(df), _time_dt(dt, opts), opts)
       # Insert data from dataframe 'df' columns into N-D array 'data'
       for i in range(0, len(pnames)):
-        shape = np.append(len(data), psizes[i])
-        datap = df.values[:, np.arange(cols[i][0], cols[i][1] + 1)]
-        data[pnames[i]] = np.squeeze(np.reshape(datap, shape))
+        shape = np.append(len(df), psizes[i])
+        datap = np.squeeze(np.reshape(_df_columns(df, cols[i]), shape))
+        if i == 0:
+          datap = _time_values(datap, dt[0][1], opts)
+        data[pnames[i]][...] = datap
     except Exception as e:
       try:
         data = _numpy(fnamecsv)
@@ -281,6 +705,117 @@ def _parse_csv(fnamecsv, meta, opts, urlcsv):
   return data
 
 
+def _parse_csv_arrow(fnamecsv, meta, opts, urlcsv):
+  """Parse CSV using the multithreaded CSV reader in pyarrow.
+
+  Each CSV column is read with the Arrow type for its parameter and the
+  na_values used by the pandas method are read as NaN. The columns for a
+  parameter are then copied into its field of the output array. Returns
+  None if pyarrow is not installed or could not parse the CSV, in which
+  case the pandas method should be used.
+  """
+
+  try:
+    import pyarrow
+    import pyarrow.csv
+    import pyarrow.compute
+  except ImportError:
+    log("method='arrow' requires pyarrow, which is not installed. Using method='pandas'.")
+    return None
+
+  dt, cols, psizes, pnames, ptypes = _compute_dt(meta, opts)
+
+  arrow_types = {'double': pyarrow.float64(), 'integer': pyarrow.int32()}
+  names = []
+  types = {}
+  for i in range(len(pnames)):
+    for c in range(cols[i][0], cols[i][1] + 1):
+      names.append(str(c))
+      types[str(c)] = arrow_types.get(ptypes[i], pyarrow.string())
+
+  na_values = ['NaN', 'nan', 'Nan', 'naN', ' "NaN"', ' "nan"', ' "Nan"', ' "naN"', '"NaN"', '"nan"', '"Nan"', '"naN"']
+
+  source = fnamecsv
+  if not isinstance(source, str):
+    from io import BytesIO
+    source = BytesIO(fnamecsv.getvalue().encode('utf-8'))
+
+  try:
+    table = pyarrow.csv.read_csv(source,
+                                 read_options=pyarrow.csv.ReadOptions(column_names=names, use_threads=True),
+                                 convert_options=pyarrow.csv.ConvertOptions(column_types=types,
+                                                                            null_values=na_values,
+                                                                            strings_can_be_null=False))
+
+    data = _empty(table.num_rows, _time_dt(dt, opts), opts)
+    for i in range(len(pnames)):
+      columns = []
+      for c in range(cols[i][0], cols[i][1] + 1):
+        column = table.column(str(c))
+        if types[str(c)] == pyarrow.string():
+          column = _arrow_unquote(column)
+        columns.append(column.to_numpy())
+      shape = np.append(table.num_rows, psizes[i])
+      datap = np.squeeze(np.reshape(np.stack(columns, axis=1), shape))
+      if i == 0:
+        datap = _time_values(datap, dt[0][1], opts)
+      data[pnames[i]][...] = datap
+  except Exception as e:
+    log('pyarrow could not parse CSV from {}: {}. Using method=\'pandas\'.'.format(urlcsv, e))
+    return None
+
+  return data
+
+
+def _arrow_unquote(column):
+  """Remove leading spaces and then quotes from Arrow strings with leading spaces.
+
+  Gives the same strings as pandas.read_csv() with skipinitialspace=True.
+  Arrow only removes quotes from fields that start with a quote.
+  """
+
+  import pyarrow.compute as pc
+
+  stripped = pc.utf8_ltrim(column, characters=' ')
+  unquoted = pc.replace_substring_regex(stripped, pattern='^"(.*)"$', replacement='\\1')
+  unquoted = pc.if_else(pc.starts_with(stripped, pattern='"'), pc.replace_substring(unquoted, pattern='""', replacement='"'), unquoted)
+
+  return pc.if_else(pc.starts_with(column, pattern=' '), unquoted, column)
+
+
+def _df_columns(df, cols):
+  """Return array with columns cols[0] through cols[1] of DataFrame df.
+
+  Only the columns of a parameter are converted, from the DataFrame's typed
+  columns, so numeric columns are not converted to an object array as they
+  are in df.values when the DataFrame has a string column (e.g., Time).
+  """
+  return df.iloc[:, cols[0]:cols[1] + 1].to_numpy()
+
+
+def _df_str_len(df, cols):
+  """Return maximum length of values in columns cols[0] through cols[1] of DataFrame df.
+
+  Values are measured as strings, e.g., a NaN in the column is 'nan'.
+  Returns at least 1, as 'S0' and 'U0' are not valid fixed-length dtypes.
+  """
+
+  length = 1
+  for c in range(cols[0], cols[1] + 1):
+    column = df.iloc[:, c]
+    if not pandas.api.types.is_string_dtype(column):
+      # All values were read as numbers.
+      column = pandas.Series(column.to_numpy().astype('U'))
+    lengths = column.str.len()
+    if lengths.isna().any():
+      # A NaN value is 'nan' when converted to a string.
+      length = max(length, 3)
+    if lengths.notna().any():
+      length = max(length, int(lengths.max()))
+
+  return length
+
+
 def _parse_csv_missing_length(fnamecsv, meta, opts, urlcsv):
   dt, cols, psizes, pnames, ptypes = _compute_dt(meta, opts)
 
@@ -359,8 +894,8 @@ def _parse_csv_missing_length(fnamecsv, meta, opts, urlcsv):
 
         data[pnames[pn]] = tmp
 
-  if opts['method'] == '' or opts['method'] == 'pandas' or opts['method'] == 'pandasnolength':
-    # If requested method was pandas, use pandasnolength method.
+  if opts['method'] in ['', 'pandas', 'pandasnolength', 'arrow']:
+    # If requested method was pandas or arrow, use pandasnolength method.
 
     # TODO: Duplicate code.
     # Read file into Pandas DataFrame
@@ -377,20 +912,33 @@ def _parse_csv_missing_length(fnamecsv, meta, opts, urlcsv):
     except Exception as e:
       error('pandas.read_csv({}) gave {} using data from {}'.format(fnamecsv, e, urlcsv))
 
-    # Allocate output N-D array (It is not possible to pass dtype=dt
-    # as computed to pandas.read_csv, so need to create new ND array.)
-    data = np.ndarray(shape=(len(df)), dtype=dt)
+    # String parameters that do not have a length in the metadata have
+    # dtype=object in dt. Their length is the maximum length of their
+    # strings in the DataFrame, so the output array with fixed-length
+    # strings is allocated once and filled from the DataFrame.
+    dt2 = []
+    for i in range(0, len(pnames)):
+      if np.dtype(dt[i][1]) == object:
+        length = _df_str_len(df, cols[i])
+        dtype = (pnames[i], ('S' if ptypes[i] == 'isotime' else 'U') + str(length), psizes[i])
+        if dtype[2] == 1:
+          dtype = dtype[0:2]
+      else:
+        dtype = dt[i]
+      dt2.append(dtype)
 
-    # Insert data from dataframe into N-D array
+    data = _empty(len(df), _time_dt(dt2, opts), opts)
     for i in range(0, len(pnames)):
-      shape = np.append(len(data), psizes[i])
-      # In numpy 1.8.2 and Python 2.7, this throws an error for no apparent reason.
-      # Works as expected in numpy 1.10.4
-      datap = df.values[:, np.arange(cols[i][0], cols[i][1] + 1)]
-      data[pnames[i]] = np.squeeze(np.reshape(datap, shape))
-
-  # Any of the string parameters that do not have an associated
-  # length in the metadata will have dtype='O' (object).
+      shape = np.append(len(df), psizes[i])
+      datap = np.squeeze(np.reshape(_df_columns(df, cols[i]), shape))
+      if i == 0:
+        datap = _time_values(datap, dt2[0][1], opts)
+      data[pnames[i]][...] = datap
+
+    return data
+
+  # numpy methods. Any of the string parameters that do not have an
+  # associated length in the metadata will have dtype='O' (object).
   # These parameters must be converted to have a dtype='SN', where
   # N is the maximum string length. N is determined automatically
   # when using astype('<S') (astype uses largest N needed).
@@ -421,4 +969,4 @@ def _parse_csv_missing_length(fnamecsv, meta, opts, urlcsv):
       # Save memory by not copying (does this help?)
       # data2[pnames[i]] = np.array(data[pnames[i]],copy=False)
 
-  return data2
+  return _time_convert_data(data2, opts)
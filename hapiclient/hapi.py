@@ -1,10 +1,10 @@
 from hapiclient.log import log, configure_logging
-from hapiclient.util import setopts, error
+from hapiclient.util import setopts, error, poolopts, pool
 from hapiclient.cache import cachedir
 from hapiclient.servers import servers
 from hapiclient.catalog import catalog
 from hapiclient.info import info
-from hapiclient.data import data
+from hapiclient.data import data, _data_output
 
 # Backward compatibility: older code imports request2path from hapiclient.hapi
 from hapiclient.cache import request2path # Do not remove.
@@ -23,6 +23,10 @@ def hapiopts():
     method = 'pandas' is used by default. Other methods
     (numpy, pandasnolength, numpynolength) can be used for testing
     CSV read methods. See test/test_hapi.py for comparison.
+
+    method = 'arrow' uses the multithreaded CSV reader in pyarrow, if it is
+    installed; otherwise, or if pyarrow cannot parse the response, 'pandas'
+    is used.
     """
 
     # Default options
@@ -31,12 +35,28 @@ def hapiopts():
         'cache': True,
         'cachedir': cachedir(),
         'usecache': False,
+        'meta_max_age': None,
+        'data_max_age': None,
+        'data_margin': 'P1D',
+        'cache_max_bytes': None,
+        'cache_eviction': 'lru',
+        'cache_store': 'both',
+        'mmap': False,
         'format': 'binary',
         'method': '',
+        'time_format': 'bytes',
+        'layout': 'structured',
+        'output': 'numpy',
         'parallel': False,
         'n_parallel': 5,
+        'n_parallel_server': {},
+        'adaptive': False,
+        'n_parse': 1,
         'n_chunks': None,
         'dt_chunk': None,
+        'iterate': False,
+        'outfile': None,
+        'pool': poolopts()
     }
 
     return opts
@@ -74,17 +94,175 @@ def hapi(*args, **kwargs):
 
             `cachedir` (``'./hapi-data'``)
 
-            `usecache` (``True``) - Use files in `cachedir` if found
+            `usecache` (``True``) - Use files in `cachedir` if found. If the \
+                time range of a request is fully or partly covered by cached \
+                requests for the same dataset and the same parameters or a \
+                superset of them, the cached data are used and only the time \
+                ranges not covered are requested.
+
+                Regardless of `usecache`, /catalog, /info, and /capabilities \
+                responses are kept in memory for 10 minutes, so they are \
+                requested once for a request split into chunks. Use \
+                ``hapiclient.cache.metacache.clear()`` to remove them (see \
+                ``hapiclient.cache.MemoryCache``).
+
+            `meta_max_age` (``None``) Seconds for which /catalog and \
+                /capabilities responses in `cachedir` are used without a \
+                request when `usecache` is ``True``. Older responses are \
+                revalidated with a conditional request using their ETag and \
+                Last-Modified headers, so they are not downloaded again if the \
+                server responds with 304 (Not Modified). If ``None``, the \
+                max-age in the Cache-Control header of the response is used, \
+                or 0 if not given.
+
+            `data_max_age` (``None``) Seconds for which data in `cachedir` \
+                for a time range that ends less than `data_margin` before \
+                the dataset's ``stopDate`` (or the current time, if earlier) \
+                are used when `usecache` is ``True``. After this, the data \
+                are revalidated with a conditional request using the ETag \
+                and Last-Modified headers of the response and requested \
+                again if the server does not respond with 304 (Not \
+                Modified). Data for earlier time ranges are used without \
+                revalidation. If ``None``, cached data are always used. Use \
+                for datasets that are updated in near-real-time.
+
+            `data_margin` (``'P1D'``) ISO 8601 duration; see `data_max_age`.
+
+            `cache_max_bytes` (``None``) If not ``None``, maximum total size \
+                in bytes of data files in `cachedir`. When data are written, \
+                cached requests are removed using `cache_eviction` until the \
+                total size is at most `cache_max_bytes`. Sizes and access \
+                times are kept in an index file in `cachedir`, which is \
+                updated when data are written and, if `cache_max_bytes` is \
+                not ``None``, when they are read; /catalog, /info, and \
+                /capabilities responses are not counted. See also \
+                ``hapiclient.cache.cache_list()``, ``cache_usage()``, \
+                ``cache_evict()``, and ``cache_clear()``.
+
+            `cache_eviction` (``'lru'``) ``'lru'`` to remove least recently \
+                used requests first or ``'lfu'`` to remove least frequently \
+                used requests first.
+
+            `cache_store` (``'both'``) Files written to `cachedir` for a \
+                request when `cache` is ``True``. ``'both'`` for the response \
+                (``.bin`` or ``.csv``) and the parsed data (``.npy`` or \
+                ``.npz``); ``'raw'`` for only the response, which is parsed \
+                when read from `cachedir` with `cache_store` ``'raw'`` (a \
+                binary response is memory-mapped, as for `mmap`, when no \
+                conversion is needed); \
+                ``'parsed'`` for only the parsed data. For ``'parsed'``, a \
+                binary response without string parameters is written directly \
+                to the ``.npy`` file when `time_format` is ``'bytes'`` and \
+                `layout` is ``'structured'``, so it is written once instead of \
+                twice.
+
+            `mmap` (``False``) If ``True``, memory-map data read from files in \
+                `cachedir` instead of reading them into memory. The returned \
+                array is read-only and its pages are only read from disk when \
+                accessed and are shared with other processes that map the same \
+                file. Applies to cached ``.npy`` files (when `usecache` is \
+                ``True``) and, for binary responses without string parameters, \
+                to the ``.bin`` file written when `cache` is ``True``. Use for \
+                fast slicing of large cached requests.
 
             `serverlist` (``'https://github.com/hapi-server/servers/raw/master/all.txt'``)
 
             `format` (``'binary'``) ``'binary'`` or ``'csv'``; ``'csv``' will force the use of ``format=csv`` in request to server.
 
-            `parallel` (``False``) If ``True``, make up to `n_parallel` requests to server \
-                in parallel (uses threads)
+            `time_format` (``'bytes'``) Type of the first (Time) column of the \
+                returned array. ``'bytes'`` for HAPI time strings as returned by \
+                the server; ``'datetime64'`` for ``numpy.datetime64[ns]``; \
+                ``'epoch_ns'`` for int64 nanoseconds since 1970-01-01; \
+                ``'epoch_s_float'`` for float64 seconds since 1970-01-01. Times \
+                are converted once, when a response is parsed (see \
+                ``hapitime2datetime64``), and parsed data written to `cachedir` \
+                are stored in this form, so cached requests are not converted \
+                again. A numeric time column uses 8 bytes per record; a time \
+                string typically uses 20-30.
+
+            `layout` (``'structured'``) ``'structured'`` to return `data` as a \
+                NumPy structured array, with the values of all parameters for \
+                a record stored together; ``'columnar'`` to return a ``dict`` \
+                with parameter names as keys (in the order of `meta`) and a \
+                contiguous NumPy array for each parameter. A field of a \
+                structured array is a strided view, so operations on one \
+                parameter of a dataset with many parameters, such as \
+                ``np.sum(data['scalar'])``, are much faster for \
+                ``'columnar'``. Parsed data written to `cachedir` are stored \
+                in a ``.npz`` file for ``'columnar'``, and `mmap` does not \
+                apply to them.
+
+            `output` (``'numpy'``) ``'numpy'`` to return `data` as NumPy arrays \
+                (see `layout`); ``'pandas'`` for a ``pandas.DataFrame``; \
+                ``'arrow'`` for a ``pyarrow.Table`` (requires ``pyarrow``). For \
+                ``'pandas'`` and ``'arrow'``, responses are parsed into a \
+                contiguous array for each parameter (`layout` is \
+                ``'columnar'``), which is used by the DataFrame or Table \
+                without a copy for numeric and time parameters, and \
+                `time_format` ``'bytes'`` is replaced by ``'datetime64'``, so \
+                the Time column is a timestamp column (UTC; time zone-naive \
+                for ``'pandas'``). A parameter with ``size=[N]`` is N columns \
+                named ``name_0``, ..., ``name_N-1`` for ``'pandas'`` and a \
+                fixed-size list column for ``'arrow'``.
 
-            `n_parallel` (``5``) Maximum number of parallel requests to server.\
-                Max allowed is 5.
+            `parallel` (``False``) If ``True``, make up to `n_parallel` requests to server \
+                in parallel (uses threads). Chunks are parsed in separate threads \
+                while other chunks are downloaded.
+
+            `n_parallel` (``5``) Maximum number of parallel requests to server.
+
+            `n_parallel_server` (``{}``) Maximum number of parallel requests to \
+                a server, with server URLs as keys, e.g., \
+                ``{'https://cdaweb.gsfc.nasa.gov/hapi': 4}``. If given for \
+                the server, the smaller of this value and `n_parallel` is used.
+
+            `n_parse` (``1``) Number of processes used to parse a CSV response \
+                written to `cachedir`. If > 1, files larger than 16 MiB are \
+                split at line boundaries into up to `n_parse` parts that are \
+                parsed in parallel. Use for servers that do not provide binary \
+                responses.
+
+            `adaptive` (``False``) If ``True`` and `parallel` is ``True``, start \
+                with one request at a time and add one more parallel request each \
+                time the throughput of chunk downloads increases, up to \
+                `n_parallel`. The number of parallel requests is halved when the \
+                server responds with HTTP status 429 or 503 or when the throughput \
+                decreases and the mean time for a download is more than twice the \
+                shortest mean seen.
+
+            `iterate` (``False``) If ``True``, return a generator that yields \
+                ``(data, meta)`` for each chunk (see `n_chunks` and `dt_chunk`) \
+                in time order instead of a single ``(data, meta)`` for the full \
+                time range. The first and last chunks are trimmed so that only \
+                records with ``start`` <= t < ``stop`` are returned. If the \
+                request is not split into chunks, one ``(data, meta)`` is \
+                yielded. Use to process long time ranges with memory usage \
+                that does not grow with the length of the time range.
+
+            `outfile` (``None``) Name of a ``.npy`` file to write data to when \
+                the request is split into chunks (see `n_chunks` and \
+                `dt_chunk`). Each chunk is copied to the file as it is \
+                received, and the returned array is read-only and \
+                memory-mapped to the file, so the data may be larger than \
+                memory. If ``None``, chunks are copied to an array in memory. \
+                Ignored if `iterate` is ``True``.
+
+            `pool` (``dict``) Options for the HTTP connection pool shared by all \
+                requests. Connections to a server are kept open and re-used, so \
+                that, e.g., a request split into many chunks does not open a new \
+                connection for each chunk. Keys and defaults are
+
+                    * `num_pools` (``10``) number of servers with open connections
+                    * `maxsize` (``10``) number of open connections per server; \
+                      use a value >= `n_parallel`
+                    * `block` (``False``) if ``True``, wait for a free connection \
+                      instead of opening more than `maxsize` connections to a server
+                    * `keepalive` (``True``) if ``False``, close connection after \
+                      each response
+                    * `connect_timeout` (``None``) seconds; ``None`` for no timeout
+                    * `read_timeout` (``None``) seconds; ``None`` for no timeout
+                    * `retries` (``2``) number of retries on connection errors and \
+                      HTTP status 429 or 503 (waits time in Retry-After header)
 
             `n_chunks` (``None``) Get data by making `n_chunks` requests by splitting \
                 requested time range. `dt_chunk` is ignored if `n_chunks` is \
@@ -180,10 +358,22 @@ def hapi(*args, **kwargs):
 
           ``dtarray = hapitime2datetime(data['Time'])``
 
+          or to a NumPy ``datetime64[ns]`` array, which is much faster for \
+          large arrays, using
+
+          ``dtarray = hapitime2datetime64(data['Time'])``
+
         ``data, meta = hapi(server, dataset, parameters, start, stop)`` returns
         the HAPI info metadata for parameters in `meta` (and should contain the
         same content as ``meta = hapi(server, dataset, parameters)``).
 
+        ``for data, meta in hapi(server, dataset, parameters, start, stop, iterate=True)``
+        iterates over ``data`` and ``meta`` for each chunk of the request.
+
+        If `output` is ``'pandas'`` or ``'arrow'``, ``data`` is a
+        ``pandas.DataFrame`` or a ``pyarrow.Table`` with a column for each
+        parameter (see `output`).
+
 
     References
     ----------
@@ -191,24 +381,52 @@ def hapi(*args, **kwargs):
 
     """
 
+    args, opts = _hapiargs(args, kwargs)
+
+    nin = len(args)
+
+    # hapi()
+    if nin == 0:
+        return servers()
+
+    # hapi(SERVER)
+    if nin == 1:
+        return catalog(args[0], opts)
+
+    # hapi(SERVER, DATASET)
+    if nin == 2:
+        return info(args[0], args[1], None, opts)
+
+    # hapi(SERVER, DATASET, PARAMETERS)
+    if nin == 3:
+        return info(args[0], args[1], args[2], opts)
+
+    # hapi(SERVER, DATASET, PARAMETERS, START, STOP)
+    if nin == 5:
+        return _data_output(data(*args, opts), opts)
+
+
+def _hapiargs(args, kwargs):
+    """Return (args, opts) for positional and keyword arguments to hapi().
+
+    Adds a trailing Z to START and STOP if needed, configures logging and the
+    connection pool, and checks options. Used by hapi() and
+    hapiclient.aio.hapi().
+    """
+
+    args = list(args)
     nin = len(args)
 
-    if nin > 0:
-        SERVER = args[0]
-    if nin > 1:
-        DATASET = args[1]
-    if nin > 2:
-        PARAMETERS = args[2]
     if nin > 3:
         START = args[3]
         if START[-1] != 'Z':
             # TODO: Consider warning.
-            START = START + 'Z'
+            args[3] = START + 'Z'
     if nin > 4:
         STOP = args[4]
         if STOP is not None and STOP[-1] != 'Z':
             # TODO: Consider warning.
-            STOP = STOP + 'Z'
+            args[4] = STOP + 'Z'
 
 
     if 'logging' in kwargs and not isinstance(kwargs['logging'], bool):
@@ -221,12 +439,44 @@ def hapi(*args, **kwargs):
 
     assert (opts['cache'] in [True, False]), "cache keyword must be True of False"
     assert (opts['usecache'] in [True, False]), "usecache keyword must be True of False"
+    assert (opts['meta_max_age'] is None or opts['meta_max_age'] >= 0), "meta_max_age keyword must be None or >= 0"
+    assert (opts['data_max_age'] is None or opts['data_max_age'] >= 0), "data_max_age keyword must be None or >= 0"
+    assert (opts['cache_max_bytes'] is None or opts['cache_max_bytes'] >= 0), "cache_max_bytes keyword must be None or >= 0"
+    assert (opts['cache_eviction'] in ['lru', 'lfu']), "cache_eviction keyword must be 'lru' or 'lfu'"
+    assert (opts['cache_store'] in ['raw', 'parsed', 'both']), "cache_store keyword must be 'raw', 'parsed', or 'both'"
+    assert (isinstance(opts['data_margin'], str) and opts['data_margin'].startswith('P')), "data_margin keyword must be an ISO 8601 duration"
+    assert (opts['mmap'] in [True, False]), "mmap keyword must be True or False"
     assert (opts['format'] in ['binary', 'csv']), "format keyword must be 'csv' or 'binary'"
-    assert (opts['method'] in ['', 'pandas', 'numpy', 'pandasnolength', 'numpynolength'])
+    assert (opts['method'] in ['', 'pandas', 'numpy', 'pandasnolength', 'numpynolength', 'arrow'])
+    assert (opts['time_format'] in ['bytes', 'datetime64', 'epoch_ns', 'epoch_s_float']), \
+        "time_format keyword must be 'bytes', 'datetime64', 'epoch_ns', or 'epoch_s_float'"
+    assert (opts['layout'] in ['structured', 'columnar']), "layout keyword must be 'structured' or 'columnar'"
+    assert (opts['output'] in ['numpy', 'pandas', 'arrow']), "output keyword must be 'numpy', 'pandas', or 'arrow'"
+    assert (opts['outfile'] is None or opts['output'] == 'numpy'), "outfile keyword requires output='numpy'"
     assert (opts['parallel'] in [True, False]), 'parallel keyword must be True or False'
     assert (isinstance(opts['n_parallel'], int) and opts['n_parallel'] > 1)
+    assert (all(isinstance(n, int) and n > 0 for n in opts['n_parallel_server'].values()))
+    assert (opts['adaptive'] in [True, False]), 'adaptive keyword must be True or False'
+    assert (isinstance(opts['n_parse'], int) and opts['n_parse'] > 0)
     assert (opts['n_chunks'] is None or isinstance(opts['n_chunks'], int) and opts['n_chunks'] > 0)
     assert (opts['dt_chunk'] in [None, 'infer', 'PT1H', 'P1D', 'P1M', 'P1Y'])
+    assert (opts['iterate'] in [True, False]), 'iterate keyword must be True or False'
+    assert (opts['outfile'] is None or isinstance(opts['outfile'], str)), 'outfile keyword must be None or a file name'
+    assert (opts['outfile'] is None or opts['layout'] == 'structured'), "outfile keyword requires layout='structured'"
+    assert (isinstance(opts['pool']['maxsize'], int) and opts['pool']['maxsize'] > 0)
+    assert (isinstance(opts['pool']['num_pools'], int) and opts['pool']['num_pools'] > 0)
+
+    if opts['output'] != 'numpy':
+        if opts['output'] == 'arrow':
+            try:
+                import pyarrow
+            except ImportError:
+                error("output='arrow' requires pyarrow, which is not installed.")
+        opts['layout'] = 'columnar'
+        if opts['time_format'] == 'bytes':
+            opts['time_format'] = 'datetime64'
+
+    pool(opts['pool'])
 
     from hapiclient import __version__
     log('Running hapi.py version %s' % __version__)
@@ -234,23 +484,4 @@ def hapi(*args, **kwargs):
     if nin == 4:
         error('A stop time is required if a start time is given.')
 
-    # hapi()
-    if nin == 0:
-        return servers()
-
-    # hapi(SERVER)
-    if nin == 1:
-        return catalog(SERVER)
-
-    # hapi(SERVER, DATASET)
-    if nin == 2:
-        return info(SERVER, DATASET, None, opts)
-
-    # hapi(SERVER, DATASET, PARAMETERS)
-    if nin == 3:
-        return info(SERVER, DATASET, PARAMETERS, opts)
-
-    # hapi(SERVER, DATASET, PARAMETERS, START, STOP)
-    if nin == 5:
-        return data(SERVER, DATASET, PARAMETERS, START, STOP, opts)
-
+    return args, opts
@@ -237,6 +237,27 @@ def hapitime2datetime(Time, **kwargs):
         shape = Time.shape
         Time = Time.flatten()
 
+    allow_missing_Z = kwargs.get('allow_missing_Z', False)
+
+    if Time[0][-1:] not in ('Z', b'Z') and not allow_missing_Z:
+        error("HAPI Times must have trailing Z. First element of input " + \
+              "Time array does not have trailing Z.")
+
+    tic = time.time()
+
+    # Fixed-width times with the format of the first time are parsed without
+    # creating an intermediate array of strings.
+    Time64 = _hapitime2datetime64(Time, allow_missing_Z)
+    if Time64 is not None:
+        Timeo = Time[0]
+        Time = _datetime642datetime(Time64)
+        if reshape:
+            Time = np.reshape(Time, shape)
+        toc = time.time() - tic
+        log("Vectorized processing time = %.4fs, first time = %s" % (toc, Timeo))
+        return Time
+    log("Vectorized processing not possible; times do not all have the format of the first time.")
+
     if isinstance(Time[0], np.bytes_):
         try:
             Time = Time.astype('U')
@@ -244,15 +265,6 @@ def hapitime2datetime(Time, **kwargs):
             error('Problem with time data. First value: ' + str(Time[0]) + '\n' + 'Error message: ' + str(e))
             return
 
-    tic = time.time()
-
-
-    allow_missing_Z = kwargs.get('allow_missing_Z', False)
-
-    if Time[0][-1] != "Z" and not allow_missing_Z:
-        error("HAPI Times must have trailing Z. First element of input " + \
-              "Time array does not have trailing Z.")
-
     try:
         # This is the fastest conversion option. But it will fail on YYYY-DOY
         # format and other valid^* ISO 8601 dates such as 2001-01-01T00:00:03.Z
@@ -318,6 +330,265 @@ def hapitime2datetime(Time, **kwargs):
     return pythonDateTime
 
 
+def hapitime2datetime64(Time, allow_missing_Z=False):
+    """Convert HAPI timestamps to a NumPy datetime64[ns] array.
+
+    Accepts the same inputs as ``hapitime2datetime()``, but returns a NumPy
+    array with dtype ``datetime64[ns]`` (times are UTC) instead of an array of
+    Python datetime objects. For large arrays, this is much faster and uses
+    much less memory. Use ``hapitime2datetime()`` to get Python datetimes.
+
+    The format of the first time is determined using ``hapitime_format_str()``,
+    and if all times have this format, the year, month or day-of-year, hour,
+    minute, second, and fractional second are read from the columns of
+    characters at fixed positions for all times at once. Otherwise, times are
+    parsed using ``hapitime2datetime()``.
+
+    Typical usage:
+
+    ::
+
+        data = hapi(...) # Get data
+        Time = hapitime2datetime64(data['Time'])
+        ns = Time.view('int64') # Nanoseconds since 1970-01-01
+
+    Examples
+    --------
+    ::
+
+        from hapiclient import hapitime2datetime64
+
+        hapitime2datetime64([b'1970-001T00:00:01.5Z'])
+        # array(['1970-01-01T00:00:01.500000000'], dtype='datetime64[ns]')
+    """
+
+    if isinstance(Time, list):
+        Time = np.asarray(Time)
+        if not all(isinstance(x, (np.str_, np.bytes_, str, bytes)) for x in Time):
+            error('hapitime2datetime64: all elements of input must be strings')
+
+    if not isinstance(Time, np.ndarray):
+        Time = np.asarray([Time])
+
+    if Time.size == 0:
+        error('Time array is empty.' + '\n')
+        return
+
+    shape = Time.shape
+    Time = Time.reshape(-1)
+
+    tic = time.time()
+    Time64 = None
+    if Time[0][-1:] in ('Z', b'Z') or allow_missing_Z:
+        Time64 = _hapitime2datetime64(Time, allow_missing_Z)
+
+    if Time64 is None:
+        Time64 = hapitime2datetime(Time, allow_missing_Z=allow_missing_Z)
+        Time64 = np.array([t.replace(tzinfo=None) for t in Time64], dtype='datetime64[ns]')
+    else:
+        log("Vectorized processing time = %.4fs, first time = %s" % (time.time() - tic, Time[0]))
+
+    return Time64.reshape(shape)
+
+
+def hapitime_slice(Time, start=None, stop=None):
+    """Slice of a sorted array of times with start <= Time < stop.
+
+    ``Time`` is a 1-D array sorted in time order, such as ``data['Time']``,
+    of HAPI time strings (bytes or str) or of times returned using the
+    ``time_format`` option of ``hapi()`` (``datetime64``, ``int64``
+    nanoseconds, or ``float64`` seconds since 1970-01-01). ``start`` and
+    ``stop`` are HAPI time strings; if ``None``, the slice starts at the
+    first or ends at the last element, respectively.
+
+    The slice is found using a binary search, so it takes a time that does
+    not depend on the length of ``Time`` and, unlike a boolean mask, indexing
+    with it returns a view instead of a copy.
+
+    Typical usage:
+
+    ::
+
+        data = hapi(...) # Get data
+        data_hour = data[hapitime_slice(data['Time'], '2001-01-01T01Z', '2001-01-01T02Z')]
+
+    Examples
+    --------
+    ::
+
+        from hapiclient import hapitime_slice
+
+        hapitime_slice([b'2001-01-01T00Z', b'2001-01-01T01Z', b'2001-01-01T02Z'], '2001-01-01T00:30Z')
+        # slice(1, 3, None)
+    """
+
+    Time = np.asarray(Time)
+
+    if Time.size == 0:
+        return slice(0, 0)
+
+    i0 = 0 if start is None else _hapitime_search(Time, start)
+    i1 = Time.size if stop is None else _hapitime_search(Time, stop)
+
+    return slice(i0, max(i0, i1))
+
+
+def _hapitime_search(Time, t):
+    """Index of the first element of sorted Time that is not earlier than HAPI time t."""
+
+    import bisect
+
+    side = 'left'
+    kind = Time.dtype.kind
+    if kind in 'SU':
+        Time0 = Time[0].decode('UTF-8') if kind == 'S' else Time[0]
+        tr = hapitime_reformat(Time0, t)
+        if hapitime_reformat(t, tr) != t:
+            # t was truncated, so elements equal to tr are earlier than t.
+            side = 'right'
+        t = bytes(tr, 'UTF-8') if kind == 'S' else tr
+    else:
+        t = hapitime2datetime64(np.array([t]), allow_missing_Z=True)[0]
+        if kind != 'M':
+            t = t.view(np.int64)
+            if kind == 'f':
+                t = t / 1e9
+        t = np.array(t, dtype=Time.dtype)
+
+    if Time.flags.c_contiguous:
+        return int(np.searchsorted(Time, t, side=side))
+
+    # np.searchsorted() copies a non-contiguous array (e.g., a field of a
+    # structured array), so for these, only the ~log2(n) elements compared
+    # are accessed.
+    if side == 'left':
+        return bisect.bisect_left(Time, t)
+    return bisect.bisect_right(Time, t)
+
+
+def _hapitime2datetime64(Time, allow_missing_Z=False):
+    """Parse 1-D array of HAPI times with the format of the first time.
+
+    Returns an array with dtype datetime64[ns] or None if Time cannot be
+    parsed this way, e.g., because not all times have the same length and
+    format or a value is out of range. None is also returned if a time does not
+    have a trailing Z and allow_missing_Z is False.
+    """
+
+    if Time.dtype.kind in ('U', 'O'):
+        try:
+            Time = Time.astype('S')
+        except (UnicodeEncodeError, ValueError, TypeError):
+            return None
+    if Time.dtype.kind != 'S' or Time.dtype.itemsize == 0:
+        return None
+
+    n = len(Time[0])
+    if n == 0:
+        return None
+
+    try:
+        fmt = hapitime_format_str([Time[0].decode('ascii')])
+    except Exception:
+        return None
+
+    if not fmt.endswith('Z') and not allow_missing_Z:
+        return None
+
+    # Characters as columns of an (N, itemsize) array. Strings shorter than
+    # itemsize are padded with null bytes.
+    Time = np.ascontiguousarray(Time)
+    chars = Time.view(np.uint8).reshape(len(Time), Time.dtype.itemsize)
+    if n < chars.shape[1] and np.any(chars[:, n] != 0):
+        return None  # Some times are longer than first.
+
+    def number(start, stop):
+        # At most 9 digits, so int32 is sufficient.
+        value = np.zeros(len(Time), dtype=np.int32)
+        for k in range(start, stop):
+            digit = chars[:, k] - np.uint8(48)  # Non-digits wrap to > 9
+            if np.any(digit > 9):
+                raise ValueError
+            value *= 10
+            value += digit
+        return value
+
+    widths = {'Y': 4, 'm': 2, 'd': 2, 'j': 3, 'H': 2, 'M': 2, 'S': 2}
+    values = {}
+    pos = 0
+    i = 0
+    try:
+        while i < len(fmt):
+            if fmt[i] == '%':
+                code = fmt[i + 1]
+                if code == 'f':
+                    width = n - pos - fmt.endswith('Z')
+                    # Digits after the 9th (nanoseconds) are ignored.
+                    number(pos + min(width, 9), pos + width)
+                    values['f'] = number(pos, pos + min(width, 9))
+                    values['f'] *= 10**(9 - min(width, 9))
+                else:
+                    width = widths[code]
+                    values[code] = number(pos, pos + width)
+                pos = pos + width
+                i = i + 2
+            else:
+                if pos >= n or np.any(chars[:, pos] != ord(fmt[i])):
+                    return None
+                pos = pos + 1
+                i = i + 1
+    except ValueError:
+        return None
+
+    if pos != n:
+        return None
+
+    def inrange(code, lo, hi):
+        return code not in values or np.all((values[code] >= lo) & (values[code] <= hi))
+
+    # datetime64[ns] spans 1678-2262.
+    if not (inrange('Y', 1678, 2261) and inrange('m', 1, 12) and inrange('H', 0, 23)
+            and inrange('M', 0, 59) and inrange('S', 0, 59)):
+        return None
+
+    years = (values.pop('Y') - 1970).astype('datetime64[Y]')
+    if 'j' in values:
+        days = years.astype('datetime64[D]')
+        ndays = (years + 1).astype('datetime64[D]') - days
+        if np.any(values['j'] < 1) or np.any(values['j'] > ndays.astype(np.int64)):
+            return None
+        days = days + (values['j'] - 1).astype('timedelta64[D]')
+    else:
+        months = years.astype('datetime64[M]')
+        if 'm' in values:
+            months = months + (values['m'] - 1).astype('timedelta64[M]')
+        days = months.astype('datetime64[D]')
+        if 'd' in values:
+            ndays = (months + 1).astype('datetime64[D]') - days
+            if np.any(values['d'] < 1) or np.any(values['d'] > ndays.astype(np.int64)):
+                return None
+            days = days + (values['d'] - 1).astype('timedelta64[D]')
+
+    Time64 = days.astype('datetime64[ns]')
+    del days
+    ns = Time64.view(np.int64)
+    for code, factor in (('H', 3600 * 10**9), ('M', 60 * 10**9), ('S', 10**9), ('f', 1)):
+        if code in values:
+            ns += values.pop(code).astype(np.int64) * factor
+
+    return Time64
+
+
+def _datetime642datetime(Time64):
+    """Convert datetime64 array of UTC times to array of timezone-aware Python datetimes."""
+
+    from datetime import timezone
+
+    # Python datetimes have microsecond resolution.
+    Time64 = Time64.astype('datetime64[us]')
+    return pandas.DatetimeIndex(Time64).tz_localize(timezone.utc).to_pydatetime()
+
+
 def datetime2hapitime(dts):
     """Convert Python datetime object(s) to ISO 8601 string(s)
 
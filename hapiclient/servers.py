@@ -5,10 +5,15 @@ from hapiclient.util import urlopen
 def servers():
   server_list = 'https://github.com/hapi-server/servers/raw/master/all.txt'
 
-  log('Reading %s' % server_list)
-  # decode('utf8') in following needed to make Python 2 and 3 types match.
-  data = urlopen(server_list).read().decode('utf8').split('\n')
-  data = [x for x in data if x]  # Remove empty items (if blank lines)
+  from hapiclient.cache import metacache
+
+  def read():
+    log('Reading %s' % server_list)
+    # decode('utf8') in following needed to make Python 2 and 3 types match.
+    data = urlopen(server_list).read().decode('utf8').split('\n')
+    return [x for x in data if x]  # Remove empty items (if blank lines)
+
+  data = metacache.get(('servers', server_list), read)
   # Display server URLs to console.
   log('List of HAPI servers in %s:' % server_list)
   for url in data:
@@ -1,3 +1,5 @@
+import threading
+
 from hapiclient.log import log
 
 
@@ -11,9 +13,13 @@ def setopts(defaults, given):
 
     # Override defaults
     for key, value in given.items():
-        if type(given[key]) == dict:
+        if type(given[key]) == dict and len(defaults.get(key, {})) > 0:
             setopts(defaults[key], given[key])
             continue
+        if type(given[key]) == dict and key in defaults:
+            # Default is an empty dict, so any keys are allowed.
+            defaults[key] = given[key].copy()
+            continue
         if key in defaults:
             defaults[key] = value
         else:
@@ -253,12 +259,213 @@ def error(msg, debug=False):
     raise HAPIError(msg)
 
 
-def urlopen(url, parse_json=False):
+def poolopts():
+    """Return dict of default options for the shared HTTP connection pool.
+
+    These are the defaults for the ``pool`` option of hapi().
+
+    `num_pools` is the number of servers (hosts) for which connections are
+    kept open; `maxsize` is the number of connections kept open per host. If
+    `block` is True, no more than `maxsize` connections to a host are made and
+    a request waits for a free connection; otherwise extra connections are
+    opened when needed and closed after use. If `keepalive` is False, the
+    server is asked to close the connection after each response.
+    """
+
+    return {
+        'num_pools': 10,
+        'maxsize': 10,
+        'block': False,
+        'keepalive': True,
+        'connect_timeout': None,
+        'read_timeout': None,
+        'retries': 2
+    }
+
+
+_pool = None
+_pool_opts = None
+_pool_lock = threading.Lock()
+
+
+def pool(opts=None):
+    """Return the urllib3.PoolManager shared by all requests to servers.
+
+    ``pool()`` returns the shared pool, creating one with the options in
+    ``poolopts()`` if none exists.
+
+    ``pool(opts)`` returns the shared pool after (re)creating it if ``opts``,
+    a dict with keys in ``poolopts()``, differs from the options used to
+    create the existing pool. A replaced pool is not closed, so requests
+    in progress that use it are not interrupted.
+
+    Re-using connections avoids a new TCP and TLS handshake for each
+    /catalog, /info, /capabilities, and /data request.
+    """
+
+    import urllib3
+
+    global _pool, _pool_opts
+
+    if opts is None:
+        opts = _pool_opts if _pool_opts is not None else poolopts()
+    opts = setopts(poolopts(), opts)
+
+    with _pool_lock:
+        if _pool is not None and opts == _pool_opts:
+            return _pool
+
+        # A replaced pool is not cleared because requests in other threads
+        # may be using its connections. They are closed when it is
+        # garbage-collected.
+        log('Creating connection pool with options %s' % opts)
+        headers = None
+        if not opts['keepalive']:
+            headers = {'Connection': 'close'}
+        timeout = urllib3.Timeout(connect=opts['connect_timeout'], read=opts['read_timeout'])
+        _pool = urllib3.PoolManager(num_pools=opts['num_pools'],
+                                    maxsize=opts['maxsize'],
+                                    block=opts['block'],
+                                    headers=headers,
+                                    timeout=timeout)
+        _pool_opts = opts
+
+    return _pool
+
+
+def retry(retries):
+    """Return urllib3.Retry object for a request.
+
+    Connection errors and responses with HTTP status 429 (Too Many Requests)
+    or 503 (Service Unavailable) are retried up to `retries` times. Retries
+    after a 429 or 503 wait for the time in the response's Retry-After
+    header if given and otherwise back off exponentially. Waits are at most
+    backoff_max (120) seconds, so a server cannot stall requests with a
+    large Retry-After.
+    """
+
+    global _Retry
+
+    import urllib3
+
+    if _Retry is None:
+        class _Retry(urllib3.Retry):
+            def get_retry_after(self, response):
+                retry_after = super().get_retry_after(response)
+                if retry_after is not None:
+                    retry_after = min(retry_after, _backoff_max(self))
+                return retry_after
+
+    return _Retry(total=retries,
+                  status_forcelist=[429, 503],
+                  backoff_factor=_retry_backoff_factor,
+                  raise_on_status=False)
+
+
+_Retry = None
+_retry_backoff_factor = 0.5
+
+
+def _backoff_max(policy):
+    """Return maximum backoff in seconds of urllib3.Retry object `policy`.
+
+    backoff_max is an attribute of Retry objects only in urllib3 >= 2.
+    """
+
+    import urllib3
+
+    return getattr(policy, 'backoff_max', getattr(urllib3.Retry, 'DEFAULT_BACKOFF_MAX', 120))
+
+
+def retry_wait(attempt, retry_after=None):
+    """Return seconds to wait before retry number `attempt` (1, 2, ...) of a request.
+
+    This is the wait used by the urllib3.Retry object returned by retry()
+    for requests not made with urllib3 (see hapiclient.aio): the time in the
+    Retry-After header value `retry_after` if given and otherwise an
+    exponential backoff.
+    """
+
+    import urllib3
+
+    policy = urllib3.Retry(backoff_factor=_retry_backoff_factor)
+
+    if retry_after is not None:
+        try:
+            return min(policy.parse_retry_after(retry_after), _backoff_max(policy))
+        except urllib3.exceptions.InvalidHeader:
+            pass
+
+    if attempt <= 1:
+        return 0
+
+    return min(_backoff_max(policy), _retry_backoff_factor * 2 ** (attempt - 1))
+
+
+def throttled(res):
+    """Return True if request for response res was retried after a 429 or 503.
+
+    Also True if res has status 429 or 503 (see the throttle_ok argument of
+    urlopen()).
+    """
+
+    if res.status in (429, 503):
+        return True
+    history = res.retries.history if res.retries is not None else ()
+    return any(h.status in (429, 503) for h in history)
+
+
+_contact = " If problem persists, a contact email for the server may be listed "
+_contact = _contact + "at http://hapi-server.org/servers/"
+
+
+def http_error_message(url, status, body):
+    """Return error message for a response with a non-200 HTTP status.
+
+    body is the response body as bytes. If it contains HAPI JSON with a
+    status message, the message is included.
+    """
+
+    c = _contact
+    msg = ''
+    msgo = "Problem with " + url + \
+           ". Server responded with non-200 HTTP status (" + \
+           str(status) + ") "
+    try:
+        from json import loads
+        jres = loads(body.decode('utf-8'))
+    except Exception:
+        msg = msgo + "and invalid JSON in response body." + c
+
+    if msg == '':
+        if 'status' in jres:
+            if 'message' in jres['status']:
+                msg = msgo + 'and error message: %s\n' % (jres['status']['message'])
+            else:
+                msg = msgo + "and no error message in status element of response body." + c
+        else:
+            msg = msgo + "and JSON without HAPI status in response body." + c
+
+    return msg
+
+
+def urlopen(url, parse_json=False, headers=None, throttle_ok=False):
     """Wrapper to request.get() in urllib3
     res = urlopen(url) returns the response object from urllib3.
 
     res = urlopen(url, parse_json=True) return response from url as a Python dict
     by parsing JSON. If JSON cannot be parsed, an error is raised.
+
+    res = urlopen(url, headers=headers) adds the dict headers to the request
+    headers. If headers has If-None-Match or If-Modified-Since (a conditional
+    request), a response with HTTP status 304 (Not Modified) is not an error.
+
+    res = urlopen(url, throttle_ok=True) returns the response if the server
+    still responds with HTTP status 429 or 503 after retries instead of
+    raising an error, so the caller can make fewer requests at a time and
+    try again.
+
+    Requests are made using the connection pool returned by pool().
     """
 
     import urllib3
@@ -272,31 +479,19 @@ def urlopen(url, parse_json=False):
             return obj.__class__.__name__
         return module + '.' + obj.__class__.__name__
 
-    c = " If problem persists, a contact email for the server may be listed "
-    c = c + "at http://hapi-server.org/servers/"
+    c = _contact
     msg = ''
     try:
-        http = urllib3.PoolManager()
-        res = http.request('GET', url, preload_content=False, retries=2)
-        if res.status != 200:
-            msgo = "Problem with " + url + \
-                   ". Server responded with non-200 HTTP status (" + \
-                   str(res.status) + ") "
-            try:
-                from json import loads
-                jres = loads(res.read().decode('utf-8'))
-            except Exception:
-                msg = msgo + "and invalid JSON in response body." + c
-
-            if msg == '':
-                if 'status' in jres:
-                    if 'message' in jres['status']:
-                        msg = msgo + 'and error message: %s\n' % (jres['status']['message'])
-                    else:
-                        msg = msgo + "and no error message in status element of response body." + c
-                else:
-                    msg = msgo + "and JSON without HAPI status in response body." + c
-
+        http = pool()
+        kwargs = {}
+        if headers is not None:
+            kwargs['headers'] = {**http.headers, **headers}
+        res = http.request('GET', url, preload_content=False, retries=retry(_pool_opts['retries']), **kwargs)
+        conditional = headers is not None and ('If-None-Match' in headers or 'If-Modified-Since' in headers)
+        if res.status in (429, 503) and throttle_ok:
+            return res
+        if res.status != 200 and not (res.status == 304 and conditional):
+            msg = http_error_message(url, res.status, res.read())
             raise HAPIError(msg)
 
     except HAPIError:
@@ -500,6 +695,10 @@ def write_atomic(path, data):
         with tmp_path.open('wb') as f:
           numpy.save(f, data)
 
+    if path.suffix == '.npz':
+      with tmp_path.open('wb') as f:
+        numpy.savez(f, **data)
+
     if path.suffix in ('.bin', '.csv'):
       with tmp_path.open('wb') as f:
         if isinstance(data, (bytes, bytearray)):
@@ -0,0 +1,49 @@
+# Count TCP connections opened for a chunked request to a local stand-in HAPI
+# server with and without re-use of connections in the shared pool.
+#
+# Usage:
+#   python misc/bench_connections.py [n_chunks]
+#
+# keepalive=False approximates the behavior before the shared pool was
+# added, when each request used a new urllib3.PoolManager() and so a new
+# connection.
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'test'))
+
+from hapiclient import hapi
+from util.hapi_server import HAPIServer
+
+n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 365
+
+dataset = 'dataset2'  # cadence = PT1H
+parameters = 'scalar'
+start = '1970-01-01T00:00:00Z'
+stop = '1971-01-01T00:00:00Z'
+
+runs = [
+  ('keepalive=False', {'parallel': False, 'pool': {'keepalive': False}}),
+  ('keepalive=True', {'parallel': False, 'pool': {'keepalive': True}}),
+  ('keepalive=False, parallel', {'parallel': True, 'pool': {'keepalive': False}}),
+  ('keepalive=True, parallel', {'parallel': True, 'pool': {'keepalive': True}}),
+  ('keepalive=True, parallel, maxsize=2', {'parallel': True, 'pool': {'keepalive': True, 'maxsize': 2}}),
+  ('keepalive=True, parallel, maxsize=2, block', {'parallel': True, 'pool': {'keepalive': True, 'maxsize': 2, 'block': True}}),
+]
+
+cachedir = tempfile.mkdtemp()
+print('{} chunks'.format(n_chunks))
+print('{:45s} {:>12s} {:>9s} {:>8s}'.format('options', 'connections', 'requests', 'time'))
+with HAPIServer() as server:
+  for label, opts in runs:
+    opts = {'cache': False, 'usecache': False, 'cachedir': cachedir, 'n_chunks': n_chunks, **opts}
+    server.reset()
+    tic = time.time()
+    data, meta = hapi(server.url, dataset, parameters, start, stop, **opts)
+    toc = time.time() - tic
+    print('{:45s} {:12d} {:9d} {:7.2f}s'.format(label, server.connections, server.requests, toc))
+
+shutil.rmtree(cachedir, ignore_errors=True)
@@ -0,0 +1,60 @@
+# Time and peak memory for converting an array of HAPI times.
+#
+# Usage:
+#   python misc/bench_hapitime.py [n_times]
+#
+# "pandas" and "strptime" are the methods used by hapitime2datetime() before
+# the vectorized parser was added, for YYYY-MM-DD and YYYY-DOY times,
+# respectively.
+import sys
+import time
+import tracemalloc
+import warnings
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas
+
+from hapiclient import hapitime2datetime, hapitime2datetime64
+
+n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+
+t = np.datetime64('2000-01-01T00:00:00') + np.arange(n).astype('timedelta64[ms]') * 50
+iso = np.datetime_as_string(t, unit='ms')
+doy = (t.astype('datetime64[D]') - t.astype('datetime64[Y]')).astype(int) + 1
+Times = {
+  'YYYY-MM-DD': np.array([x + 'Z' for x in iso], dtype='S'),
+  'YYYY-DOY': np.array(['%s-%03d%sZ' % (x[0:4], d, x[10:]) for x, d in zip(iso, doy)], dtype='S')
+}
+
+
+def pandas_(Time):
+  with warnings.catch_warnings():
+    warnings.filterwarnings('ignore', message='Could not infer format')
+    return pandas.to_datetime(Time.astype('U')).tz_convert(timezone.utc).to_pydatetime()
+
+
+def strptime(Time):
+  Time = Time.astype('U')
+  out = np.empty(len(Time), dtype=object)
+  for i in range(len(Time)):
+    out[i] = datetime.strptime(Time[i], '%Y-%jT%H:%M:%S.%fZ').replace(tzinfo=timezone.utc)
+  return out
+
+
+print('{} times'.format(n))
+print('{:12s} {:20s} {:>12s} {:>8s}'.format('format', 'method', 'peak memory', 'time'))
+for fmt, Time in Times.items():
+  before = pandas_ if fmt == 'YYYY-MM-DD' else strptime
+  for method in [before, hapitime2datetime, hapitime2datetime64]:
+    tic = time.time()
+    result = method(Time)
+    toc = time.time() - tic
+    del result
+    # Memory is measured in a second call because tracing slows execution.
+    tracemalloc.start()
+    result = method(Time)
+    peak = tracemalloc.get_traced_memory()[1] / 2**20
+    tracemalloc.stop()
+    del result
+    print('{:12s} {:20s} {:8.0f} MiB {:7.2f}s'.format(fmt, method.__name__, peak, toc))
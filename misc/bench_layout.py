@@ -0,0 +1,55 @@
+# Time for parsing a binary response for a wide dataset with only numeric
+# parameters and for reductions over one parameter, for each layout option.
+#
+# Usage:
+#   python misc/bench_layout.py [n_records] [n_parameters]
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+from hapiclient.get import _parse_binary
+
+n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+n_parameters = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+n_repeat = 20
+
+meta = {'parameters': [{'name': 'Time', 'type': 'isotime', 'length': 24}]}
+for i in range(n_parameters):
+  meta['parameters'].append({'name': 'p%d' % i, 'type': 'double'})
+
+dt = [('Time', 'S24')] + [('p%d' % i, '<d') for i in range(n_parameters)]
+data = np.zeros(n_records, dtype=dt)
+data['Time'] = b'1970-01-01T00:00:00.000Z'
+for i in range(n_parameters):
+  data['p%d' % i] = np.random.random(n_records)
+
+fname = os.path.join(tempfile.mkdtemp(), 'bench.bin')
+data.tofile(fname)
+del data
+
+print('{} records, {} parameters'.format(n_records, n_parameters))
+print('{:12s} {:>8s} {:>12s} {:>12s}'.format('layout', 'parse', 'sum(p0)', 'mean(p0>.5)'))
+for layout in ['structured', 'columnar']:
+  opts = {'format': 'binary', 'method': '', 'mmap': False, 'time_format': 'bytes', 'layout': layout}
+
+  tic = time.time()
+  data = _parse_binary(fname, meta, opts, '')
+  toc_parse = time.time() - tic
+
+  tic = time.time()
+  for i in range(n_repeat):
+    np.sum(data['p0'])
+  toc_sum = (time.time() - tic) / n_repeat
+
+  tic = time.time()
+  for i in range(n_repeat):
+    np.mean(data['p0'] > 0.5)
+  toc_mean = (time.time() - tic) / n_repeat
+
+  print('{:12s} {:7.3f}s {:10.5f}s {:10.5f}s'.format(layout, toc_parse, toc_sum, toc_mean))
+  del data
+
+os.remove(fname)
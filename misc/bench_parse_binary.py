@@ -0,0 +1,63 @@
+# Peak memory and time for parsing a binary response for a wide dataset with
+# only numeric parameters.
+#
+# Usage:
+#   python misc/bench_parse_binary.py [n_records] [n_parameters]
+#
+# "copy" is the method used before _parse_binary() returned the array read
+# when no parameters need to be decoded: all fields are copied into a second
+# array.
+import os
+import sys
+import time
+import tempfile
+import tracemalloc
+
+import numpy as np
+
+from hapiclient.get import _parse_binary
+
+n_records = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+n_parameters = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+
+meta = {'parameters': [{'name': 'Time', 'type': 'isotime', 'length': 24}]}
+for i in range(n_parameters):
+  meta['parameters'].append({'name': 'p%d' % i, 'type': 'double'})
+
+opts = {'format': 'binary', 'method': '', 'mmap': False, 'time_format': 'bytes', 'layout': 'structured'}
+
+dt = [('Time', 'S24')] + [('p%d' % i, '<d') for i in range(n_parameters)]
+data = np.zeros(n_records, dtype=dt)
+data['Time'] = b'1970-01-01T00:00:00.000Z'
+
+fname = os.path.join(tempfile.mkdtemp(), 'bench.bin')
+data.tofile(fname)
+del data
+
+
+def copy(fname):
+  data = np.fromfile(fname, dtype=dt)
+  datanew = np.ndarray(shape=data.shape, dtype=dt)
+  for name in data.dtype.names:
+    datanew[name] = data[name]
+  return datanew
+
+
+def zerocopy(fname):
+  return _parse_binary(fname, meta, opts, fname)
+
+
+size = os.path.getsize(fname) / 2**20
+print('{} records, {} parameters, {:.1f} MiB'.format(n_records, n_parameters + 1, size))
+print('{:10s} {:>14s} {:>8s}'.format('method', 'peak memory', 'time'))
+for method in [copy, zerocopy]:
+  tracemalloc.start()
+  tic = time.time()
+  result = method(fname)
+  toc = time.time() - tic
+  peak = tracemalloc.get_traced_memory()[1] / 2**20
+  tracemalloc.stop()
+  del result
+  print('{:10s} {:10.1f} MiB {:7.3f}s'.format(method.__name__, peak, toc))
+
+os.remove(fname)
@@ -0,0 +1,60 @@
+# Time for parsing a synthetic HAPI CSV file using one and more processes,
+# for the pandas method and, if pyarrow is installed, the arrow method.
+#
+# Usage:
+#   python misc/bench_parse_csv.py [size in MB] [n_parse ...]
+#
+# The file has a time, a scalar, and a 3-element vector parameter. It is
+# written by repeating a block of 100000 records, so times are not
+# monotonic; this does not affect parsing.
+import os
+import sys
+import time
+import tempfile
+
+import numpy as np
+
+from hapiclient.get import _parse_csv_response
+
+size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+n_parses = [int(n) for n in sys.argv[2:]] or sorted(set([1, 2, 4, os.cpu_count() or 1]))
+
+meta = {
+  'parameters': [
+    {'name': 'Time', 'type': 'isotime', 'length': 24},
+    {'name': 'scalar', 'type': 'double'},
+    {'name': 'vector', 'type': 'double', 'size': [3]}
+  ]
+}
+
+opts = {'format': 'csv', 'method': '', 'time_format': 'bytes', 'layout': 'structured'}
+
+n = 100000
+t = np.datetime64('2000-01-01T00:00:00') + np.arange(n).astype('timedelta64[ms]') * 50
+x = np.random.random((n, 4))
+block = ''.join('{}Z,{:.6f},{:.6f},{:.6f},{:.6f}\n'.format(t[i], *x[i]) for i in range(n)).encode()
+
+fname = os.path.join(tempfile.mkdtemp(), 'bench.csv')
+with open(fname, 'wb') as f:
+  for i in range(max(1, size * 2**20 // len(block))):
+    f.write(block)
+
+print('{:.0f} MB, {} records'.format(os.path.getsize(fname) / 2**20, os.path.getsize(fname) // len(block) * n))
+methods = ['pandas']
+try:
+  import pyarrow
+  methods.append('arrow')
+except ImportError:
+  pass
+
+print('{:>8s} {:>8s} {:>8s}'.format('method', 'n_parse', 'time'))
+for method in methods:
+  for n_parse in n_parses:
+    opts['method'] = method
+    opts['n_parse'] = n_parse
+    tic = time.time()
+    data = _parse_csv_response(fname, meta, opts, '')
+    print('{:>8s} {:8d} {:7.2f}s'.format(method, n_parse, time.time() - tic))
+    del data
+
+os.remove(fname)
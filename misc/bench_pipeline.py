@@ -0,0 +1,111 @@
+# Time for a chunked request to a local stand-in HAPI server that adds a
+# fixed latency to each data response. The server runs in a separate process
+# so that it does not compete with the client for the GIL.
+#
+# Usage:
+#   python misc/bench_pipeline.py [n_chunks] [latency in seconds]
+#
+# "threads" is the method used before chunks were downloaded and parsed in
+# separate stages: each of n_parallel threads downloads and then parses a
+# chunk, so a thread does not start its next download until its parse is done.
+import os
+import sys
+import time
+import shutil
+import tempfile
+import multiprocessing
+from urllib.parse import urlparse, parse_qs
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'test'))
+
+from joblib import Parallel, delayed
+
+from hapiclient import hapi
+from hapiclient.hapi import hapiopts
+from hapiclient.data import data, _chunk_plan, _chunk_interval, _ChunkBuffer
+from util.hapi_server import HAPIServer, records, binary, csv
+
+bodies = {}
+
+n_chunks = int(sys.argv[1]) if len(sys.argv) > 1 else 24
+latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.1
+
+dataset = 'dataset1'  # cadence = PT1S
+parameters = 'scalar,vector'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-02T00:00:00Z'
+
+
+def hook(handler):
+  # Responses are generated once and then re-used so that the time to
+  # generate them is not included in the time for a request.
+  if '/data?' not in handler.path:
+    return None
+  if handler.path not in bodies:
+    query = {k: v[0] for k, v in parse_qs(urlparse(handler.path).query).items()}
+    rows = records(query['id'], query['parameters'], query['time.min'], query['time.max'])
+    if query.get('format') == 'binary':
+      bodies[handler.path] = (binary(query['id'], query['parameters'], rows), 200, 'application/octet-stream')
+    else:
+      bodies[handler.path] = (csv(rows), 200, 'text/csv')
+  time.sleep(latency)
+  return bodies[handler.path]
+
+
+def serve(queue, done):
+  with HAPIServer(hook=hook) as server:
+    queue.put(server.url)
+    done.wait()
+
+
+def threads(url, **kwargs):
+  opts = hapiopts()
+  opts.update(kwargs)
+  tic = time.time()
+  pSTART, pDELTA, n = _chunk_plan(start, stop, opts)
+
+  def chunk(i):
+    START, STOP = _chunk_interval(pSTART, pDELTA, i)
+    return data(url, dataset, parameters, START, STOP, opts.copy())
+
+  resD, resM = zip(*Parallel(n_jobs=opts['n_parallel'], backend='threading')(
+    delayed(chunk)(i) for i in range(n)))
+
+  chunks = _ChunkBuffer(n, start, stop)
+  for i in range(n):
+    chunks.add(i, resD[i], resM[i])
+
+  return chunks.result(tic)
+
+
+def pipelined(url, **kwargs):
+  return hapi(url, dataset, parameters, start, stop, **kwargs)
+
+
+if __name__ == '__main__':
+  queue = multiprocessing.Queue()
+  done = multiprocessing.Event()
+  server = multiprocessing.Process(target=serve, args=(queue, done))
+  server.start()
+  url = queue.get()
+
+  cachedir = tempfile.mkdtemp()
+  for format in ['csv', 'binary']:
+    # Generate responses.
+    pipelined(url, cache=False, usecache=False, format=format, n_chunks=n_chunks, parallel=True)
+
+  print('{} chunks, {:.2f} s latency'.format(n_chunks, latency))
+  print('{:10s} {:>8s} {:>10s} {:>8s}'.format('method', 'format', 'n_parallel', 'time'))
+  for format in ['csv', 'binary']:
+    for n_parallel in [2, 4]:
+      for method in [threads, pipelined]:
+        opts = {'cache': False, 'usecache': False, 'cachedir': cachedir, 'format': format,
+                'n_chunks': n_chunks, 'parallel': True, 'n_parallel': n_parallel}
+        tic = time.time()
+        method(url, **opts)
+        toc = time.time() - tic
+        print('{:10s} {:>8s} {:10d} {:7.2f}s'.format(method.__name__, format, n_parallel, toc))
+
+  done.set()
+  server.join()
+  shutil.rmtree(cachedir, ignore_errors=True)
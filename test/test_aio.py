@@ -0,0 +1,209 @@
+# See ../README.md for instructions on running tests.
+import shutil
+import asyncio
+import tempfile
+
+import pytest
+import numpy as np
+
+from hapiclient import hapi, hapi_async
+from hapiclient import aio
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+
+@pytest.fixture(params=['aiohttp', 'executor'])
+def transport(request, monkeypatch):
+    # 'executor' is the fallback used when aiohttp is not installed.
+    if request.param == 'aiohttp' and aio.aiohttp is None:
+        pytest.skip('aiohttp not installed')
+    if request.param == 'executor':
+        monkeypatch.setattr(aio, 'aiohttp', None)
+    return request.param
+
+
+def test_metadata(transport):
+
+    logger.info("test_metadata() with %s" % transport)
+
+    with HAPIServer() as server:
+        catalog = asyncio.run(hapi_async(server.url))
+        assert catalog == hapi(server.url)
+
+        meta = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', **kwargs))
+        assert meta == hapi(server.url, 'dataset1', 'scalar', **kwargs)
+
+
+def test_data(transport):
+
+    logger.info("test_data() with %s" % transport)
+
+    with HAPIServer() as server:
+        for parameters in ['scalar,vector', 'scalarstr']:
+            for format in ['binary', 'csv']:
+                for n_chunks in [None, 5]:
+                    opts = {**kwargs, 'format': format, 'n_chunks': n_chunks}
+                    data1, meta1 = hapi(server.url, 'dataset1', parameters, start, stop, **opts)
+                    data2, meta2 = asyncio.run(hapi_async(server.url, 'dataset1', parameters, start, stop, **opts))
+                    assert compare.equal(data1, data2)
+                    assert meta2['x_time.max'] == meta1['x_time.max']
+
+
+def test_data_gather(transport):
+
+    logger.info("test_data_gather() with %s" % transport)
+
+    stops = ['1970-01-01T00:0%d:00Z' % (i + 1) for i in range(5)]
+
+    async def main(url):
+        return await asyncio.gather(
+            *[hapi_async(url, 'dataset1', 'scalar', start, s, **kwargs) for s in stops]
+        )
+
+    with HAPIServer() as server:
+        results = asyncio.run(main(server.url))
+
+    for s, (data, meta) in zip(stops, results):
+        assert meta['x_time.max'] == s
+        assert len(data) == 60 * (stops.index(s) + 1)
+
+
+def test_data_cache(transport):
+
+    logger.info("test_data_cache() with %s" % transport)
+
+    cachedir = tempfile.mkdtemp()
+    opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir}
+
+    with HAPIServer() as server:
+        data1, _ = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts))
+        server.reset()
+        data2, _ = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts))
+        assert server.requests == 0
+        data3, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts)
+        assert server.requests == 0
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+    assert compare.equal(data1, data2)
+    assert compare.equal(data1, data3)
+
+
+def test_iterate(transport):
+
+    logger.info("test_iterate() with %s" % transport)
+
+    async def main(url):
+        chunks = []
+        opts = {**kwargs, 'n_chunks': 4, 'iterate': True}
+        async for data, meta in await hapi_async(url, 'dataset1', 'scalar', start, stop, **opts):
+            chunks.append(data)
+        return chunks
+
+    with HAPIServer() as server:
+        chunks = asyncio.run(main(server.url))
+        data, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **kwargs)
+
+    assert len(chunks) == 4
+    assert compare.equal(np.concatenate(chunks), data)
+
+
+def test_data_meta(transport):
+
+    logger.info("test_data_meta() with %s" % transport)
+
+    cachedir = tempfile.mkdtemp()
+    opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir}
+
+    with HAPIServer() as server:
+        _, meta1 = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts)
+        shutil.rmtree(cachedir, ignore_errors=True)
+        _, meta2 = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts))
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+    # Same steps as hapi() after the request, so the same meta keys.
+    assert sorted(meta1) == sorted(meta2)
+    assert 'x_responseHeaders' in meta2
+
+
+def test_retry_throttled(transport):
+
+    import threading
+
+    logger.info("test_retry_throttled() with %s" % transport)
+
+    # First /data request for each path gets a 429 or 503 response.
+    seen = set()
+    lock = threading.Lock()
+
+    def hook(handler):
+        if '/data?' not in handler.path:
+            return None
+        with lock:
+            if handler.path in seen:
+                return None
+            seen.add(handler.path)
+        status = 429 if 'scalar' in handler.path else 503
+        return ({'HAPI': '2.0', 'status': {'code': 1500, 'message': 'Busy'}}, status, 'application/json', {'Retry-After': '0'})
+
+    with HAPIServer(hook=hook) as server:
+        opts = {**kwargs, 'n_chunks': 2}
+        data, _ = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts))
+        assert len(data) == 600
+        assert len([path for path in server.paths if '/data?' in path]) == 4
+
+
+def test_n_parallel_server(transport):
+
+    import time
+    import threading
+
+    logger.info("test_n_parallel_server() with %s" % transport)
+
+    # Number of /data requests being handled at a time.
+    active = [0, 0]  # current, maximum
+    lock = threading.Lock()
+
+    def hook(handler):
+        if '/data?' in handler.path:
+            with lock:
+                active[0] = active[0] + 1
+                active[1] = max(active)
+            time.sleep(0.05)
+            with lock:
+                active[0] = active[0] - 1
+        return None
+
+    with HAPIServer(hook=hook) as server:
+        opts = {**kwargs, 'n_chunks': 6, 'parallel': True, 'n_parallel': 5,
+                'n_parallel_server': {server.url: 2}}
+        data, _ = asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts))
+        assert len(data) == 600
+        assert active[1] == 2
+
+        with pytest.warns(Warning, match='adaptive'):
+            asyncio.run(hapi_async(server.url, 'dataset1', 'scalar', start, stop, **opts, adaptive=True))
+
+
+if __name__ == '__main__':
+    test_metadata('aiohttp')
+    test_data('aiohttp')
+    test_data_gather('aiohttp')
+    test_data_cache('aiohttp')
+    test_iterate('aiohttp')
+    test_data_meta('aiohttp')
+    test_n_parallel_server('aiohttp')
+    test_retry_throttled('aiohttp')
@@ -114,6 +114,96 @@ def test_cache_error():
     assert_data_valid(data)
 
 
+def test_cache_mmap():
+
+    import numpy as np
+    from util.hapi_server import HAPIServer
+
+    # Memory-mapped reads of .bin and .npy files give same result as reads
+    # into memory.
+    opts = {**kwargs, 'cache': True}
+    parameters = 'scalar,vector'
+    with HAPIServer() as server:
+        shutil.rmtree(opts['cachedir'], ignore_errors=True)
+        data, _ = hapi(server.url, dataset, parameters, start, stop, **opts)
+        assert not isinstance(data, np.memmap)
+
+        # .bin file memory-mapped.
+        data2, _ = hapi(server.url, dataset, parameters, start, stop, **opts, mmap=True)
+        assert isinstance(data2, np.memmap)
+        assert compare.equal(data, data2)
+
+        # .npy file memory-mapped.
+        opts['usecache'] = True
+        requests = server.requests
+        data3, _ = hapi(server.url, dataset, parameters, start, stop, **opts, mmap=True)
+        assert server.requests == requests
+        assert isinstance(data3, np.memmap)
+        assert not data3.flags.writeable
+        assert compare.equal(data, data3)
+
+
+def test_cache_intervals():
+
+    from util.hapi_server import HAPIServer
+
+    # Requests for time ranges that are fully or partly covered by cached
+    # requests should give the same result as a request to the server, and
+    # only the parts not cached should be requested from the server.
+    opts = {**kwargs, 'cache': True, 'usecache': True}
+    dataset = 'dataset2'
+    parameters = 'scalar'
+    with HAPIServer() as server:
+        shutil.rmtree(opts['cachedir'], ignore_errors=True)
+        hapi(server.url, dataset, parameters, '1970-01-01Z', '1970-02-01Z', **opts)
+
+        requests = [
+            ('1970-01-01Z', '1970-01-15Z', 0),                 # Subset
+            ('1970-01-20T05:00:00Z', '1970-02-10Z', 1),        # Overlap at end
+            ('1969-12-31T12:00:00Z', '1970-02-12Z', 2),        # Overlap at both ends
+        ]
+        for start, stop, n_data_requests in requests:
+            server.reset()
+            data, meta = hapi(server.url, dataset, parameters, start, stop, **opts)
+            paths = [path for path in server.paths if '/data?' in path]
+            assert len(paths) == n_data_requests
+
+            data2, meta = hapi(server.url, dataset, parameters, start, stop, **kwargs)
+            assert data.dtype == data2.dtype
+            assert compare.equal(data, data2)
+
+
+def test_cache_parameter_subset():
+
+    from util.hapi_server import HAPIServer
+
+    # Requests for a subset of the parameters in a cached request should not
+    # make requests to the server and should give the same result as a
+    # request to the server.
+    opts = {**kwargs, 'cache': True, 'usecache': True}
+    dataset = 'dataset1'
+    start = '1970-01-01T00:00:00Z'
+    stop = '1970-01-01T01:00:00Z'
+    with HAPIServer() as server:
+        shutil.rmtree(opts['cachedir'], ignore_errors=True)
+        hapi(server.url, dataset, 'scalar,scalarstr,vector', start, stop, **opts)
+
+        for parameters in ['scalar', 'scalarstr', 'scalar,vector']:
+            for stop2 in [stop, '1970-01-01T00:30:00Z']:
+                server.reset()
+                data, meta = hapi(server.url, dataset, parameters, start, stop2, **opts)
+                assert server.requests == 0
+                assert meta['x_parameters'] == parameters
+                assert [p['name'] for p in meta['parameters']] == ['Time'] + parameters.split(',')
+
+                data2, meta2 = hapi(server.url, dataset, parameters, start, stop2, **kwargs)
+                assert data.dtype.names == data2.dtype.names
+                assert compare.equal(data, data2)
+
+
 if __name__ == '__main__':
   test_cache_short()
-  test_cache_error()
\ No newline at end of file
+  test_cache_error()
+  test_cache_mmap()
+  test_cache_intervals()
+  test_cache_parameter_subset()
\ No newline at end of file
@@ -0,0 +1,164 @@
+# See ../README.md for instructions on running tests.
+import os
+import time
+import shutil
+import tempfile
+
+from hapiclient import hapi
+from hapiclient.cache import metacache, cache_list, cache_usage, cache_evict, cache_clear, interval_index_read
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+parameters = 'scalar'
+
+starts = ['1970-01-01T00:00:00Z', '1970-01-01T01:00:00Z', '1970-01-01T02:00:00Z']
+stops = ['1970-01-01T00:10:00Z', '1970-01-01T01:10:00Z', '1970-01-01T02:10:00Z']
+
+
+def _starts(entries):
+    return [entry['key'].split('_')[-2] for entry in entries]
+
+
+def test_cache_index():
+
+    logger.info("test_cache_index()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {'cache': True, 'usecache': True, 'cachedir': cachedir, 'logging': False}
+
+    with HAPIServer() as server:
+        # If cache_max_bytes is None, entries are added when data are
+        # written but reads are not recorded.
+        hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **opts)
+        hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **opts)
+        entries = cache_list(server=server.url, basedir=cachedir)
+        assert len(entries) == 1 and entries[0]['hits'] == 1
+        assert cache_usage(basedir=cachedir) == entries[0]['size']
+        assert cache_clear(server=server.url, basedir=cachedir) == [entries[0]['key']]
+        assert not [f for f in os.listdir(os.path.dirname(os.path.join(cachedir, entries[0]['key'])))
+                    if f.startswith(os.path.basename(entries[0]['key']))]
+        shutil.rmtree(cachedir, ignore_errors=True)
+
+        opts = {**opts, 'cache_max_bytes': 10**9}
+        for dataset in ['dataset1', 'dataset2']:
+            for start, stop in zip(starts, stops):
+                hapi(server.url, dataset, parameters, start, stop, **opts)
+
+        entries = cache_list(basedir=cachedir)
+        assert len(entries) == 6
+        for entry in entries:
+            files = [f for f in os.listdir(os.path.join(cachedir, os.path.dirname(entry['key'])))
+                     if f.startswith(os.path.basename(entry['key']) + '.')]
+            assert sorted(files) == sorted([os.path.basename(entry['key']) + ext for ext in ['.bin', '.npy', '.pkl']])
+        size = cache_usage(server=server.url, dataset='dataset1', basedir=cachedir)
+        size2 = cache_usage(dataset='dataset2', basedir=cachedir)
+        assert size > 0 and cache_usage(basedir=cachedir) == size + size2
+
+        # Reading from the cache updates access time and hits.
+        time.sleep(0.01)
+        hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **opts)
+        entries = cache_list(dataset='dataset1', basedir=cachedir)
+        assert _starts(entries) == ['19700101T010000', '19700101T020000', '19700101T000000']
+        assert [entry['hits'] for entry in entries] == [1, 1, 2]
+
+        removed = cache_clear(dataset='dataset2', basedir=cachedir)
+        assert len(removed) == 3
+        assert interval_index_read(server.url, 'dataset2', cachedir) == []
+        assert len(interval_index_read(server.url, 'dataset1', cachedir)) == 3
+        assert cache_usage(basedir=cachedir) == size
+
+        # Least recently used entry evicted.
+        removed = cache_evict(0.8 * size, basedir=cachedir)
+        assert len(removed) == 1 and removed[0].endswith('19700101T010000_19700101T011000')
+        assert len(interval_index_read(server.url, 'dataset1', cachedir)) == 2
+
+        # Least frequently used entry evicted when data are written.
+        server.reset()
+        opts = {**opts, 'cache_max_bytes': 0.8 * size, 'cache_eviction': 'lfu'}
+        hapi(server.url, 'dataset1', parameters, starts[1], stops[1], **opts)
+        assert server.requests == 1
+        assert _starts(cache_list(basedir=cachedir)) == ['19700101T000000', '19700101T010000']
+
+        # Most recently used entry kept.
+        hapi(server.url, 'dataset1', parameters, starts[2], stops[2], **{**opts, 'cache_eviction': 'lru'})
+        assert _starts(cache_list(basedir=cachedir)) == ['19700101T010000', '19700101T020000']
+
+        server.reset()
+        hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **opts)
+        assert server.requests == 1
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+def test_cache_index_key():
+
+    from hapiclient.cache import request2path, data_cache_paths, cache_index_add, cache_index_touch
+
+    logger.info("test_cache_index_key()")
+
+    # Entry for a request written and read has all of its files when names
+    # have a '.'.
+    cachedir = tempfile.mkdtemp()
+    opts = {'cachedir': cachedir, 'cache_max_bytes': 10**9, 'cache_eviction': 'lru'}
+    args = ('http://localhost/hapi', 'AC_H0.MFI', 'Bx.GSE', starts[0], stops[0])
+    root = request2path(*args, cachedir)
+    os.makedirs(os.path.dirname(root))
+    fnames = data_cache_paths(*args, cachedir, time_format='datetime64')
+    for ext in ['bin', 'npy', 'pkl']:
+        with open(fnames[ext], 'wb') as f:
+            f.write(b'x')
+
+    cache_index_add(*args, opts)
+    cache_index_touch(fnames['npy'], opts)
+    entries = cache_list(basedir=cachedir)
+    assert len(entries) == 1
+    assert entries[0]['key'] == os.path.relpath(root, cachedir)
+    assert entries[0]['size'] == 3 and entries[0]['hits'] == 2
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+
+def test_cache_index_chunks():
+
+    from unittest.mock import patch
+    from hapiclient import cache
+
+    logger.info("test_cache_index_chunks()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {'cache': True, 'usecache': True, 'cachedir': cachedir, 'logging': False,
+            'cache_max_bytes': 10**9, 'n_chunks': 5}
+
+    with HAPIServer() as server:
+        for parallel in [False, True]:
+            # Index is updated once for the chunks written and once for the
+            # chunks read.
+            for hits in [1, 2]:
+                with patch.object(cache, '_cache_index_update', wraps=cache._cache_index_update) as update:
+                    hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **opts, parallel=parallel)
+                assert update.call_count == 1
+                entries = cache_list(basedir=cachedir)
+                assert len(entries) == 5
+                assert [entry['hits'] for entry in entries] == [hits] * 5
+            cache_clear(basedir=cachedir)
+
+        # Chunks written earlier in a request are evicted.
+        hapi(server.url, 'dataset1', parameters, starts[0], stops[0], **{**opts, 'n_chunks': None})
+        max_bytes = 0.25 * cache_usage(basedir=cachedir)
+        cache_clear(basedir=cachedir)
+        opts = {**opts, 'cache_max_bytes': max_bytes, 'n_chunks': 10}
+        data, _ = hapi(server.url, 'dataset1', parameters, starts[1], stops[1], **opts)
+        assert len(data) == 600
+        assert 0 < cache_usage(basedir=cachedir) <= max_bytes
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+if __name__ == '__main__':
+    test_cache_index()
+    test_cache_index_key()
+    test_cache_index_chunks()
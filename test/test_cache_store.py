@@ -0,0 +1,156 @@
+# See ../README.md for instructions on running tests.
+import os
+import shutil
+import asyncio
+import tempfile
+
+import pytest
+import numpy as np
+
+from hapiclient import hapi, hapi_async
+from hapiclient.cache import metacache, data_cache_paths, data_cache_write_records
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+dataset = 'dataset1'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+kwargs = {'cache': False, 'usecache': False, 'logging': False}
+
+
+def _files(server, parameters, cachedir, time_format='bytes'):
+    paths = data_cache_paths(server.url, dataset, parameters, start, stop, cachedir, time_format)
+    return sorted(ext for ext in ['bin', 'csv', 'npy'] if os.path.isfile(paths[ext]))
+
+
+def test_cache_store():
+
+    logger.info("test_cache_store()")
+
+    expected = {
+        'raw': {'binary': ['bin'], 'csv': ['csv']},
+        'parsed': {'binary': ['npy'], 'csv': ['npy']},
+        'both': {'binary': ['bin', 'npy'], 'csv': ['csv', 'npy']}
+    }
+
+    with HAPIServer() as server:
+        # 'scalar,vector' has no string parameters, so a binary response is
+        # written directly to the .npy file for 'parsed'.
+        for parameters in ['scalar,vector', '']:
+            for format in ['binary', 'csv']:
+                data0, _ = hapi(server.url, dataset, parameters, start, stop, **kwargs, format=format)
+                for cache_store in ['raw', 'parsed', 'both']:
+                    cachedir = tempfile.mkdtemp()
+                    opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir,
+                            'format': format, 'cache_store': cache_store}
+
+                    data1, meta1 = hapi(server.url, dataset, parameters, start, stop, **opts)
+                    assert _files(server, parameters, cachedir) == expected[cache_store][format]
+                    assert compare.comparisonOK(data0, data1)
+                    assert meta1['x_dataFormat'] == format
+
+                    server.reset()
+                    data2, meta2 = hapi(server.url, dataset, parameters, start, stop, **opts)
+                    assert server.requests == 0
+                    assert compare.comparisonOK(data0, data2)
+                    if cache_store == 'raw' and format == 'binary' and parameters != '':
+                        # Records are used without a copy.
+                        assert isinstance(data2, np.memmap)
+
+                    shutil.rmtree(cachedir, ignore_errors=True)
+
+    metacache.clear()
+
+
+def test_cache_store_convert():
+
+    logger.info("test_cache_store_convert()")
+
+    cachedir = tempfile.mkdtemp()
+
+    with HAPIServer() as server:
+        for time_format in ['bytes', 'datetime64']:
+            for cache_store in ['raw', 'parsed']:
+                opts = {**kwargs, 'time_format': time_format, 'layout': 'columnar'}
+                data0, _ = hapi(server.url, dataset, 'scalar', start, stop, **opts)
+                opts = {**opts, 'cache': True, 'usecache': True, 'cachedir': cachedir, 'cache_store': cache_store}
+                hapi(server.url, dataset, 'scalar', start, stop, **opts)
+                server.reset()
+                data1, _ = hapi(server.url, dataset, 'scalar', start, stop, **opts)
+                assert server.requests == 0
+                for name in data0:
+                    assert np.array_equal(data0[name], data1[name])
+                shutil.rmtree(cachedir, ignore_errors=True)
+
+        # Response cached with cache_store='raw' is used when read with
+        # another cache_store.
+        for format in ['binary', 'csv']:
+            opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir, 'format': format}
+            data0, _ = hapi(server.url, dataset, 'scalar', start, stop, **opts, cache_store='raw')
+            server.reset()
+            for cache_store in ['both', 'parsed']:
+                data1, _ = hapi(server.url, dataset, 'scalar', start, stop, **opts, cache_store=cache_store)
+                assert compare.comparisonOK(data0, data1)
+            assert server.requests == 0
+            shutil.rmtree(cachedir, ignore_errors=True)
+
+        # Segments of a request with only the response cached.
+        opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir, 'cache_store': 'raw'}
+        hapi(server.url, dataset, 'scalar', start, '1970-01-01T00:05:00Z', **opts)
+        server.reset()
+        data, _ = hapi(server.url, dataset, 'scalar', start, stop, **opts)
+        assert server.requests == 1
+        assert len(data) == 600
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+def test_cache_store_chunks():
+
+    logger.info("test_cache_store_chunks()")
+
+    with HAPIServer() as server:
+        data0, _ = hapi(server.url, dataset, 'scalar,vector', start, stop, **kwargs)
+        for cache_store in ['raw', 'parsed']:
+            cachedir = tempfile.mkdtemp()
+            opts = {**kwargs, 'cache': True, 'cachedir': cachedir, 'cache_store': cache_store, 'n_chunks': 3}
+            data1, _ = hapi(server.url, dataset, 'scalar,vector', start, stop, **opts, parallel=True)
+            data2, _ = asyncio.run(hapi_async(server.url, dataset, 'scalar,vector', start, stop, **opts))
+            assert compare.comparisonOK(data0, data1)
+            assert compare.comparisonOK(data0, data2)
+            shutil.rmtree(cachedir, ignore_errors=True)
+
+    metacache.clear()
+
+
+def test_data_cache_write_records():
+
+    logger.info("test_data_cache_write_records()")
+
+    cachedir = tempfile.mkdtemp()
+    fname = os.path.join(cachedir, 'records.npy')
+    data = np.zeros(5, dtype=[('Time', 'S24'), ('x', '<d', 3)])
+    data['x'] = np.random.random((5, 3))
+
+    for n in [0, 5]:
+        data_cache_write_records(fname, data[:n].tobytes(), data.dtype)
+        assert np.array_equal(np.load(fname), data[:n])
+        assert np.array_equal(np.load(fname, mmap_mode='r'), data[:n])
+
+    with pytest.raises(ValueError):
+        data_cache_write_records(fname, data.tobytes()[:-1], data.dtype)
+    assert os.listdir(cachedir) == ['records.npy']
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    test_cache_store()
+    test_cache_store_convert()
+    test_cache_store_chunks()
+    test_data_cache_write_records()
@@ -1,4 +1,7 @@
+import os
+import shutil
 import logging
+import tempfile
 import isodate
 
 from datetime import datetime
@@ -272,8 +275,279 @@ def test_timeformats():
     _compare(data1, data, meta1, meta, opts1, opts)
 
 
+def test_iterate():
+
+    import numpy as np
+    from util.hapi_server import HAPIServer
+
+    logger.info("test_iterate()")
+
+    # Concatenation of chunks from iterate=True should match result when
+    # iterate=False.
+    d = 'dataset2'
+    p = 'scalar'
+    start = '1970-01-01T05:10:00Z'
+    stop = '1970-01-20T03:00:00Z'
+
+    with HAPIServer() as server:
+        s = server.url
+        opts1 = _cat(opts0, {'dt_chunk': None})
+        data1, meta1 = hapi(s, d, p, start, stop, **opts1)
+
+        for opts in [_cat(opts0, {'dt_chunk': 'P1D'}), _cat(opts0, {'n_chunks': 7}), opts1]:
+            chunks = list(hapi(s, d, p, start, stop, iterate=True, **opts))
+            if opts.get('dt_chunk') == 'P1D':
+                assert len(chunks) == 20
+            if opts.get('n_chunks') == 7:
+                assert len(chunks) == 7
+            if opts is opts1:
+                assert len(chunks) == 1
+            data = np.concatenate([chunk[0] for chunk in chunks])
+            meta = chunks[0][1]
+            _compare(data1, data, meta1, meta, opts1, opts)
+
+
+def test_pipelined():
+
+    import time
+    import shutil
+    import tempfile
+    from util.hapi_server import HAPIServer
+
+    logger.info("test_pipelined()")
+
+    # Chunks downloaded and parsed in separate stages when parallel=True
+    # should match result when parallel=False. Each data response is delayed
+    # so that downloads overlap.
+    def hook(handler):
+        if '/data?' in handler.path:
+            time.sleep(0.01)
+
+    d = 'dataset1'
+    start = '1970-01-01T00:00:00Z'
+    stop = '1970-01-01T00:30:00Z'
+    cachedir = tempfile.mkdtemp()
+
+    with HAPIServer(hook=hook) as server:
+        s = server.url
+        for p in ['scalar,vector', 'scalarstr']:
+            for format in ['binary', 'csv']:
+                for cache in [False, True]:
+                    opts1 = _cat(opts0, {'format': format, 'n_chunks': 6, 'cache': cache, 'cachedir': cachedir})
+                    data1, meta1 = hapi(s, d, p, start, stop, **opts1)
+                    opts = _cat(opts1, {'parallel': True, 'n_parallel': 3})
+                    data, meta = hapi(s, d, p, start, stop, **opts)
+                    assert meta['x_dataFilesParsed'] == meta1['x_dataFilesParsed']
+                    _compare(data1, data, meta1, meta, opts1, opts)
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+
+def test_adaptive():
+
+    import time
+    import threading
+    from util.hapi_server import HAPIServer
+
+    logger.info("test_adaptive()")
+
+    # Number of data requests in progress at a time should not exceed
+    # n_parallel or n_parallel_server and results should match result when
+    # parallel=False.
+    state = {'active': 0, 'max': 0, 'throttle': False}
+    lock = threading.Lock()
+
+    def hook(handler):
+        if '/data?' not in handler.path:
+            return None
+        with lock:
+            state['active'] += 1
+            state['max'] = max(state['max'], state['active'])
+            throttle = state['throttle']
+            state['throttle'] = False
+        time.sleep(0.02)
+        with lock:
+            state['active'] -= 1
+        if throttle:
+            return (b'', 429, 'text/plain', {'Retry-After': '0'})
+        return None
+
+    d = 'dataset2'
+    p = 'scalar'
+    start = '1970-01-01T00:00:00Z'
+    stop = '1970-01-25T00:00:00Z'
+
+    with HAPIServer(hook=hook) as server:
+        s = server.url
+        opts1 = _cat(opts0, {'n_chunks': 24})
+        data1, meta1 = hapi(s, d, p, start, stop, **opts1)
+
+        runs = [
+            ({'n_parallel': 3}, 3),
+            ({'n_parallel': 3, 'adaptive': True}, 3),
+            ({'n_parallel': 4, 'n_parallel_server': {s: 2}}, 2)
+        ]
+        for opts, n_max in runs:
+            state['max'] = 0
+            state['throttle'] = True
+            opts = _cat(opts1, {'parallel': True, **opts})
+            data, meta = hapi(s, d, p, start, stop, **opts)
+            logger.info('  %s: max %d requests at a time' % (opts, state['max']))
+            assert 0 < state['max'] <= n_max
+            _compare(data1, data, meta1, meta, opts1, opts)
+
+
+def test_concurrency():
+
+    from hapiclient.data import _Concurrency
+
+    logger.info("test_concurrency()")
+
+    concurrency = _Concurrency(4, adaptive=False)
+    assert concurrency.limit == 4
+    concurrency.update(1, 100, True)
+    assert concurrency.limit == 4
+
+    concurrency = _Concurrency(4)
+    assert concurrency.limit == 1
+    for n in range(20):
+        # Throughput always increases because nbytes increases.
+        concurrency.update(0, 10**(n + 3), False)
+    assert concurrency.limit == 4
+
+    concurrency.update(0, 0, True)
+    assert concurrency.limit == 2
+    concurrency.update(0, 0, True)
+    concurrency.update(0, 0, True)
+    assert concurrency.limit == 1
+
+
+def test_chunk_buffer():
+
+    import numpy as np
+    from hapiclient.data import _ChunkBuffer
+
+    logger.info("test_chunk_buffer()")
+
+    # Chunks added out of order, an empty chunk, a chunk larger than the
+    # length estimated from the first, and a string field with a different
+    # length.
+    def chunk(t0, n, itemsize=3):
+        data = np.zeros(n, dtype=[('Time', 'S20'), ('s', 'S%d' % itemsize)])
+        Time = np.datetime64('1970-01-01T00:00:00') + np.arange(t0, t0 + n).astype('timedelta64[s]')
+        data['Time'] = [t + 'Z' for t in np.datetime_as_string(Time)]
+        data['s'] = 'abc'[0:itemsize]
+        return data
+
+    chunks = [chunk(0, 10), chunk(10, 0), chunk(10, 100), chunk(110, 10, itemsize=2), chunk(120, 10)]
+    meta = [{'x_time.max': i, 'x_dataFile': None, 'x_downloadTime': 0, 'x_readTime': 0,
+             'x_dataFileParsed': None} for i in range(len(chunks))]
+
+    expected = np.concatenate(chunks)[2:-2]
+
+    for outfile in [None, os.path.join(tempfile.mkdtemp(), 'out.npy')]:
+        buffer = _ChunkBuffer(len(chunks), '1970-01-01T00:00:02Z', '1970-01-01T00:02:08Z', outfile=outfile)
+        for i in [1, 3, 0, 4, 2]:
+            buffer.add(i, chunks[i], meta[i])
+        data, meta_combined = buffer.result(0)
+        assert data.dtype == expected.dtype
+        assert np.array_equal(data, expected)
+        assert meta_combined['x_time.max'] == len(chunks) - 1
+        if outfile is not None:
+            assert isinstance(data, np.memmap)
+            assert np.array_equal(np.load(outfile), expected)
+            del data
+            shutil.rmtree(os.path.dirname(outfile), ignore_errors=True)
+
+    # First allocation is not sized for all chunks using the number of
+    # records in the first, which may be much larger than in the others.
+    chunks = [chunk(0, 100)] + [chunk(100 + i, 1) for i in range(99)]
+    meta = [{**meta[0], 'x_time.max': i} for i in range(len(chunks))]
+    expected = np.concatenate(chunks)
+
+    for outfile in [None, os.path.join(tempfile.mkdtemp(), 'out.npy')]:
+        buffer = _ChunkBuffer(len(chunks), '1970-01-01T00:00:00Z', '1970-01-01T00:10:00Z', outfile=outfile)
+        buffer.add(0, chunks[0], meta[0])
+        assert buffer.size < 5 * 100
+        for i in range(1, len(chunks)):
+            buffer.add(i, chunks[i], meta[i])
+        data, _ = buffer.result(0)
+        assert np.array_equal(data, expected)
+        if outfile is not None:
+            # File truncated to records copied.
+            assert os.path.getsize(outfile) < expected.nbytes + 1024
+            del data
+            shutil.rmtree(os.path.dirname(outfile), ignore_errors=True)
+
+
+def test_outfile():
+
+    import numpy as np
+    from util.hapi_server import HAPIServer
+
+    logger.info("test_outfile()")
+
+    d = 'dataset1'
+    start = '1970-01-01T00:00:00Z'
+    stop = '1970-01-01T00:30:00Z'
+    tmpdir = tempfile.mkdtemp()
+    outfile = os.path.join(tmpdir, 'out.npy')
+
+    with HAPIServer() as server:
+        for parallel in [False, True]:
+            opts1 = _cat(opts0, {'cache': False, 'n_chunks': 6, 'parallel': parallel})
+            data1, meta1 = hapi(server.url, d, 'scalar,vector', start, stop, **opts1)
+            opts = _cat(opts1, {'outfile': outfile})
+            data, meta = hapi(server.url, d, 'scalar,vector', start, stop, **opts)
+            assert isinstance(data, np.memmap)
+            assert meta['x_dataFileParsed'] == outfile
+            _compare(data1, data, meta1, meta, opts1, opts)
+            del data
+
+    shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def test_chunks_interval_index():
+
+    import asyncio
+    from unittest.mock import patch
+    from hapiclient import hapi_async
+    from hapiclient import cache
+    from util.hapi_server import HAPIServer
+
+    logger.info("test_chunks_interval_index()")
+
+    d = 'dataset1'
+    start = '1970-01-01T00:00:00Z'
+    stop = '1970-01-01T00:30:00Z'
+
+    with HAPIServer() as server:
+        for run in ['sequential', 'parallel', 'async']:
+            tmpdir = tempfile.mkdtemp()
+            opts = _cat(opts0, {'cache': True, 'cachedir': tmpdir, 'n_chunks': 6, 'parallel': run == 'parallel'})
+            with patch.object(cache, '_interval_index_write', wraps=cache._interval_index_write) as write:
+                if run == 'async':
+                    asyncio.run(hapi_async(server.url, d, 'scalar', start, stop, **opts))
+                else:
+                    hapi(server.url, d, 'scalar', start, stop, **opts)
+            # Intervals of all chunks written to the index at once.
+            assert write.call_count == 1
+            assert len(cache.interval_index_read(server.url, d, tmpdir)) == 6
+            assert cache._index_batches == {}
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    cache.metacache.clear()
+
+
 if __name__ == '__main__':
     test_chunks()
     test_parallel()
     test_chunk_threshold()
     test_timeformats()
+    test_iterate()
+    test_pipelined()
+    test_adaptive()
+    test_concurrency()
+    test_chunk_buffer()
+    test_outfile()
+    test_chunks_interval_index()
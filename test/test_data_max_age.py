@@ -0,0 +1,116 @@
+# See ../README.md for instructions on running tests.
+import time
+import shutil
+import tempfile
+from urllib.parse import urlparse, parse_qs
+
+from hapiclient import hapi
+from hapiclient.cache import metacache
+
+from util.hapi_server import HAPIServer, records, binary, csv
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+dataset = 'dataset1'
+parameters = 'scalar'
+
+# dataset1 has stopDate = 1970-01-10.
+start_old = '1970-01-01T00:00:00Z'
+stop_old = '1970-01-01T00:10:00Z'
+start_new = '1970-01-09T12:00:00Z'
+stop_new = '1970-01-09T12:10:00Z'
+
+
+class Hook:
+    """Responses to /data with an ETag header that depends on version."""
+
+    def __init__(self):
+        self.version = 1
+        self.not_modified = 0
+        self.modified = 0
+
+    def __call__(self, handler):
+        url = urlparse(handler.path)
+        if not url.path.endswith('/data'):
+            return None
+        etag = '"v%d"' % self.version
+        if handler.headers.get('If-None-Match', None) == etag:
+            self.not_modified += 1
+            return b'', 304, 'text/csv', {'ETag': etag}
+        if handler.headers.get('If-None-Match', None) is not None:
+            self.modified += 1
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        rows = records(query['id'], query['parameters'], query['time.min'], query['time.max'])
+        if query.get('format', 'csv') == 'binary':
+            return binary(query['id'], query['parameters'], rows), 200, 'application/octet-stream', {'ETag': etag}
+        return csv(rows), 200, 'text/csv', {'ETag': etag}
+
+
+def _count(server):
+    return len([path for path in server.paths if '/data?' in path])
+
+
+def test_data_max_age():
+
+    logger.info("test_data_max_age()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {'cache': True, 'usecache': True, 'cachedir': cachedir, 'logging': False, 'data_max_age': 0.5}
+    hook = Hook()
+
+    with HAPIServer(hook=hook) as server:
+        for start, stop in [(start_old, stop_old), (start_new, stop_new)]:
+            data, meta = hapi(server.url, dataset, parameters, start, stop, **opts)
+            assert meta['x_responseHeaders']['ETag'] == '"v1"'
+        server.reset()
+
+        # Within data_max_age, cached data are used.
+        hapi(server.url, dataset, parameters, start_new, stop_new, **opts)
+        assert _count(server) == 0
+
+        # After data_max_age, data for a time range near stopDate are
+        # revalidated; data for earlier time ranges are not.
+        time.sleep(0.6)
+        data1, _ = hapi(server.url, dataset, parameters, start_new, stop_new, **opts)
+        data2, _ = hapi(server.url, dataset, parameters, start_old, stop_old, **opts)
+        assert _count(server) == 1
+        assert hook.not_modified == 1
+        assert len(data1) == 600 and len(data2) == 600
+        # Connections used for 304 responses are returned to the pool.
+        for i in range(2):
+            time.sleep(0.6)
+            hapi(server.url, dataset, parameters, start_new, stop_new, **opts)
+        assert _count(server) == 3
+        assert server.connections <= 1
+
+        # Revalidation updated cache time.
+        server.reset()
+        hapi(server.url, dataset, parameters, start_new, stop_new, **opts)
+        assert _count(server) == 0
+
+        # Response to revalidation request is used for modified data.
+        time.sleep(0.6)
+        hook.version = 2
+        server.reset()
+        data, meta = hapi(server.url, dataset, parameters, start_new, stop_new, **opts)
+        assert _count(server) == 1
+        assert hook.modified == 1
+        assert len(data) == 600
+        assert meta['x_responseHeaders']['ETag'] == '"v2"'
+
+        # Part of a stale interval is requested again; without data_max_age
+        # cached data are always used.
+        time.sleep(0.6)
+        server.reset()
+        hapi(server.url, dataset, parameters, start_new, '1970-01-09T12:05:00Z', **opts)
+        assert _count(server) == 1
+        server.reset()
+        hapi(server.url, dataset, parameters, start_new, stop_new, **{**opts, 'data_max_age': None})
+        assert _count(server) == 0
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+if __name__ == '__main__':
+    test_data_max_age()
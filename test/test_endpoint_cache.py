@@ -0,0 +1,124 @@
+# See ../README.md for instructions on running tests.
+import os
+import shutil
+import tempfile
+
+from hapiclient import hapi
+from hapiclient.cache import metacache, endpoint_cache_paths
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+dataset = 'dataset1'
+parameters = 'scalar'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+status = {'code': 1200, 'message': 'OK request successful'}
+
+
+class Hook:
+    """Responses to /capabilities with an ETag header that depends on version."""
+
+    def __init__(self):
+        self.version = 1
+        self.not_modified = 0
+
+    def __call__(self, handler):
+        if not handler.path.split('?')[0].endswith('/capabilities'):
+            return None
+        etag = '"v%d"' % self.version
+        if handler.headers.get('If-None-Match', None) == etag:
+            self.not_modified += 1
+            return b'', 304, 'application/json', {'ETag': etag}
+        formats = ['csv', 'binary'] if self.version == 1 else ['csv']
+        body = {'HAPI': '2.0', 'status': status, 'outputFormats': formats}
+        return body, 200, 'application/json', {'ETag': etag}
+
+
+def _count(server, endpoint):
+    return len([path for path in server.paths if path.split('?')[0].endswith('/' + endpoint)])
+
+
+def test_endpoint_cache():
+
+    logger.info("test_endpoint_cache()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {'cache': True, 'usecache': True, 'cachedir': cachedir, 'logging': False}
+    hook = Hook()
+
+    with HAPIServer(hook=hook) as server:
+
+        metacache.clear()
+        data, meta = hapi(server.url, dataset, parameters, start, stop, **opts)
+        assert len(data) == 600
+        paths = endpoint_cache_paths(server.url, 'capabilities', cachedir)
+        assert os.path.isfile(paths['json']) and os.path.isfile(paths['pkl'])
+        assert os.path.isfile(endpoint_cache_paths(server.url, 'catalog', cachedir)['pkl'])
+
+        # New process: in-memory cache is empty. Cached response is
+        # revalidated and server responds with 304.
+        metacache.clear()
+        server.reset()
+        hapi(server.url, dataset, parameters, '1970-01-01T01:00:00Z', '1970-01-01T01:10:00Z', **opts)
+        assert _count(server, 'capabilities') == 1
+        assert hook.not_modified == 1
+        assert _count(server, 'catalog') == 0
+        assert _count(server, 'info') == 0
+
+        # Cached responses younger than meta_max_age are used without a request.
+        metacache.clear()
+        server.reset()
+        hapi(server.url, dataset, parameters, '1970-01-01T02:00:00Z', '1970-01-01T02:10:00Z', **opts, meta_max_age=3600)
+        assert server.requests == 1
+        assert _count(server, 'data') == 1
+
+        # Modified response is downloaded and used.
+        hook.version = 2
+        metacache.clear()
+        server.reset()
+        _, meta = hapi(server.url, dataset, parameters, '1970-01-01T03:00:00Z', '1970-01-01T03:10:00Z', **opts)
+        assert _count(server, 'capabilities') == 1
+        assert hook.not_modified == 1
+        assert meta['x_dataFile'].endswith('.csv')
+
+        # usecache=False: a request is made without validators.
+        metacache.clear()
+        server.reset()
+        hapi(server.url, **{**opts, 'usecache': False})
+        assert _count(server, 'catalog') == 1
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+def test_endpoint_cache_connections():
+
+    from hapiclient.hapi import hapiopts
+    from hapiclient.capabilities import capabilities
+
+    logger.info("test_endpoint_cache_connections()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {**hapiopts(), 'cache': True, 'usecache': True, 'cachedir': cachedir, 'logging': False}
+
+    with HAPIServer(hook=Hook()) as server:
+        capabilities(server.url, opts)
+        server.reset()
+        # Connection is returned to the pool after a 304 response, so it is
+        # used for the next request.
+        for i in range(3):
+            metacache.clear()
+            capabilities(server.url, opts)
+        assert server.requests == 3
+        assert server.connections <= 1
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+    metacache.clear()
+
+
+if __name__ == '__main__':
+    test_endpoint_cache()
+    test_endpoint_cache_connections()
@@ -111,6 +111,7 @@ def test_warning_conditions():
 
   import io
   import logging
+  from hapiclient import HAPIError
 
   logger.info("test_warning_conditions()")
 
@@ -122,9 +123,17 @@ def test_warning_conditions():
   logger2.propagate = False
 
   try:
-    Time = "2001-001T00:00:00Z"
-    hapitime2datetime(Time)
+    # Times with different formats can't be parsed by vectorized method.
+    # Pandas fails because of YYYY-DOY format. Element-by-element parsing
+    # fails because second time does not have format of first.
+    Time = ["2001-001T00:00:00Z", "2001-001T00:00:00.1Z"]
+    try:
+      hapitime2datetime(Time)
+    except HAPIError:
+      pass
     output = stream.getvalue()
+    assert "Vectorized processing not possible" in output, \
+        f"Expected 'Vectorized processing not possible' in log output, got:\n{output}"
     assert "Pandas processing failed with error" in output, \
         f"Expected 'Pandas processing failed with error' in log output, got:\n{output}"
   finally:
@@ -132,8 +141,64 @@ def test_warning_conditions():
     logger2.propagate = True
 
 
+def test_datetime64():
+  import numpy
+  from datetime import datetime, timedelta, timezone
+  from hapiclient import hapitime2datetime64
+
+  logger.info("test_datetime64()")
+
+  # Same results as element-by-element parsing for all formats.
+  start = datetime(1999, 12, 30, 22, 58, 59, 123456)
+  dts = [start + timedelta(days=k, hours=k, minutes=k, seconds=k) for k in range(800)]
+  for fmt in ['%Y-%m-%dT%H:%M:%S.%fZ', '%Y-%jT%H:%M:%S.%fZ', '%Y-%m-%dT%H:%M:%SZ',
+              '%Y-%jT%H:%MZ', '%Y-%m-%dT%HZ', '%Y-%jZ', '%Y-%m-%dZ', '%Y-%jT%H:%M:%S.Z']:
+    Time = numpy.array([dt.strftime(fmt) for dt in dts], dtype='S')
+    expected = numpy.array([datetime.strptime(t.decode(), fmt) for t in Time], dtype='datetime64[ns]')
+    Time64 = hapitime2datetime64(Time)
+    assert Time64.dtype == numpy.dtype('datetime64[ns]')
+    assert numpy.array_equal(Time64, expected), fmt
+    assert numpy.array_equal(hapitime2datetime64(Time.astype('U')), expected)
+    t = hapitime2datetime(Time)
+    assert numpy.array_equal(numpy.array([x.replace(tzinfo=None) for x in t], dtype='datetime64[ns]'), expected)
+    _assert_utc(t[0])
+
+  # Nanoseconds
+  Time = numpy.array([b'1970-001T00:00:01.0000000010Z', b'1970-001T00:00:02.1234567891Z'])
+  assert list(hapitime2datetime64(Time).view('int64')) == [1000000001, 2123456789]
+
+  # Null-padded strings and shape
+  Time = numpy.array([[b'2000-001Z', b'2000-366Z']], dtype='S12')
+  Time64 = hapitime2datetime64(Time)
+  assert Time64.shape == (1, 2)
+  assert str(Time64[0, 1]) == '2000-12-31T00:00:00.000000000'
+
+  # Not all same format; element-by-element parsing used.
+  Time = ['2000-01-01T00:00:00.0Z', '2000-01-01T00:00:00.50Z']
+  assert list(hapitime2datetime64(Time).view('int64') % 10**9) == [0, 5 * 10**8]
+
+  # Out of range value
+  from hapiclient import HAPIError
+  for Time in [['2001-367Z'], ['2001-02-29Z'], ['2001-01-01T24:00Z']]:
+    try:
+      hapitime2datetime64(Time)
+    except HAPIError:
+      pass
+    else:
+      assert False, "HAPIError not raised for hapitime2datetime64(" + str(Time) + ")."
+
+  # List with elements that are not strings
+  try:
+    hapitime2datetime64([1.0])
+  except HAPIError as e:
+    assert 'must be strings' in str(e)
+  else:
+    assert False, "HAPIError not raised for hapitime2datetime64([1.0])."
+
+
 if __name__ == '__main__':
   test_api()
   test_parsing()
   test_error_conditions()
   test_warning_conditions()
+  test_datetime64()
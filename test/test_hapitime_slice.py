@@ -0,0 +1,50 @@
+# See ../README.md for instructions on running tests.
+import numpy as np
+
+from hapiclient import hapitime_slice, hapitime2datetime64
+
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+
+def test_hapitime_slice():
+
+    logger.info("test_hapitime_slice()")
+
+    Time = np.array(['1970-01-01T00:00:%02d.5Z' % s for s in range(60)], dtype='S')
+    Time64 = hapitime2datetime64(Time)
+    Timens = Time64.view(np.int64)
+
+    cases = [
+        # start, stop, expected slice
+        (None, None, slice(0, 60)),
+        ('1970-01-01T00:00:10.5Z', None, slice(10, 60)),
+        (None, '1970-01-01T00:00:10.5Z', slice(0, 10)),
+        ('1970-01-01T00:00:10.5Z', '1970-01-01T00:00:20.5Z', slice(10, 20)),
+        # Bounds with more or less precision than Time.
+        ('1970-01-01T00:00:10.6Z', '1970-01-01T00:00:20.50001Z', slice(11, 21)),
+        ('1970-01-01T00:00Z', '1970-01-01T00:00:30Z', slice(0, 30)),
+        ('1970-001T00:00:10Z', '1970-001T00:00:20Z', slice(10, 20)),
+        # Bounds outside of Time; stop <= start.
+        ('1969-12-31T00Z', '1970-01-02Z', slice(0, 60)),
+        ('1970-01-02Z', None, slice(60, 60)),
+        ('1970-01-01T00:00:20Z', '1970-01-01T00:00:10Z', slice(20, 20)),
+    ]
+
+    for start, stop, expected in cases:
+        for T in [Time, Time.astype('U'), Time64, Timens, Timens / 1e9]:
+            s = hapitime_slice(T, start, stop)
+            assert s == expected, "{}/{} {}: {} != {}".format(start, stop, T.dtype, s, expected)
+
+    # Non-contiguous Time (field of a structured array); result is a view.
+    data = np.zeros(60, dtype=[('Time', 'S24'), ('x', 'f8')])
+    data['Time'] = Time
+    subset = data[hapitime_slice(data['Time'], '1970-01-01T00:00:10Z', '1970-01-01T00:00:20Z')]
+    assert np.shares_memory(subset, data)
+    assert np.array_equal(subset['Time'], Time[10:20])
+
+    assert hapitime_slice(np.array([], dtype='S24'), '1970-01-01Z') == slice(0, 0)
+
+
+if __name__ == '__main__':
+    test_hapitime_slice()
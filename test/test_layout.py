@@ -0,0 +1,95 @@
+# See ../README.md for instructions on running tests.
+import shutil
+import tempfile
+
+import numpy as np
+
+from hapiclient import hapi
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+
+def _equal(data, columns):
+    # data is a structured array and columns is a dict of arrays.
+    assert list(columns) == list(data.dtype.names)
+    for name in data.dtype.names:
+        assert columns[name].flags.c_contiguous
+        assert columns[name].dtype == data[name].dtype
+        assert np.array_equal(columns[name], data[name])
+    return True
+
+
+def test_layout():
+
+    logger.info("test_layout()")
+
+    with HAPIServer() as server:
+        for parameters in ['scalar,vector', 'scalarstr']:
+            for format in ['binary', 'csv']:
+                for n_chunks in [None, 3]:
+                    for time_format in ['bytes', 'datetime64']:
+                        opts = {**kwargs, 'format': format, 'n_chunks': n_chunks, 'time_format': time_format}
+                        data1, _ = hapi(server.url, 'dataset1', parameters, start, stop, **opts)
+                        data2, _ = hapi(server.url, 'dataset1', parameters, start, stop, **opts, layout='columnar')
+                        assert isinstance(data2, dict)
+                        assert _equal(data1, data2)
+
+
+def test_layout_cache():
+
+    logger.info("test_layout_cache()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir}
+
+    with HAPIServer() as server:
+        data1, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts)
+        data2, meta2 = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts, layout='columnar')
+        assert meta2['x_dataFileParsed'].endswith('.npz')
+        server.reset()
+        # Parsed data are cached separately for each layout. Requests for
+        # part of a cached time range or a subset of cached parameters are
+        # answered using cached data.
+        data3, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts, layout='columnar')
+        data4, _ = hapi(server.url, 'dataset1', 'vector', '1970-01-01T00:01:00Z',
+                        '1970-01-01T00:02:00Z', **opts, layout='columnar')
+        data5, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts)
+        assert server.requests == 0
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+    assert _equal(data1, data2)
+    assert _equal(data1, data3)
+    assert _equal(data1[60:120][['Time', 'vector']], data4)
+    assert np.array_equal(data1, data5)
+
+
+def test_layout_iterate():
+
+    logger.info("test_layout_iterate()")
+
+    opts = {**kwargs, 'n_chunks': 4, 'layout': 'columnar'}
+
+    with HAPIServer() as server:
+        data, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **kwargs)
+        chunks = [d for d, _ in hapi(server.url, 'dataset1', 'scalar', start, stop, **opts, iterate=True)]
+
+    assert len(chunks) == 4
+    assert _equal(data, {name: np.concatenate([c[name] for c in chunks]) for name in chunks[0]})
+
+
+if __name__ == '__main__':
+    test_layout()
+    test_layout_cache()
+    test_layout_iterate()
@@ -0,0 +1,144 @@
+# See ../README.md for instructions on running tests.
+import time
+import asyncio
+import threading
+
+from hapiclient import hapi, hapi_async
+from hapiclient.cache import MemoryCache, metacache
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+dataset = 'dataset2'
+parameters = 'scalar'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-11T00:00:00Z'
+
+
+def _count(server, endpoint):
+    return len([path for path in server.paths if '/' + endpoint in path])
+
+
+def test_metacache_chunks():
+
+    logger.info("test_metacache_chunks()")
+
+    for parallel in [False, True]:
+        with HAPIServer() as server:
+            opts = {**kwargs, 'n_chunks': 10, 'parallel': parallel}
+            data, _ = hapi(server.url, dataset, parameters, start, stop, **opts)
+            assert len(data) == 240
+            assert _count(server, 'data?') == 10
+            for endpoint in ['capabilities', 'catalog', 'info?']:
+                assert _count(server, endpoint) == 1, endpoint
+
+            server.reset()
+            hapi(server.url, dataset, parameters, start, stop, **opts)
+            meta = hapi(server.url, dataset, parameters, **kwargs)
+            assert [p['name'] for p in meta['parameters']] == ['Time', 'scalar']
+            assert server.requests == 10
+
+            # Cached values are copies.
+            meta['parameters'] = []
+            assert len(hapi(server.url, dataset, **kwargs)['parameters']) == 2
+
+            metacache.clear(server.url)
+            server.reset()
+            hapi(server.url, dataset, **kwargs)
+            assert _count(server, 'info?') == 1
+
+
+def test_metacache_async():
+
+    logger.info("test_metacache_async()")
+
+    for parallel in [False, True]:
+        with HAPIServer() as server:
+            opts = {**kwargs, 'n_chunks': 10, 'parallel': parallel}
+            data, _ = asyncio.run(hapi_async(server.url, dataset, parameters, start, stop, **opts))
+            assert len(data) == 240
+            assert _count(server, 'data?') == 10
+            for endpoint in ['capabilities', 'catalog', 'info?']:
+                assert _count(server, endpoint) == 1, endpoint
+            metacache.clear()
+
+
+def test_metacache_cachedir():
+
+    import os
+    import shutil
+    import tempfile
+
+    logger.info("test_metacache_cachedir()")
+
+    with HAPIServer() as server:
+        for hapi_ in [hapi, lambda *args, **kwargs: asyncio.run(hapi_async(*args, **kwargs))]:
+            # Metadata requested without cache=True are not used for a
+            # request with cache=True, which writes them to its cachedir.
+            hapi_(server.url, dataset, parameters, start, stop, **kwargs)
+            for i in range(2):
+                cachedir = tempfile.mkdtemp()
+                opts = {**kwargs, 'cache': True, 'format': 'binary', 'cachedir': cachedir}
+                _, meta = hapi_(server.url, dataset, parameters, start, stop, **opts)
+                assert os.path.isfile(meta['x_metaFile'])
+                server_dir = os.path.dirname(meta['x_metaFile'])
+                for endpoint in ['catalog', 'capabilities']:
+                    assert os.path.isfile(os.path.join(server_dir, endpoint + '.json'))
+                shutil.rmtree(cachedir, ignore_errors=True)
+            metacache.clear()
+
+
+def test_memory_cache():
+
+    logger.info("test_memory_cache()")
+
+    cache = MemoryCache(maxsize=2, ttl=0.2)
+    cache.store(('info', 'a', 'x'), {'n': 1})
+    cache.store(('info', 'b', 'x'), {'n': 2})
+    assert cache.lookup(('info', 'a', 'x')) == {'n': 1}
+    cache.store(('info', 'c', 'x'), {'n': 3})
+    # Least recently used item removed.
+    assert cache.lookup(('info', 'b', 'x')) is None
+    assert cache.lookup(('info', 'a', 'x')) == {'n': 1}
+
+    cache.clear('a')
+    assert cache.lookup(('info', 'a', 'x')) is None
+    assert cache.lookup(('info', 'c', 'x')) == {'n': 3}
+
+    time.sleep(0.25)
+    assert cache.lookup(('info', 'c', 'x')) is None
+
+    # Threads requesting the same key wait for one fetch.
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        time.sleep(0.1)
+        return {'n': 4}
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get(('info', 'd', 'x'), fetch))) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert results == [{'n': 4}] * 5
+
+    cache.ttl = 0
+    assert cache.get(('info', 'e', 'x'), fetch) == {'n': 4}
+    assert cache.lookup(('info', 'e', 'x')) is None
+
+
+if __name__ == '__main__':
+    test_metacache_chunks()
+    test_metacache_async()
+    test_metacache_cachedir()
+    test_memory_cache()
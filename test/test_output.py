@@ -0,0 +1,110 @@
+# See ../README.md for instructions on running tests.
+import asyncio
+
+import pytest
+import numpy as np
+
+from hapiclient import hapi, hapi_async
+from hapiclient import get
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+
+def test_output_pandas():
+
+    logger.info("test_output_pandas()")
+
+    with HAPIServer() as server:
+        for format in ['binary', 'csv']:
+            opts = {**kwargs, 'format': format}
+            data1, _ = hapi(server.url, 'dataset1', '', start, stop, **opts, time_format='datetime64')
+            df, _ = hapi(server.url, 'dataset1', '', start, stop, **opts, output='pandas')
+
+            assert list(df.columns) == ['Time', 'scalar', 'scalarint', 'scalarstr', 'vector_0', 'vector_1', 'vector_2']
+            assert df['Time'].dtype == 'datetime64[ns]'
+            assert np.array_equal(df['Time'].to_numpy(), data1['Time'])
+            assert np.array_equal(df['scalar'].to_numpy(), data1['scalar'], equal_nan=True)
+            assert np.array_equal(df['scalarint'].to_numpy(), data1['scalarint'])
+            assert df['scalarstr'].tolist() == data1['scalarstr'].tolist()
+            for i in range(3):
+                assert np.array_equal(df['vector_%d' % i].to_numpy(), data1['vector'][:, i])
+
+
+def test_output_arrow():
+
+    logger.info("test_output_arrow()")
+
+    pyarrow = pytest.importorskip('pyarrow')
+
+    with HAPIServer() as server:
+        for format in ['binary', 'csv']:
+            opts = {**kwargs, 'format': format}
+            data1, _ = hapi(server.url, 'dataset1', '', start, stop, **opts, time_format='datetime64')
+            table, _ = hapi(server.url, 'dataset1', '', start, stop, **opts, output='arrow')
+
+            assert table.column_names == list(data1.dtype.names)
+            assert table.schema.field('Time').type == pyarrow.timestamp('ns', tz='UTC')
+            assert table.schema.field('vector').type == pyarrow.list_(pyarrow.float64(), 3)
+            assert np.array_equal(table['Time'].to_numpy().astype('M8[ns]'), data1['Time'])
+            assert np.array_equal(np.array(table['vector'].to_pylist()), data1['vector'])
+            assert table['scalarstr'].to_pylist() == data1['scalarstr'].tolist()
+
+
+def test_output_no_copy():
+
+    logger.info("test_output_no_copy()")
+
+    columns = {
+        'Time': np.arange(10).astype('M8[ns]'),
+        'scalar': np.random.random(10),
+        'vector': np.random.random((10, 2, 3))
+    }
+
+    df = get._output(columns, {'output': 'pandas'})
+    assert df.shape == (10, 8)
+    assert np.shares_memory(df['scalar'].to_numpy(), columns['scalar'])
+    assert np.shares_memory(df['vector_1_2'].to_numpy(), columns['vector'])
+    assert np.array_equal(df['vector_1_2'].to_numpy(), columns['vector'][:, 1, 2])
+
+    pytest.importorskip('pyarrow')
+    table = get._output(columns, {'output': 'arrow'})
+    assert np.array_equal(np.array(table['vector'].to_pylist()), columns['vector'])
+    assert table['scalar'].chunk(0).buffers()[1].address == columns['scalar'].ctypes.data
+
+
+def test_output_iterate():
+
+    logger.info("test_output_iterate()")
+
+    opts = {**kwargs, 'n_chunks': 3, 'output': 'pandas'}
+
+    with HAPIServer() as server:
+        df, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts)
+        chunks = [d for d, _ in hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts, iterate=True)]
+
+        async def main():
+            return [d async for d, _ in await hapi_async(server.url, 'dataset1', 'scalar,vector', start, stop, **opts, iterate=True)]
+        chunks_async = asyncio.run(main())
+
+    assert len(chunks) == 3
+    for c in [chunks, chunks_async]:
+        assert [type(d) for d in c] == [type(df)] * 3
+        assert sum(len(d) for d in c) == len(df)
+
+
+if __name__ == '__main__':
+    test_output_pandas()
+    test_output_arrow()
+    test_output_no_copy()
+    test_output_iterate()
@@ -0,0 +1,123 @@
+# See ../README.md for instructions on running tests.
+import io
+import shutil
+
+import numpy as np
+
+from hapiclient import hapi
+from hapiclient.get import _read_binary_blocks, _parse_binary
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'cachedir': '/tmp/hapi-data',
+    'logging': False
+}
+
+dataset = 'dataset1'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T01:00:00Z'
+
+dt = np.dtype([('Time', 'S24'), ('scalar', '<d'), ('vector', '<d', 3)])
+
+
+class _Stream:
+    # File-like object without Content-Length that returns short reads.
+    def __init__(self, buff, nmax):
+        self.buff = io.BytesIO(buff)
+        self.nmax = nmax
+
+    def readinto(self, b):
+        chunk = self.buff.read(min(len(b), self.nmax))
+        b[:len(chunk)] = chunk
+        return len(chunk)
+
+
+def test_read_binary_blocks():
+
+    logger.info("test_read_binary_blocks()")
+
+    expected = np.zeros(10001, dtype=dt)
+    expected['Time'] = b'1970-01-01T00:00:00.000Z'
+    expected['scalar'] = np.arange(len(expected))
+    expected['vector'] = np.random.rand(len(expected), 3)
+    buff = expected.tobytes()
+
+    sources = [io.BytesIO(buff), _Stream(buff, 1000), _Stream(buff, 7)]
+    for source in sources:
+        data = _read_binary_blocks(source, dt, blocksize=4096)
+        assert data.dtype == dt
+        assert np.array_equal(data, expected)
+
+    assert len(_read_binary_blocks(io.BytesIO(b''), dt)) == 0
+
+    try:
+        _read_binary_blocks(io.BytesIO(buff[0:-1]), dt)
+    except ValueError as e:
+        assert 'not a multiple of record length' in str(e)
+    else:
+        assert False, "ValueError not raised for truncated response"
+
+
+def test_stream_vs_file():
+
+    logger.info("test_stream_vs_file()")
+
+    # Parsing binary response streamed from server (cache=False) and read from
+    # file (cache=True) should give same result.
+    with HAPIServer() as server:
+        shutil.rmtree(kwargs['cachedir'], ignore_errors=True)
+        data1, _ = hapi(server.url, dataset, '', start, stop, **kwargs)
+        data2, _ = hapi(server.url, dataset, '', start, stop, **{**kwargs, 'cache': True})
+
+    assert len(data1) == 3600
+    assert data1.dtype == data2.dtype
+    assert compare.equal(data1, data2)
+
+
+def test_unicode_decode():
+
+    logger.info("test_unicode_decode()")
+
+    meta = {
+        'parameters': [
+            {'name': 'Time', 'type': 'isotime', 'length': 24},
+            {'name': 'scalar', 'type': 'double'},
+            {'name': 'scalarstr', 'type': 'string', 'length': 4}
+        ]
+    }
+    opts = {'format': 'binary', 'method': '', 'mmap': False, 'time_format': 'bytes', 'layout': 'structured'}
+
+    raw = np.zeros(3, dtype=[('Time', 'S24'), ('scalar', '<d'), ('scalarstr', 'S4')])
+    raw['Time'] = b'1970-01-01T00:00:00.000Z'
+    raw['scalar'] = [1, 2, 3]
+    raw['scalarstr'] = ['P'.encode(), 'F'.encode(), 'Fα'.encode()]
+
+    # Numeric-only: array read is returned without a copy into a new array.
+    meta_numeric = {'parameters': meta['parameters'][0:2]}
+    numeric = np.zeros(3, dtype=[('Time', 'S24'), ('scalar', '<d')])
+    numeric['Time'] = raw['Time']
+    numeric['scalar'] = raw['scalar']
+    source = io.BytesIO(numeric.tobytes())
+    data = _parse_binary(source, meta_numeric, opts, '')
+    assert data.dtype == np.dtype([('Time', 'S24'), ('scalar', '<d')])
+    assert data.flags.owndata
+    assert np.array_equal(data['scalar'], raw['scalar'])
+
+    # String parameter is decoded to Unicode.
+    data = _parse_binary(io.BytesIO(raw.tobytes()), meta, opts, '')
+    assert data.dtype['scalarstr'] == np.dtype('U4')
+    assert list(data['scalarstr']) == ['P', 'F', 'Fα']
+    assert np.array_equal(data['scalar'], raw['scalar'])
+    assert np.array_equal(data['Time'], raw['Time'])
+
+
+if __name__ == '__main__':
+    test_read_binary_blocks()
+    test_stream_vs_file()
+    test_unicode_decode()
@@ -0,0 +1,51 @@
+# See ../README.md for instructions on running tests.
+import pytest
+
+from hapiclient import hapi
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'format': 'csv',
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+
+def test_parse_csv_arrow():
+
+    pytest.importorskip('pyarrow')
+
+    logger.info("test_parse_csv_arrow()")
+
+    with HAPIServer() as server:
+        for dataset, parameters in [('dataset1', 'scalar,vector'), ('dataset1', 'scalarstr'), ('dataset2', ''),
+                                    ('dataset_nolength', '')]:
+            data0, _ = hapi(server.url, dataset, parameters, start, stop, **kwargs, method='pandas')
+            data, _ = hapi(server.url, dataset, parameters, start, stop, **kwargs, method='arrow')
+            assert compare.comparisonOK(data0, data, a_name='pandas', b_name='arrow')
+
+
+def test_parse_csv_arrow_fallback(monkeypatch):
+
+    import sys
+
+    logger.info("test_parse_csv_arrow_fallback()")
+
+    # pandas is used if pyarrow is not installed.
+    monkeypatch.setitem(sys.modules, 'pyarrow', None)
+    with HAPIServer() as server:
+        data0, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **kwargs, method='pandas')
+        data, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **kwargs, method='arrow')
+    assert compare.equal(data0, data)
+
+
+if __name__ == '__main__':
+    test_parse_csv_arrow()
@@ -0,0 +1,75 @@
+# See ../README.md for instructions on running tests.
+from io import StringIO
+
+import numpy as np
+
+from hapiclient import hapi
+from hapiclient.get import _parse_csv_response
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+meta = {
+    'parameters': [
+        {'name': 'Time', 'type': 'isotime', 'length': 20},
+        {'name': 'str', 'type': 'string'},
+        {'name': 'iso', 'type': 'isotime'},
+        {'name': 'num', 'type': 'string'},
+        {'name': 'vec', 'type': 'string', 'size': [2]},
+        {'name': 'x', 'type': 'double'}
+    ]
+}
+
+csv = (
+    '1970-01-01T00:00:00Z,a,1970-01-01Z,1,ab,c,1.5\n'
+    '1970-01-01T00:00:01Z, "b, c",1970-01-01T00:00Z,22,é,NaN,NaN\n'
+    '1970-01-01T00:00:02Z,NaN,1970-01-01T00:00:00.000Z,333,"",d,2\n'
+)
+
+
+def test_parse_csv_missing_length():
+
+    logger.info("test_parse_csv_missing_length()")
+
+    for layout in ['structured', 'columnar']:
+        opts = {'format': 'csv', 'method': '', 'n_parse': 1, 'time_format': 'bytes', 'layout': layout}
+        data = _parse_csv_response(StringIO(csv), meta, opts, '')
+
+        assert data['str'].dtype == '<U4'
+        assert data['iso'].dtype == 'S24'
+        assert data['num'].dtype == '<U3'
+        assert data['vec'].dtype == '<U3' and data['vec'].shape == (3, 2)
+        assert data['str'].tolist() == ['a', 'b, c', 'nan']
+        assert data['iso'].tolist() == [b'1970-01-01Z', b'1970-01-01T00:00Z', b'1970-01-01T00:00:00.000Z']
+        assert data['num'].tolist() == ['1', '22', '333']
+        assert data['vec'].tolist() == [['ab', 'c'], ['é', 'nan'], ['', 'd']]
+        assert np.array_equal(data['x'], [1.5, np.nan, 2], equal_nan=True)
+
+
+def test_parse_csv_missing_length_methods():
+
+    logger.info("test_parse_csv_missing_length_methods()")
+
+    kwargs = {'format': 'csv', 'cache': False, 'usecache': False, 'logging': False}
+
+    with HAPIServer() as server:
+        data0, _ = hapi(server.url, 'dataset_nolength', '', start, stop, **kwargs, method='numpynolength')
+        data1, _ = hapi(server.url, 'dataset_nolength', '', start, stop, **kwargs, method='pandas')
+        data2, _ = hapi(server.url, 'dataset1', '', start, stop, **kwargs, method='pandasnolength')
+        data3, _ = hapi(server.url, 'dataset1', '', start, stop, **kwargs, method='pandas')
+
+    assert data0.dtype == data1.dtype
+    assert compare.comparisonOK(data0, data1, a_name='numpynolength', b_name='pandas')
+    # String lengths are from the data instead of the metadata.
+    assert data2['scalarstr'].dtype == '<U2'
+    assert all(data2[name].tolist() == data3[name].tolist() for name in data3.dtype.names)
+
+
+if __name__ == '__main__':
+    test_parse_csv_missing_length()
+    test_parse_csv_missing_length_methods()
@@ -0,0 +1,69 @@
+# See ../README.md for instructions on running tests.
+import os
+import shutil
+import tempfile
+
+from hapiclient import hapi
+from hapiclient import get
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T01:00:00Z'
+
+
+def test_csv_ranges(monkeypatch):
+
+    logger.info("test_csv_ranges()")
+
+    monkeypatch.setattr(get, '_csv_range_min', 10)
+
+    lines = [b'1970-01-01T00:00:%02dZ,%d\n' % (i, i) for i in range(10)]
+    fd, fname = tempfile.mkstemp()
+    with open(fd, 'wb') as f:
+        f.write(b''.join(lines))
+
+    for n in [1, 2, 3, 9, 100]:
+        ranges = get._csv_ranges(fname, n)
+        assert len(ranges) <= n
+        assert ranges[0][0] == 0
+        assert ranges[-1][1] == len(b''.join(lines))
+        with open(fname, 'rb') as f:
+            content = f.read()
+        parts = [content[a:b] for a, b in ranges]
+        assert b''.join(parts) == content
+        assert all(p.endswith(b'\n') for p in parts)
+
+    os.remove(fname)
+
+
+def test_parse_csv_parallel(monkeypatch):
+
+    logger.info("test_parse_csv_parallel()")
+
+    # Split cached CSV files into byte ranges of about 10 KB.
+    monkeypatch.setattr(get, '_csv_range_min', 10000)
+
+    cachedir = tempfile.mkdtemp()
+    opts = {'format': 'csv', 'cache': True, 'usecache': False, 'cachedir': cachedir, 'logging': False}
+
+    with HAPIServer() as server:
+        for parameters in ['scalar,vector', 'scalarstr']:
+            for layout in ['structured', 'columnar']:
+                data1, _ = hapi(server.url, 'dataset1', parameters, start, stop, **opts, layout=layout)
+                data2, _ = hapi(server.url, 'dataset1', parameters, start, stop, **opts, layout=layout, n_parse=3)
+                if layout == 'structured':
+                    assert compare.equal(data1, data2)
+                else:
+                    assert list(data1) == list(data2)
+                    assert all(data1[name].tolist() == data2[name].tolist() for name in data1)
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    import pytest
+    pytest.main([__file__])
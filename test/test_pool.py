@@ -0,0 +1,155 @@
+# See ../README.md for instructions on running tests.
+from hapiclient import hapi
+from hapiclient.util import pool, poolopts
+
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'cachedir': '/tmp/hapi-data',
+    'logging': False
+}
+
+dataset = 'dataset2'
+parameters = 'scalar'
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-11T00:00:00Z'
+
+
+def test_connection_reuse():
+
+    logger.info("test_connection_reuse()")
+
+    with HAPIServer() as server:
+        opts = {**kwargs, 'n_chunks': 10, 'pool': {'keepalive': True}}
+        data1, _ = hapi(server.url, dataset, parameters, start, stop, **opts)
+        logger.info('  keepalive=True:  %d connections for %d requests' % (server.connections, server.requests))
+        assert server.requests > 10
+        assert server.connections == 1
+
+        server.reset()
+        opts = {**kwargs, 'n_chunks': 10, 'pool': {'keepalive': False}}
+        data2, _ = hapi(server.url, dataset, parameters, start, stop, **opts)
+        logger.info('  keepalive=False: %d connections for %d requests' % (server.connections, server.requests))
+        assert server.connections == server.requests
+
+    assert len(data1) == 240
+    assert (data1 == data2).all()
+
+
+def test_pool_options():
+
+    logger.info("test_pool_options()")
+
+    p1 = pool(poolopts())
+    assert pool() is p1
+    assert pool(poolopts()) is p1
+
+    p2 = pool({'maxsize': 3})
+    assert p2 is not p1
+    assert p2.connection_pool_kw['maxsize'] == 3
+    assert pool() is p2
+
+    p3 = pool(poolopts())
+    assert p3.connection_pool_kw['maxsize'] == poolopts()['maxsize']
+
+    # A request in progress when the pool is replaced is not interrupted.
+    with HAPIServer() as server:
+        res = p3.request('GET', server.url + '/catalog', preload_content=False)
+        p4 = pool({'maxsize': 4})
+        assert p4 is not p3
+        assert len(res.read()) > 0
+        res.release_conn()
+        assert len(p3.pools) == 1
+    pool(poolopts())
+
+
+def test_retry_throttled():
+
+    import threading
+    from hapiclient.util import urlopen, throttled
+
+    logger.info("test_retry_throttled()")
+
+    # First request for each path gets a 429 or 503 response, which should be
+    # retried after the time in the Retry-After header.
+    seen = set()
+    lock = threading.Lock()
+
+    def hook(handler):
+        with lock:
+            if handler.path in seen:
+                return None
+            seen.add(handler.path)
+        status = 429 if 'capabilities' in handler.path else 503
+        return ({'HAPI': '2.0', 'status': {'code': 1500, 'message': 'Busy'}}, status, 'application/json', {'Retry-After': '0'})
+
+    with HAPIServer(hook=hook) as server:
+        res = urlopen(server.url + '/capabilities')
+        assert res.status == 200
+        assert throttled(res)
+
+        res = urlopen(server.url + '/catalog')
+        assert res.status == 200
+        assert throttled(res)
+        res = urlopen(server.url + '/catalog')
+        assert not throttled(res)
+
+        data, _ = hapi(server.url, dataset, parameters, start, stop, **kwargs)
+        assert len(data) == 240
+
+
+def test_retry_after_max():
+
+    import urllib3
+    from hapiclient.util import retry, retry_wait, _backoff_max
+
+    logger.info("test_retry_after_max()")
+
+    # backoff_max is an attribute of urllib3.Retry only in urllib3 >= 2.
+    assert _backoff_max(retry(2)) == 120
+    res = urllib3.HTTPResponse(headers={'Retry-After': '100000'}, status=503)
+    assert retry(2).get_retry_after(res) == _backoff_max(retry(2))
+    assert retry_wait(1, '100000') == _backoff_max(retry(2))
+    assert retry_wait(1, '1') == 1
+
+
+def test_retry_throttled_chunks():
+
+    import threading
+
+    logger.info("test_retry_throttled_chunks()")
+
+    # Requests for one chunk get 503 responses until the retries of
+    # urlopen() are used up, so the chunk is requested again with fewer
+    # downloads at a time.
+    chunk = 'time.min=1970-01-06'
+    counts = {}
+    lock = threading.Lock()
+
+    def hook(handler):
+        if chunk not in handler.path:
+            return None
+        with lock:
+            counts[handler.path] = counts.get(handler.path, 0) + 1
+            if counts[handler.path] > poolopts()['retries'] + 1:
+                return None
+        return ({'HAPI': '2.0', 'status': {'code': 1500, 'message': 'Busy'}}, 503, 'application/json', {'Retry-After': '0'})
+
+    with HAPIServer(hook=hook) as server:
+        opts = {**kwargs, 'n_chunks': 10, 'parallel': True}
+        data, _ = hapi(server.url, dataset, parameters, start, stop, **opts)
+
+    assert len(data) == 240
+    assert list(counts.values()) == [poolopts()['retries'] + 2]
+
+
+if __name__ == '__main__':
+    test_connection_reuse()
+    test_pool_options()
+    test_retry_throttled()
+    test_retry_after_max()
+    test_retry_throttled_chunks()
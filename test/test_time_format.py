@@ -0,0 +1,101 @@
+# See ../README.md for instructions on running tests.
+import shutil
+import tempfile
+
+import numpy as np
+
+from hapiclient import hapi, hapitime2datetime64
+
+from util import compare
+from util.hapi_server import HAPIServer
+from util.get_logger import get_logger
+logger = get_logger(__name__)
+
+kwargs = {
+    'cache': False,
+    'usecache': False,
+    'logging': False
+}
+
+start = '1970-01-01T00:00:00Z'
+stop = '1970-01-01T00:10:00Z'
+
+
+def _expected(data, time_format):
+    # Convert Time column of data returned with time_format='bytes'.
+    Time64 = hapitime2datetime64(data['Time'])
+    if time_format == 'datetime64':
+        return Time64
+    if time_format == 'epoch_ns':
+        return Time64.view(np.int64)
+    return Time64.view(np.int64) / 1e9
+
+
+def test_time_format():
+
+    logger.info("test_time_format()")
+
+    with HAPIServer() as server:
+        for parameters in ['scalar,vector', 'scalarstr']:
+            for format in ['binary', 'csv']:
+                for n_chunks in [None, 3]:
+                    opts = {**kwargs, 'format': format, 'n_chunks': n_chunks}
+                    data1, _ = hapi(server.url, 'dataset1', parameters, start, stop, **opts)
+                    for time_format in ['datetime64', 'epoch_ns', 'epoch_s_float']:
+                        data2, _ = hapi(server.url, 'dataset1', parameters, start, stop,
+                                        **opts, time_format=time_format)
+                        assert len(data2) == len(data1)
+                        assert data2.dtype['Time'].itemsize == 8
+                        assert np.array_equal(data2['Time'], _expected(data1, time_format))
+                        assert compare.equal(data1, data2, names=data1.dtype.names[1:])
+
+
+def test_time_format_csv_methods():
+
+    logger.info("test_time_format_csv_methods()")
+
+    with HAPIServer() as server:
+        opts = {**kwargs, 'format': 'csv'}
+        data1, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop, **opts)
+        for method in ['', 'numpy', 'arrow']:
+            for layout in ['structured', 'columnar']:
+                data2, _ = hapi(server.url, 'dataset1', 'scalar,vector', start, stop,
+                                **opts, method=method, layout=layout, time_format='epoch_ns')
+                assert np.array_equal(data2['Time'], _expected(data1, 'epoch_ns'))
+                assert np.array_equal(data2['vector'], data1['vector'])
+
+
+def test_time_format_cache():
+
+    logger.info("test_time_format_cache()")
+
+    cachedir = tempfile.mkdtemp()
+    opts = {**kwargs, 'cache': True, 'usecache': True, 'cachedir': cachedir}
+
+    with HAPIServer() as server:
+        data1, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts)
+        data2, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts,
+                        time_format='datetime64')
+        server.reset()
+        # Parsed data are cached separately for each time_format. A request for
+        # part of a cached time range is answered by trimming cached data.
+        data3, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts,
+                        time_format='datetime64')
+        data4, _ = hapi(server.url, 'dataset1', 'scalar', start, stop, **opts)
+        data5, _ = hapi(server.url, 'dataset1', 'scalar', '1970-01-01T00:01:00Z',
+                        '1970-01-01T00:02:00Z', **opts, time_format='datetime64')
+        assert server.requests == 0
+
+    shutil.rmtree(cachedir, ignore_errors=True)
+
+    assert data2.dtype['Time'] == np.dtype('M8[ns]')
+    assert compare.equal(data1, data4)
+    assert np.array_equal(data2['Time'], data3['Time'])
+    assert np.array_equal(data2['Time'], _expected(data1, 'datetime64'))
+    assert np.array_equal(data5['Time'], data2['Time'][60:120])
+
+
+if __name__ == '__main__':
+    test_time_format()
+    test_time_format_csv_methods()
+    test_time_format_cache()
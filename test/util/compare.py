@@ -59,10 +59,11 @@ def equal(a, b, names=None):
 
     for name in names:
         if np.issubdtype(a[name].dtype, np.double) or np.issubdtype(a[name].dtype, np.floating):
+            ok = True
             try:
                 np.testing.assert_array_equal(a[name], b[name])
             except AssertionError:
-                allequal = False
+                ok = False
             # nan equalities only supported in assert_array_equal before NumPy 1.19.
             #ok = np.array_equal(a[name], b[name], equal_nan=True)
         else:
@@ -226,6 +227,17 @@ def read(server, dataset, parameters, run, opts, logger=logger):
     allpass = allpass and comparisonOK(data0, data, nolength=True, a_name='binary', b_name='csv; pandas; no len.')
 
 
+    try:
+        import pyarrow
+        opts['method'] = 'arrow'
+        data, meta  = hapi(server, dataset, parameters, start, stop, **opts)
+        logger.info('  csv; arrow           %8.4f   %8.4f   %8.4f' % \
+                (meta['x_totalTime'], meta['x_downloadTime'], meta['x_readTime']))
+
+        allpass = allpass and comparisonOK(data0, data, a_name='binary', b_name='csv; arrow')
+    except ImportError:
+        logger.info('  csv; arrow           pyarrow not installed')
+
     opts['method'] = 'numpy'
     data, meta  = hapi(server, dataset, parameters, start, stop, **opts)
     logger.info('  csv; numpy           %8.4f   %8.4f   %8.4f' % \
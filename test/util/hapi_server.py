@@ -0,0 +1,277 @@
+"""Minimal stand-in HAPI server for offline tests and benchmarks.
+
+Usage:
+
+    from util.hapi_server import HAPIServer
+
+    with HAPIServer() as server:
+        data, meta = hapi(server.url, 'dataset1', 'scalar', start, stop)
+        print(server.connections, server.requests)
+
+Serves /capabilities, /catalog, /info, and /data (CSV and binary) for a small
+set of synthetic datasets with one record per `cadence` seconds starting at
+1970-01-01. `connections` counts TCP connections accepted and `requests` counts
+HTTP requests handled, so tests can check connection reuse.
+"""
+import json
+import threading
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+DATASETS = {
+  'dataset1': {
+    'startDate': '1970-01-01Z',
+    'stopDate': '1970-01-10Z',
+    'cadence': 'PT1S',
+    'parameters': [
+      {'name': 'Time', 'type': 'isotime', 'units': 'UTC', 'fill': None, 'length': 24},
+      {'name': 'scalar', 'type': 'double', 'units': 'm', 'fill': 'nan'},
+      {'name': 'scalarint', 'type': 'integer', 'units': 'm', 'fill': '-2147483648'},
+      {'name': 'scalarstr', 'type': 'string', 'units': None, 'fill': None, 'length': 3},
+      {'name': 'vector', 'type': 'double', 'units': 'm', 'fill': '-1e31', 'size': [3]}
+    ]
+  },
+  'dataset2': {
+    'startDate': '1970-01-01Z',
+    'stopDate': '1971-01-01Z',
+    'cadence': 'PT1H',
+    'parameters': [
+      {'name': 'Time', 'type': 'isotime', 'units': 'UTC', 'fill': None, 'length': 24},
+      {'name': 'scalar', 'type': 'double', 'units': 'm', 'fill': 'nan'}
+    ]
+  },
+  'dataset_nolength': {
+    'startDate': '1970-01-01Z',
+    'stopDate': '1970-01-10Z',
+    'cadence': 'PT1S',
+    'parameters': [
+      {'name': 'Time', 'type': 'isotime', 'units': 'UTC', 'fill': None, 'length': 24},
+      {'name': 'scalar', 'type': 'double', 'units': 'm', 'fill': 'nan'},
+      {'name': 'scalarstr', 'type': 'string', 'units': None, 'fill': None},
+      {'name': 'scalariso', 'type': 'isotime', 'units': 'UTC', 'fill': None}
+    ]
+  }
+}
+
+STRINGS = ['P', 'F', 'Fα']
+
+
+def _hapitime(t):
+  return t.strftime('%Y-%m-%dT%H:%M:%S.') + '%03dZ' % (t.microsecond // 1000)
+
+
+def _parsetime(s):
+  s = s.rstrip('Z')
+  for fmt in ('%Y-%m-%dT%H:%M:%S.%f', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%dT%H', '%Y-%m-%d'):
+    try:
+      return datetime.strptime(s, fmt).replace(tzinfo=timezone.utc)
+    except ValueError:
+      pass
+  raise ValueError(s)
+
+
+def _dyadic(x):
+  # Values with exact binary and short decimal representations so that CSV
+  # and binary responses parse to identical doubles.
+  return float(np.round(x * 1024) / 1024)
+
+
+def records(dataset, parameters, start, stop):
+  """Return list of records (lists of values) for a request."""
+
+  meta = DATASETS[dataset]
+  cadence = 1 if meta['cadence'] == 'PT1S' else 3600
+
+  t0 = (_parsetime(start) - EPOCH).total_seconds()
+  t1 = (_parsetime(stop) - EPOCH).total_seconds()
+  n0 = int(np.ceil(t0 / cadence))
+  names = [p['name'] for p in meta['parameters']]
+  wanted = names if parameters == '' else ['Time'] + parameters.split(',')
+
+  rows = []
+  n = n0
+  while n * cadence < t1:
+    t = EPOCH + timedelta(seconds=n * cadence)
+    values = {
+      'Time': _hapitime(t),
+      'scalar': _dyadic(np.sin(2 * np.pi * n / 600)),
+      'scalarint': int(1000 * np.sin(2 * np.pi * n / 600)),
+      'scalarstr': STRINGS[n % len(STRINGS)],
+      'scalariso': _hapitime(t + timedelta(seconds=1))[0:19] + 'Z',
+      'vector': [_dyadic(np.sin(2 * np.pi * n / 600 + k)) for k in range(3)]
+    }
+    rows.append([values[name] for name in names if name in wanted])
+    n = n + 1
+
+  return rows
+
+
+def binary(dataset, parameters, rows):
+  """Encode records as a HAPI binary response."""
+
+  meta = DATASETS[dataset]
+  dt = []
+  wanted = None if parameters == '' else ['Time'] + parameters.split(',')
+  for p in meta['parameters']:
+    if wanted is not None and p['name'] not in wanted:
+      continue
+    size = p.get('size', [1])[0]
+    if p['type'] == 'double':
+      t = '<d'
+    elif p['type'] == 'integer':
+      t = '<i4'
+    else:
+      t = 'S%d' % p['length']
+    dt.append((p['name'], t, size) if size > 1 else (p['name'], t))
+
+  data = np.zeros(len(rows), dtype=dt)
+  for i, row in enumerate(rows):
+    row = [v.encode('utf-8') if isinstance(v, str) else v for v in row]
+    data[i] = tuple(row)
+
+  return data.tobytes()
+
+
+def csv(rows):
+  """Encode records as a HAPI CSV response."""
+
+  lines = []
+  for row in rows:
+    fields = []
+    for v in row:
+      if isinstance(v, list):
+        fields.extend(repr(x) for x in v)
+      else:
+        fields.append(repr(v) if isinstance(v, float) else str(v))
+    lines.append(','.join(fields))
+
+  if len(lines) == 0:
+    return b''
+
+  return ('\n'.join(lines) + '\n').encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+
+  protocol_version = 'HTTP/1.1'
+  # Headers and body are written separately; without this, Nagle's algorithm
+  # and delayed ACKs add ~40 ms to each response on a kept-alive connection.
+  disable_nagle_algorithm = True
+
+  def log_message(self, *args):
+    pass
+
+  def handle(self):
+    with self.server.lock:
+      self.server.connections += 1
+    BaseHTTPRequestHandler.handle(self)
+
+  def _send(self, body, status=200, content_type='application/json', headers=None):
+    if isinstance(body, dict):
+      body = json.dumps(body).encode('utf-8')
+    self.send_response(status)
+    self.send_header('Content-Type', content_type)
+    self.send_header('Content-Length', str(len(body)))
+    for key, value in (headers or {}).items():
+      self.send_header(key, value)
+    self.end_headers()
+    self.wfile.write(body)
+
+  def do_GET(self):
+
+    with self.server.lock:
+      self.server.requests += 1
+      self.server.paths.append(self.path)
+
+    if self.server.hook is not None:
+      response = self.server.hook(self)
+      if response is not None:
+        self._send(*response)
+        return
+
+    url = urlparse(self.path)
+    query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+    endpoint = url.path.split('/')[-1]
+
+    status = {'code': 1200, 'message': 'OK request successful'}
+
+    if endpoint == 'capabilities':
+      self._send({'HAPI': '2.0', 'status': status, 'outputFormats': ['csv', 'binary']})
+      return
+
+    if endpoint == 'catalog':
+      catalog = [{'id': id} for id in DATASETS]
+      self._send({'HAPI': '2.0', 'status': status, 'catalog': catalog})
+      return
+
+    dataset = query.get('id', None)
+    if dataset not in DATASETS:
+      error = {'code': 1406, 'message': 'HAPI error 1406: unknown dataset id'}
+      self._send({'HAPI': '2.0', 'status': error}, status=404)
+      return
+
+    if endpoint == 'info':
+      info = {'HAPI': '2.0', 'status': status}
+      info.update(DATASETS[dataset])
+      self._send(info)
+      return
+
+    if endpoint == 'data':
+      parameters = query.get('parameters', '')
+      rows = records(dataset, parameters, query['time.min'], query['time.max'])
+      if query.get('format', 'csv') == 'binary':
+        self._send(binary(dataset, parameters, rows), content_type='application/octet-stream')
+      else:
+        self._send(csv(rows), content_type='text/csv')
+      return
+
+    self._send({'HAPI': '2.0', 'status': {'code': 1400, 'message': 'Bad request'}}, status=400)
+
+
+class HAPIServer:
+  """Run a stand-in HAPI server in a background thread."""
+
+  def __init__(self, hook=None):
+    self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), _Handler)
+    self.httpd.daemon_threads = True
+    self.httpd.lock = threading.Lock()
+    self.httpd.hook = hook
+    self.reset()
+    self.url = 'http://127.0.0.1:%d/hapi' % self.httpd.server_address[1]
+
+  def reset(self):
+    self.httpd.connections = 0
+    self.httpd.requests = 0
+    self.httpd.paths = []
+
+  @property
+  def connections(self):
+    return self.httpd.connections
+
+  @property
+  def requests(self):
+    return self.httpd.requests
+
+  @property
+  def paths(self):
+    return self.httpd.paths
+
+  def start(self):
+    self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+    self.thread.start()
+    return self
+
+  def stop(self):
+    self.httpd.shutdown()
+    self.httpd.server_close()
+
+  def __enter__(self):
+    return self.start()
+
+  def __exit__(self, *args):
+    self.stop()